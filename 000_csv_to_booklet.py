@@ -4,6 +4,12 @@ from docx.enum.section import WD_SECTION
 import os
 import sys
 
+from corpus import load_table, add_date_columns
+from dates import TAG, format_date
+from fulltext import VOLLTEXT_SPALTEN, index_path, open_index, tokenize
+from docx_shards import SHARD_GROESSE, append_body_xml, body_xml, render_shards, shard_bounds
+from docx_stream import StreamingDocument
+
 # --- 1. Konfiguration ---
 # Fester Pfad zum Eingabeordner
 INPUT_FOLDER = r'D:\heiBOX\Seafile\Masterarbeit_Ablage\daten_heibox'
@@ -11,6 +17,20 @@ INPUT_FOLDER = r'D:\heiBOX\Seafile\Masterarbeit_Ablage\daten_heibox'
 # Basisname für die Ausgabedatei
 OUTPUT_FILENAME_BASE = 'Alle_Briefe_Chronologisch_Final.docx'
 
+# --- Parallelmodus ---
+# Die sortierten Briefe werden in Shards von SHARD_GROESSE Einträgen auf PROZESSE
+# Prozesse verteilt (None = alle CPU-Kerne) und danach in Reihenfolge zusammengeführt
+PARALLEL_MODUS = True
+PROZESSE = None
+
+# --- Schreibmodus ---
+# 'docx': vollständiger python-docx-Objektbaum, gespeichert mit document.save (optional parallel)
+# 'stream': Brief für Brief direkt in die DOCX-Datei schreiben (konstanter Speicherbedarf)
+SCHREIB_MODUS = 'docx'
+
+# Anzahl Zeilen, die im Stream-Modus gleichzeitig aus dem DataFrame gelesen werden
+STREAM_BLOCK = 1000
+
 # --- 2. SPALTENZUORDNUNG ---
 COLUMN_MAPPING = {
     'BRIEF-ID': 'ID',
@@ -30,20 +50,23 @@ COLUMN_MAPPING = {
 # -------------------------------------------------------------------------------------
 
 # Hilfsfunktionen bleiben unverändert
-def get_formatted_date_string(date_value):
-    """Konvertiert ein pandas Timestamp-Objekt sicher in YYYY-MM-DD."""
-    if pd.notna(date_value) and pd.api.types.is_datetime64_any_dtype(date_value):
+def get_formatted_date_string(date_value, precision=TAG):
+    """
+    Konvertiert ein pandas Timestamp-Objekt sicher in YYYY-MM-DD bzw. bei
+    unvollständigen Datumsangaben in YYYY-MM oder YYYY (siehe dates.format_date).
+    """
+    if pd.notna(date_value) and isinstance(date_value, pd.Timestamp):
         try:
-            return date_value.strftime('%Y-%m-%d')
+            return format_date(date_value, precision) or 'Datum unbekannt'
         except:
             return 'Datum ungültig'
     return 'Datum unbekannt'
 
 
-def add_metadata(doc, key, value):
+def add_metadata(doc, key, value, precision=TAG):
     if pd.notna(value) and value:
-        if key == "Datum" and pd.api.types.is_datetime64_any_dtype(value):
-            display_value = value.strftime('%Y-%m-%d')
+        if key == "Datum" and isinstance(value, pd.Timestamp):
+            display_value = get_formatted_date_string(value, precision)
         else:
             display_value = str(value)
     else:
@@ -54,26 +77,110 @@ def add_metadata(doc, key, value):
     p.add_run(display_value)
 
 
-# 3. Interaktive Abfrage und Pfadkonstruktion
-try:
-    csv_filename = input("Bitte geben Sie den Namen Ihrer CSV-Datei ein (z.B. daten.csv): ")
+def schreibe_brief(document, row):
+    """Schreibt die Seite eines Briefs (Überschrift, Metadaten, Transkription)."""
+    # --- Start des Briefinhalts / der Seite ---
+
+    # 6.1. Hauptüberschrift
+    title_text = row.get('Title', 'Unbetitelter Brief')
+    precision = row.get('DATUM_GENAUIGKEIT', TAG)
+    date_display_str = get_formatted_date_string(row.get('Date'), precision)
+
+    document.add_heading(f"Brief ({date_display_str}) – {title_text}", level=1)
+
+    # 6.2. Metadaten-Block
+    document.add_heading("Details", level=3)
+
+    add_metadata(document, "ID", row.get('ID'))
+    add_metadata(document, "Datum", row.get('Date'), precision)
+    add_metadata(document, "Versandort", row.get('Versandort'))
+    add_metadata(document, "Empfangsort", row.get('Empfangsort'))
+    add_metadata(document, "Beschreibung", row.get('Description'))
+    add_metadata(document, "Funktionstags", row.get('Funktionstags'))
+    document.add_paragraph("--- Personen Details ---")
+    add_metadata(document, "Tätigkeit", row.get('Tätigkeit'))
+    add_metadata(document, "Fach", row.get('Fach'))
+    add_metadata(document, "Institution", row.get('Institution'))
+
+    document.add_paragraph("")
+
+    # 6.3. Vollständige Transkription
+    document.add_heading("Vollständige Transkription:", level=3)
+    main_text = str(row.get('Text_Full', 'KEIN HAUPTTEXT FÜR DIESEN EINTRAG GEFUNDEN'))
+    document.add_paragraph(main_text)
+
+    # --- Ende des Briefinhalts ---
 
-    # Vollständigen Pfad zur CSV-Datei erstellen
-    CSV_FILE_PATH = os.path.join(INPUT_FOLDER, csv_filename)
 
-    # NEU: Pfad für die Ausgabedatei im selben Ordner erstellen
-    OUTPUT_FILE_PATH = os.path.join(INPUT_FOLDER, OUTPUT_FILENAME_BASE)
+def schreibe_briefe(document, rows, seitenumbruch_am_ende=False):
+    """
+    Schreibt die Briefe nacheinander, jeweils getrennt durch einen Abschnitt
+    mit neuer Seite. Mit seitenumbruch_am_ende folgt auch auf den letzten
+    Brief ein Umbruch (für Shards, auf die weitere Briefe folgen).
+    """
+    for position, row in enumerate(rows):
+        schreibe_brief(document, row)
+
+        # 6.4. Seitenumbruch einfügen (außer beim letzten Eintrag)
+        if position < len(rows) - 1 or seitenumbruch_am_ende:
+            document.add_section(WD_SECTION.NEW_PAGE)
+
+
+def _render_shard(shard):
+    """Rendert einen Shard in ein eigenes Dokument und gibt dessen Body als XML zurück."""
+    rows, erster_shard, seitenumbruch_am_ende = shard
+    document = Document()
+    if not erster_shard:
+        # Wie im seriellen Dokument: nach dem ersten Umbruch beginnt jeder Abschnitt auf neuer Seite
+        document.sections[-1].start_type = WD_SECTION.NEW_PAGE
+    schreibe_briefe(document, rows, seitenumbruch_am_ende)
+    return body_xml(document)
+
+
+def erstelle_booklet_stream(df, output_path):
+    """
+    Erstellt das Booklet im Stream-Modus: jeder Brief wird mit denselben
+    Hilfsfunktionen geschrieben, sofort in word/document.xml übertragen und
+    danach verworfen. Das Ergebnis entspricht dem Dokument aus erstelle_booklet.
+    """
+    with StreamingDocument(output_path) as stream:
+        for start in range(0, len(df), STREAM_BLOCK):
+            for offset, row in enumerate(df.iloc[start:start + STREAM_BLOCK].to_dict('records')):
+                schreibe_brief(stream.document, row)
+
+                # 6.4. Seitenumbruch einfügen (außer beim letzten Eintrag)
+                if start + offset < len(df) - 1:
+                    stream.document.add_section(WD_SECTION.NEW_PAGE)
+                stream.flush()
+
+
+def erstelle_booklet(df, output_path, parallel=PARALLEL_MODUS, shard_size=SHARD_GROESSE, max_workers=PROZESSE):
+    """
+    Erstellt das chronologische Booklet aus dem sortierten DataFrame.
+
+    Im Parallelmodus werden die Briefe in zusammenhängende Shards zerlegt,
+    jeder Shard wird in einem eigenen Prozess gerendert und die Ergebnisse
+    werden in Reihenfolge zu einem Dokument zusammengeführt.
+    """
+    rows = df.to_dict('records')
+    document = Document()
+    bounds = shard_bounds(len(rows), shard_size)
+
+    if not parallel or len(bounds) < 2:
+        schreibe_briefe(document, rows)
+    else:
+        shards = [(rows[start:stop], start == 0, stop < len(rows)) for start, stop in bounds]
+        for xml in render_shards(_render_shard, shards, max_workers):
+            append_body_xml(document, xml)
+        document.sections[-1].start_type = WD_SECTION.NEW_PAGE
 
-    print(f"Versuche Datei zu lesen von: {CSV_FILE_PATH}")
-    print(f"Ausgabedokument wird gespeichert unter: {OUTPUT_FILE_PATH}")
+    document.save(output_path)
 
-except Exception as e:
-    print(f"Fehler bei der Pfadkonstruktion: {e}")
-    sys.exit()
 
-# 4. CSV-Datei laden, Spalten umbenennen und sortieren
-try:
-    df = pd.read_csv(CSV_FILE_PATH)
+def lade_briefe(csv_file_path):
+    """Lädt die CSV-Datei, benennt die Spalten um und sortiert chronologisch."""
+    # Über den Korpus-Cache laden (DATUM ist dort bereits als datetime64 in DATUM_DATE geparst)
+    df = load_table(csv_file_path, prepare=add_date_columns)
 
     missing_cols = [col for col in COLUMN_MAPPING.keys() if col not in df.columns]
     if missing_cols:
@@ -85,64 +192,68 @@ try:
     df.rename(columns=COLUMN_MAPPING, inplace=True)
 
     # DATUMSKONVERTIERUNG UND SORTIERUNG
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Date'] = df['DATUM_DATE']
     df.sort_values(by='Date', ascending=True, inplace=True)
 
     num_unsorted = df['Date'].isna().sum()
     if num_unsorted > 0:
         print(f"Hinweis: {num_unsorted} Einträge mit ungültigem Datum wurden ans Ende der Liste gesetzt.")
+    return df
 
-except FileNotFoundError:
-    print(f"\nFATALER FEHLER: Die Datei '{CSV_FILE_PATH}' konnte nicht gefunden werden.")
-    print("Bitte stellen Sie sicher, dass der Dateiname korrekt ist und die Datei im Ordner existiert.")
-    sys.exit()
-except Exception as e:
-    print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
-    sys.exit()
 
-# 5. Word-Dokument initialisieren
-document = Document()
-print(f"Es wurden {len(df)} Einträge geladen und chronologisch sortiert. Die Dokumenterstellung beginnt...")
+def main():
+    # 3. Interaktive Abfrage und Pfadkonstruktion
+    try:
+        csv_filename = input("Bitte geben Sie den Namen Ihrer CSV-Datei ein (z.B. daten.csv): ")
 
-# 6. Iteriere über jede Zeile (chronologisch) und erstelle eine Seite
-for index, row in df.iterrows():
-    # --- Start des Briefinhalts / der Seite ---
+        # Vollständigen Pfad zur CSV-Datei erstellen
+        CSV_FILE_PATH = os.path.join(INPUT_FOLDER, csv_filename)
 
-    # 6.1. Hauptüberschrift
-    title_text = row.get('Title', 'Unbetitelter Brief')
-    date_display_str = get_formatted_date_string(row.get('Date'))
+        # NEU: Pfad für die Ausgabedatei im selben Ordner erstellen
+        OUTPUT_FILE_PATH = os.path.join(INPUT_FOLDER, OUTPUT_FILENAME_BASE)
 
-    document.add_heading(f"Brief ({date_display_str}) – {title_text}", level=1)
+        print(f"Versuche Datei zu lesen von: {CSV_FILE_PATH}")
+        print(f"Ausgabedokument wird gespeichert unter: {OUTPUT_FILE_PATH}")
 
-    # 6.2. Metadaten-Block
-    document.add_heading("Details", level=3)
+    except Exception as e:
+        print(f"Fehler bei der Pfadkonstruktion: {e}")
+        sys.exit()
 
-    add_metadata(document, "ID", row.get('ID'))
-    add_metadata(document, "Datum", row.get('Date'))
-    add_metadata(document, "Versandort", row.get('Versandort'))
-    add_metadata(document, "Empfangsort", row.get('Empfangsort'))
-    add_metadata(document, "Beschreibung", row.get('Description'))
-    add_metadata(document, "Funktionstags", row.get('Funktionstags'))
-    document.add_paragraph("--- Personen Details ---")
-    add_metadata(document, "Tätigkeit", row.get('Tätigkeit'))
-    add_metadata(document, "Fach", row.get('Fach'))
-    add_metadata(document, "Institution", row.get('Institution'))
+    # 4. CSV-Datei laden, Spalten umbenennen und sortieren
+    try:
+        df = lade_briefe(CSV_FILE_PATH)
 
-    document.add_paragraph("")
+    except FileNotFoundError:
+        print(f"\nFATALER FEHLER: Die Datei '{CSV_FILE_PATH}' konnte nicht gefunden werden.")
+        print("Bitte stellen Sie sicher, dass der Dateiname korrekt ist und die Datei im Ordner existiert.")
+        sys.exit()
+    except Exception as e:
+        print(f"Ein unerwarteter Fehler ist aufgetreten: {e}")
+        sys.exit()
 
-    # 6.3. Vollständige Transkription
-    document.add_heading("Vollständige Transkription:", level=3)
-    main_text = str(row.get('Text_Full', 'KEIN HAUPTTEXT FÜR DIESEN EINTRAG GEFUNDEN'))
-    document.add_paragraph(main_text)
+    # Optional: nur Briefe, deren Transkription oder Beschreibung die Volltextanfrage erfüllen
+    print("\nOptional: Volltextsuche in TRANSK und BESCHR (Wörter, \"Phrasen\" oder Präfixe wie 'schädel*').")
+    text_query = input("Volltext (leer lassen für alle Briefe): ").strip()
+    if text_query:
+        # Die Spalten sind bereits umbenannt (COLUMN_MAPPING)
+        with open_index(index_path(CSV_FILE_PATH), df, [COLUMN_MAPPING[c] for c in VOLLTEXT_SPALTEN],
+                        id_column=COLUMN_MAPPING['BRIEF-ID']) as index:
+            df = df[index.mask(df, text_query, id_column=COLUMN_MAPPING['BRIEF-ID'])]
+        OUTPUT_FILE_PATH = OUTPUT_FILE_PATH.replace('.docx', f"_volltext-{'-'.join(tokenize(text_query))[:40]}.docx")
+        print(f"Volltextsuche '{text_query}': {len(df)} Briefe gefunden.")
+        print(f"Ausgabedokument wird gespeichert unter: {OUTPUT_FILE_PATH}")
+
+    # 5. - 7. Word-Dokument erstellen (eine Seite pro Brief, chronologisch) und speichern
+    print(f"Es wurden {len(df)} Einträge geladen und chronologisch sortiert. Die Dokumenterstellung beginnt...")
+    if SCHREIB_MODUS == 'stream':
+        erstelle_booklet_stream(df, OUTPUT_FILE_PATH)
+    else:
+        erstelle_booklet(df, OUTPUT_FILE_PATH)  # <-- Wichtig: Speichert nun in den Input-Ordner!
 
-    # --- Ende des Briefinhalts ---
+    print(f"\n--- ERFOLG ---")
+    print(
+        f"Das Dokument '{os.path.basename(OUTPUT_FILE_PATH)}' wurde erfolgreich mit {len(df)} chronologisch sortierten Seiten in Ihrem Ordner '{INPUT_FOLDER}' gespeichert.")
 
-    # 6.4. Seitenumbruch einfügen (außer beim letzten Eintrag)
-    if index < len(df) - 1:
-        document.add_section(WD_SECTION.NEW_PAGE)
 
-# 7. Dokument speichern
-document.save(OUTPUT_FILE_PATH)  # <-- Wichtig: Speichert nun in den Input-Ordner!
-print(f"\n--- ERFOLG ---")
-print(
-    f"Das Dokument '{OUTPUT_FILENAME_BASE}' wurde erfolgreich mit {len(df)} chronologisch sortierten Seiten in Ihrem Ordner '{INPUT_FOLDER}' gespeichert.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
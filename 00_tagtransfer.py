@@ -1,6 +1,54 @@
+import numpy as np
 import pandas as pd
 import os
 
+from csv_stream import detect_encoding, read_csv_chunks, write_csv_chunks
+
+# Briefe werden blockweise mit dieser Zeilenzahl verarbeitet, der Speicherbedarf
+# hängt damit nicht von der Korpusgröße ab (None = ganze Datei auf einmal)
+CHUNK_GROESSE = 100_000
+
+# Zielspalte im Brief -> Quellspalte in der Personentabelle
+NONOS_SPALTEN = {
+    'NONOS-TAET': 'TAG-TAET',
+    'NONOS-FACH': 'TAG-FACH',
+    'NONOS-INST': 'TAG-INST',
+}
+
+# Briefe von/an diese Person werden mit den Daten des Gegenübers angereichert
+EIGENE_ID = '069-SO'
+
+
+def anreichern(df_briefe, df_pers):
+    """
+    Ergänzt NONOS-TAET/-FACH/-INST jedes Briefs um die Tags der Gegenperson.
+
+    Gegenperson ist der Absender, außer dieser ist EIGENE_ID – dann der
+    Empfänger. Die Personen werden einmal nach PERSON-ID indexiert (bei
+    doppelten IDs gilt der letzte Eintrag) und per Index-Join zugeordnet.
+    Briefe ohne passende Person behalten ihre bisherigen Werte.
+    """
+    df_briefe = df_briefe.copy()
+
+    personen = df_pers.drop_duplicates('PERSON-ID', keep='last').set_index('PERSON-ID')
+
+    # Logik: Wenn ABS-ID nicht 069-SO ist, nehmen wir diese. Sonst EMP-ID.
+    target_id = df_briefe['ABS-ID'].where(df_briefe['ABS-ID'] != EIGENE_ID, df_briefe['EMP-ID'])
+
+    # Nachschlagen: Position der Person im Index (-1 = nicht gefunden)
+    pos = personen.index.get_indexer(target_id)
+    gefunden = pos >= 0
+
+    for ziel, quelle in NONOS_SPALTEN.items():
+        if ziel in df_briefe.columns:
+            werte = df_briefe[ziel].to_numpy(dtype=object, copy=True)
+        else:
+            werte = np.full(len(df_briefe), np.nan, dtype=object)
+        werte[gefunden] = personen[quelle].to_numpy(dtype=object)[pos[gefunden]]
+        df_briefe[ziel] = werte
+
+    return df_briefe
+
 
 def daten_anreichern():
     # 1. Pfad und Dateinamen definieren
@@ -23,58 +71,25 @@ def daten_anreichern():
     # Daten einlesen
     # HINWEIS: Falls deine CSVs Semikolons (;) statt Kommas als Trenner nutzen,
     # ändere unten sep=',' zu sep=';'
-    try:
-        df_pers = pd.read_csv(file_personen, sep=',', dtype=str, encoding='utf-8')
-        df_briefe = pd.read_csv(file_briefe, sep=',', dtype=str, encoding='utf-8')
-    except UnicodeDecodeError:
-        # Fallback, falls die Datei nicht utf-8 codiert ist (z.B. bei Excel-Exporten oft 'latin1')
-        print("UTF-8 Fehler, versuche 'latin1' Kodierung...")
-        df_pers = pd.read_csv(file_personen, sep=',', dtype=str, encoding='latin1')
-        df_briefe = pd.read_csv(file_briefe, sep=',', dtype=str, encoding='latin1')
+    # Die Kodierung wird vorab aus einer Stichprobe erkannt (z.B. 'latin1' bei Excel-Exporten),
+    # sodass keine Datei doppelt gelesen werden muss.
+    encoding_pers = detect_encoding(file_personen)
+    encoding_briefe = detect_encoding(file_briefe)
+    print(f"Kodierung: Personen '{encoding_pers}', Briefe '{encoding_briefe}'")
 
     # NaN (leere Felder) durch leere Strings ersetzen
-    df_pers = df_pers.fillna('')
-    df_briefe = df_briefe.fillna('')
-
-    print("Erstelle Such-Index für Personen...")
-
-    # 2. Personen-Daten in ein Dictionary umwandeln
-    personen_lookup = {}
-    for index, row in df_pers.iterrows():
-        p_id = row['PERSON-ID']
-        personen_lookup[p_id] = {
-            'TAG-TAET': row['TAG-TAET'],
-            'TAG-FACH': row['TAG-FACH'],
-            'TAG-INST': row['TAG-INST']
-        }
-
-    print("Bearbeite Briefe (das kann einen Moment dauern)...")
-
-    # 3. Funktion für das Update der Zeilen
-    def update_row(row):
-        target_id = ''
-
-        # Logik: Wenn ABS-ID nicht 069-SO ist, nehmen wir diese. Sonst EMP-ID.
-        if row['ABS-ID'] != '069-SO':
-            target_id = row['ABS-ID']
-        else:
-            target_id = row['EMP-ID']
-
-        # Nachschlagen
-        if target_id in personen_lookup:
-            match = personen_lookup[target_id]
-            row['NONOS-TAET'] = match['TAG-TAET']
-            row['NONOS-FACH'] = match['TAG-FACH']
-            row['NONOS-INST'] = match['TAG-INST']
+    df_pers = pd.read_csv(file_personen, sep=',', dtype=str, encoding=encoding_pers).fillna('')
 
-        return row
+    print("Bearbeite Briefe...")
 
-    # Die Funktion anwenden
-    df_briefe_neu = df_briefe.apply(update_row, axis=1)
+    # 2./3. Personen-Daten blockweise per Index-Join an die Briefe anhängen
+    chunks = read_csv_chunks(file_briefe, CHUNK_GROESSE, encoding=encoding_briefe, sep=',', dtype=str)
+    angereichert = (anreichern(chunk.fillna(''), df_pers) for chunk in chunks)
 
-    # 4. Speichern
+    # 4. Speichern (jeder Block wird direkt an die Ausgabedatei angehängt)
     print(f"Speichere neue Datei: {file_output}")
-    df_briefe_neu.to_csv(file_output, index=False, sep=',', encoding='utf-8')
+    n_briefe = write_csv_chunks(angereichert, file_output, sep=',', encoding='utf-8')
+    print(f"{n_briefe} Briefe verarbeitet.")
     print("Fertig!")
 
 
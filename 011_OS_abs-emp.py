@@ -1,48 +1,34 @@
-import pandas as pd
 import folium
 import math
 import os
 import json
 
+from corpus import load_letters
+from flows import aggregate_flows, add_flows, write_letter_sidecar
+from person_index import PersonIndex
+from tag_index import TagIndex
+from tag_vocab import load_vocabulary
+
 print("Starte Skript...")
 
 
 # --- SCHRITT 1: DATEN LADEN UND VORBEREITEN (PANDAS) ---
 
-def parse_coords(coord_str):
-    """
-    Konvertiert einen Koordinaten-String "lat, lon" in ein Tupel (lat, lon).
-    Behandelt fehlende, ungültige und reine Text-Werte robust.
-    """
-    if pd.isna(coord_str):
-        return None
-
-    cleaned_str = str(coord_str).replace(' ', '')
-
-    if ',' not in cleaned_str:
-        return None
-
-    try:
-        parts = cleaned_str.split(',')
-        if len(parts) != 2:
-            return None
-
-        lat = float(parts[0])
-        lon = float(parts[1])
-
-        if -90 <= lat <= 90 and -180 <= lon <= 180:
-            return (lat, lon)
-        else:
-            return None
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
 
-    except ValueError:
-        return None
-    except Exception:
-        return None
+# --- Darstellung der Briefverbindungen ---
+# 'geojson': eine GeoJSON-Ebene pro Layer, Brief-Details in einer Side-Car-Datei neben der Karte
+# 'polyline': eine folium.PolyLine pro Route mit eingebettetem Popup
+KARTEN_MODUS = 'geojson'
 
+# --- Personen-Layer (Ego-Layer) ---
+# Standardpersonen (Namen oder IDs), für die je ein Absender- und ein Empfänger-Layer gezeichnet wird
+EGO_PERSONEN = ['Schoetensack, Otto']
 
-# --- Fester Ordnerpfad ---
-BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+# Farben (Absender, Empfänger) der Personen-Layer, der Reihe nach vergeben
+EGO_FARBEN = [('orange', 'teal'), ('crimson', 'steelblue'), ('gold', 'darkcyan'),
+              ('magenta', 'olive'), ('chocolate', 'slateblue'), ('deeppink', 'seagreen')]
 
 print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
 print("Bitte geben Sie den Dateinamen Ihrer CSV-Datei ein (inkl. .csv Endung).")
@@ -51,13 +37,11 @@ file_name = input("Dateiname: ")
 # --- Kombinieren von Ordner und Dateiname ---
 file_path = os.path.join(BASE_FOLDER, file_name)
 
-# Laden der CSV-Datei
+# Laden der CSV-Datei (über den Korpus-Cache inkl. Datums- und Koordinatenspalten)
 try:
-    df = pd.read_csv(file_path)
+    df = load_letters(file_path)
     print(f"CSV-Datei '{file_path}' erfolgreich geladen. {len(df)} Zeilen gefunden.")
 
-    df['DATUM_DATE'] = pd.to_datetime(df['DATUM'], errors='coerce')
-
 except FileNotFoundError:
     print(f"--- FEHLER ---")
     print(f"Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
@@ -67,9 +51,11 @@ except Exception as e:
     print(f"Ein unerwarteter Fehler ist beim Laden der Datei aufgetreten: {e}")
     exit()
 
-# Anwenden der robusteren Parsing-Funktion auf die Koordinatenspalten
-df['ABS_KOOR_TUPLE'] = df['ABS-KOOR'].apply(parse_coords)
-df['EMP_KOOR_TUPLE'] = df['EMP-KOOR'].apply(parse_coords)
+# Tag-Index und Personen-Index einmal pro Korpus aufbauen (ersetzt die Teilstring-Suche bzw. den
+# Namensvergleich pro Brief)
+tag_index = TagIndex(df, ['TAG-INH'], load_vocabulary(BASE_FOLDER))
+tag_index.tag_vocabulary.warn_unassigned(['Objekt', 'Literatur'])
+person_index = PersonIndex(df)
 
 # --- ABFRAGE UND ANWENDUNG DES DATUMS-FILTERS ---
 
@@ -85,11 +71,28 @@ while True:
         print("Ungültige Eingabe. Bitte geben Sie eine ganze Zahl (Jahr) ein.")
 
 print(f"Wende Datumsfilter an: {start_year} bis {end_year}...")
-df_filtered = df[(df['DATUM_DATE'].dt.year >= start_year) &
-                 (df['DATUM_DATE'].dt.year <= end_year)].copy()
+date_mask = ((df['DATUM_JAHR'] >= start_year) &
+             (df['DATUM_JAHR'] <= end_year)).to_numpy()
+df_filtered = df[date_mask].copy()
 
 print(f"Nach Datumsfilterung: {len(df_filtered)} Briefe verbleiben.")
 
+# --- ABFRAGE DER PERSONEN FÜR DIE EGO-LAYER ---
+
+print("\nPersonen-Layer: Namen oder IDs durch ';' getrennt (z.B. 'Schoetensack, Otto; 012-AB'),")
+print("oder eine Zahl N für die N aktivsten Korrespondenten im Zeitraum.")
+ego_input = input(f"Personen (leer lassen für '{'; '.join(EGO_PERSONEN)}'): ").strip()
+
+if ego_input.isdigit():
+    ego_codes = person_index.top(int(ego_input), mask=date_mask)
+else:
+    ego_codes = []
+    for person in [p.strip() for p in ego_input.split(';') if p.strip()] or EGO_PERSONEN:
+        codes = person_index.resolve(person)
+        if not codes:
+            print(f"Hinweis: Person '{person}' kommt in keinem Brief vor.")
+        ego_codes.extend(c for c in codes if c not in ego_codes)
+
 # --- SCHRITT 2: KARTE ERSTELLEN UND GRUPPEN DEFINIEREN (FOLIUM) ---
 
 # Den Mittelpunkt der Karte festlegen (z.B. Heidelberg)
@@ -105,97 +108,43 @@ fg_object = folium.FeatureGroup(name='1. Inhalt: Objekt-Diskussion (Rot)').add_t
 fg_literature = folium.FeatureGroup(name='2. Inhalt: Literatur-Austausch (Grün)').add_to(m)
 fg_other = folium.FeatureGroup(name='3. Inhalt: Sonstige (Blau)').add_to(m)
 
-# NEU: Layer für Personenfilter (Sender vs. Empfänger)
-fg_schoetensack_sender = folium.FeatureGroup(name='4. Person: S. als Absender (Orange)').add_to(m)
-fg_schoetensack_recipient = folium.FeatureGroup(name='5. Person: S. als Empfänger (Teal)').add_to(m)
+# Dateinamen der Karte und der Side-Car-Datei mit den Brief-Details
+output_filename = f"briefnetzwerk_karte_abs_empf_{start_year}-{end_year}.html"
+sidecar_filename = output_filename.replace('.html', '_briefe.js') if KARTEN_MODUS == 'geojson' else None
 
 print("Karte initialisiert. Zeichne Briefverbindungen und ordne sie Layern zu...")
 
-# Iterieren durch den GEFILTERTEN DataFrame
-for index, row in df_filtered.iterrows():
-
-    start_coords = row['ABS_KOOR_TUPLE']
-    end_coords = row['EMP_KOOR_TUPLE']
-
-    if not start_coords or not end_coords:
-        continue
-
-        # Normalisierung der Spalten für die Prüfung
-    tag_inh = str(row['TAG-INH']).lower()
-
-    # NEU: Bereinigung (Kleinschreibung, Leerzeichen entfernen) für exakten Abgleich
-    abs_name_clean = str(row['ABS-NAME']).lower().strip()
-    emp_name_clean = str(row['EMP-NAME']).lower().strip()
-
-    # Popup-Text vorbereiten
-    popup_text = f"""
-    <b>Brief-ID:</b> {row['BRIEF-ID']}<br><br>
-    <b>Von:</b> {row['ABS-NAME']} ({row['ABS-ORT']})<br>
-    <b>An:</b> {row['EMP-NAME']} ({row['EMP-ORT']})<br>
-    <b>Datum:</b> {row['DATUM']}<br>
-    <hr>
-    <b>Funktion:</b> {row['TAG-FUNK']}<br>
-    <b>Fach:</b> {row['TAG-FACH']}<br>
-    <b>Inhalt:</b> {row['TAG-INH']}<br>
-    """
-
-    assigned_to_content_group = False
-
-    # ZUWEISUNG NACH INHALT (TAG-INH)
-
-    # 1. Objekt-Diskussion (ROT)
-    if 'objekt' in tag_inh:
-        folium.PolyLine(
-            locations=[start_coords, end_coords],
-            weight=2,
-            color='red',
-            opacity=0.7,
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(fg_object)
-        assigned_to_content_group = True
-
-    # 2. Literatur-Austausch (GRÜN)
-    if 'literatur' in tag_inh:
-        folium.PolyLine(
-            locations=[start_coords, end_coords],
-            weight=2,
-            color='green',
-            opacity=0.7,
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(fg_literature)
-        assigned_to_content_group = True
-
-    # 3. Sonstige Inhalte (BLAU)
-    if not assigned_to_content_group:
-        folium.PolyLine(
-            locations=[start_coords, end_coords],
-            weight=2,
-            color='blue',
-            opacity=0.7,
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(fg_other)
-
-    # ZUWEISUNG NACH PERSON (EXAKTE PRÜFUNG)
-
-    # 4. Schoetensack als ABSENDER (ORANGE)
-    if abs_name_clean == 'schoetensack, otto':
-        folium.PolyLine(
-            locations=[start_coords, end_coords],
-            weight=3,  # Dickere Linie zur Hervorhebung
-            color='orange',
-            opacity=0.9,
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(fg_schoetensack_sender)
-
-    # 5. Schoetensack als EMPFÄNGER (TEAL)
-    if emp_name_clean == 'schoetensack, otto':
-        folium.PolyLine(
-            locations=[start_coords, end_coords],
-            weight=3,  # Dickere Linie zur Hervorhebung
-            color='teal',
-            opacity=0.9,
-            popup=folium.Popup(popup_text, max_width=300)
-        ).add_to(fg_schoetensack_recipient)
+# ZUWEISUNG NACH INHALT (TAG-INH)
+# Briefe mit identischer Route werden pro Layer zu einer gewichteten Linie gebündelt
+
+# 1. Objekt-Diskussion (ROT)
+is_object = tag_index.tag_mask('Objekt')[date_mask]
+add_flows(fg_object, aggregate_flows(df_filtered[is_object]), color='red', weight=2, opacity=0.7,
+          mode=KARTEN_MODUS, sidecar=sidecar_filename)
+
+# 2. Literatur-Austausch (GRÜN)
+is_literature = tag_index.tag_mask('Literatur')[date_mask]
+add_flows(fg_literature, aggregate_flows(df_filtered[is_literature]), color='green', weight=2, opacity=0.7,
+          mode=KARTEN_MODUS, sidecar=sidecar_filename)
+
+# 3. Sonstige Inhalte (BLAU)
+add_flows(fg_other, aggregate_flows(df_filtered[~(is_object | is_literature)]), color='blue', weight=2,
+          opacity=0.7, mode=KARTEN_MODUS, sidecar=sidecar_filename)
+
+# ZUWEISUNG NACH PERSON (ÜBER DEN PERSONEN-INDEX)
+# Pro Person ein Absender- und ein Empfänger-Layer; jede Person kostet nur ein Nachschlagen im Index
+
+layer_nr = 4
+for i, code in enumerate(ego_codes):
+    name = person_index.name(code)
+    color_sender, color_recipient = EGO_FARBEN[i % len(EGO_FARBEN)]
+
+    for rolle, rolle_text, color in (('abs', 'Absender', color_sender), ('emp', 'Empfänger', color_recipient)):
+        fg_person = folium.FeatureGroup(name=f'{layer_nr}. Person: {name} als {rolle_text} ({color})').add_to(m)
+        add_flows(fg_person, aggregate_flows(df_filtered[person_index.mask(code, rolle)[date_mask]]),
+                  color=color, weight=3, opacity=0.9,  # Dickere Linie zur Hervorhebung
+                  mode=KARTEN_MODUS, sidecar=sidecar_filename)
+        layer_nr += 1
 
 # --- Layer-Steuerung hinzufügen ---
 
@@ -204,13 +153,15 @@ folium.LayerControl().add_to(m)
 
 # --- Speicherung im BASE_FOLDER ---
 
-output_filename = f"briefnetzwerk_karte_abs_empf_{start_year}-{end_year}.html"
 output_path = os.path.join(BASE_FOLDER, output_filename)
 
 # Speichern der fertigen Karte als HTML-Datei
 m.save(output_path)
 
+if sidecar_filename:
+    write_letter_sidecar(df_filtered, os.path.join(BASE_FOLDER, sidecar_filename))
+
 print(f"--- FERTIG ---")
 print(
-    f"Die interaktive Karte mit detaillierter Schoetensack-Filterung (Filter: {start_year}-{end_year}) wurde erfolgreich gespeichert unter:\n{output_path}")
-print(f"Sie können nun die Layer 'S. als Absender (Orange)' und 'S. als Empfänger (Teal)' unabhängig steuern.")
\ No newline at end of file
+    f"Die interaktive Karte mit Personen-Layern für {len(ego_codes)} Person(en) (Filter: {start_year}-{end_year}) wurde erfolgreich gespeichert unter:\n{output_path}")
+print("Sie können nun die Absender- und Empfänger-Layer jeder Person unabhängig steuern.")
\ No newline at end of file
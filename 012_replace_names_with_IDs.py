@@ -1,5 +1,13 @@
 import pandas as pd
 import os
+import time
+
+from csv_stream import detect_encoding, read_csv_chunks, write_csv_chunks
+from resolver import RESOLVER_DATEI, Resolver
+
+# Briefe werden blockweise mit dieser Zeilenzahl verarbeitet, der Speicherbedarf
+# hängt damit nicht von der Korpusgröße ab (None = ganze Datei auf einmal)
+CHUNK_GROESSE = 100_000
 
 
 def replace_ids_as_strings():
@@ -18,40 +26,55 @@ def replace_ids_as_strings():
         # dtype=str zwingt pandas, ALLE Daten als Text zu lesen.
         # Das verhindert, dass "00123" zu "123" wird oder IDs als Zahlen behandelt werden.
 
-        print("Lade Hauptdatei...")
-        df_briefe = pd.read_csv(INPUT_FILE, sep=',', dtype=str)
-
         print("Lade Mapping-Dateien...")
-        df_persons = pd.read_csv(PERSON_MAPPING_FILE, sep=',', dtype=str)
-        df_places = pd.read_csv(PLACE_MAPPING_FILE, sep=',', dtype=str)
-
-        # --- 3. Mappings erstellen ---
-        # Da wir dtype=str verwendet haben, sind die IDs hier garantiert Strings.
-        # Format: dict(zip(Name, ID))
-
-        # Mapping: KORR-NAME -> PERSON-ID
-        person_map = dict(zip(df_persons['KORR-NAME'], df_persons['PERSON-ID']))
-
-        # Mapping: ORT-NAME -> ORT-GEONAMES
-        place_map = dict(zip(df_places['ORT-NAME'], df_places['ORT-GEONAMES']))
-
-        print(f"Mappings erstellt: {len(person_map)} Personen, {len(place_map)} Orte.")
-
-        # --- 4. Ersetzen der Werte ---
-        print("Ersetze ABS-ID und EMP-ID mit Personen-IDs...")
-        # Wir mappen die Werte. Unbekannte Werte bleiben erhalten (fillna).
-        df_briefe['ABS-ID'] = df_briefe['ABS-ID'].map(person_map).fillna(df_briefe['ABS-ID'])
-        df_briefe['EMP-ID'] = df_briefe['EMP-ID'].map(person_map).fillna(df_briefe['EMP-ID'])
-
-        print("Ersetze ABS-GEONAMES und EMP-GEONAMES mit GeoNames-IDs...")
-        df_briefe['ABS-GEONAMES'] = df_briefe['ABS-GEONAMES'].map(place_map).fillna(df_briefe['ABS-GEONAMES'])
-        df_briefe['EMP-GEONAMES'] = df_briefe['EMP-GEONAMES'].map(place_map).fillna(df_briefe['EMP-GEONAMES'])
+        df_persons = pd.read_csv(PERSON_MAPPING_FILE, sep=',', dtype=str, encoding=detect_encoding(PERSON_MAPPING_FILE))
+        df_places = pd.read_csv(PLACE_MAPPING_FILE, sep=',', dtype=str, encoding=detect_encoding(PLACE_MAPPING_FILE))
+
+        # --- 3. Resolver-Datenbank öffnen ---
+        # Namen, IDs und normalisierte Namensvarianten liegen indexiert in einer SQLite-Datenbank
+        # neben den Mapping-Dateien; sie werden nur neu aufgebaut, wenn sich die Mappings ändern.
+        start = time.perf_counter()
+        resolver = Resolver(os.path.join(os.path.dirname(PERSON_MAPPING_FILE), RESOLVER_DATEI))
+        if resolver.load_mappings(df_persons, df_places):
+            print(f"Mappings übernommen: {len(df_persons)} Personen, {len(df_places)} Orte "
+                  "(gespeicherte Ergebnisse verworfen).")
+        else:
+            print("Mappings unverändert, gespeicherte Ergebnisse werden weiterverwendet.")
+
+        # --- 4. Ersetzen der Werte (blockweise) ---
+        # Die Hauptdatei wird in Blöcken gelesen, ersetzt und direkt an die Ausgabedatei angehängt.
+        # Nur Briefe, deren ABS-ID/EMP-ID/ABS-GEONAMES/EMP-GEONAMES sich seit dem letzten Lauf
+        # geändert haben, werden neu aufgelöst.
+        print("Ersetze ABS-ID/EMP-ID mit Personen-IDs und ABS-GEONAMES/EMP-GEONAMES mit GeoNames-IDs...")
+        chunks = read_csv_chunks(INPUT_FILE, CHUNK_GROESSE, sep=',', dtype=str)
+        ersetzt = (resolver.resolve_chunk(chunk) for chunk in chunks)
 
         # --- 5. Speichern ---
         print(f"Speichere Datei unter: {OUTPUT_FILE}")
 
         # Wir speichern ohne Index. Da alles String ist, bleiben Formatierungen erhalten.
-        df_briefe.to_csv(OUTPUT_FILE, index=False, sep=',')
+        n_briefe = write_csv_chunks(ersetzt, OUTPUT_FILE, sep=',')
+        entfernt = resolver.finish()
+        print(f"{n_briefe} Briefe verarbeitet, davon {resolver.n_resolved} neu aufgelöst "
+              f"({entfernt} nicht mehr vorhandene entfernt, {time.perf_counter() - start:.1f} s).")
+
+        # --- 6. Berichte über nicht und nur über Namensvarianten aufgelöste Werte ---
+        report = resolver.unresolved_report()
+        variants = resolver.variant_report()
+        resolver.close()
+        if report.empty:
+            print("Alle Namen und Orte wurden aufgelöst.")
+        else:
+            report_file = os.path.splitext(OUTPUT_FILE)[0] + '_nicht_aufgeloest.csv'
+            report.to_csv(report_file, index=False, encoding='utf-8')
+            print(f"⚠️ {len(report)} Werte nicht aufgelöst ({report['BRIEFE'].sum()} Vorkommen), "
+                  f"Bericht unter: {report_file}")
+
+        if not variants.empty:
+            variants_file = os.path.splitext(OUTPUT_FILE)[0] + '_varianten.csv'
+            variants.to_csv(variants_file, index=False, encoding='utf-8')
+            print(f"⚠️ {len(variants)} Werte nur über eine Namensvariante aufgelöst "
+                  f"({variants['BRIEFE'].sum()} Vorkommen), bitte prüfen: {variants_file}")
 
         print("✅ Fertig! IDs wurden als Strings verarbeitet und ersetzt.")
 
@@ -1,11 +1,62 @@
 import pandas as pd
 import os
+import time
+
+from corpus import load_table
+from dates import parse_dates
+from tag_stats import CodedTags, tag_columns
+
+# Präfix der Ausgabedateien (eindeutige Tags pro Spalte und Statistiken)
+AUSGABE_PRAEFIX = "251204_NODEGOAT_"
+
+
+def safe_name(column_name):
+    """Spaltenname ohne Zeichen, die in Dateinamen ungültig sind."""
+    return "".join([c for c in column_name if c.isalnum() or c in ('_', '-')]).rstrip()
+
+
+def extract_all_tags(df, base_dir):
+    """
+    Batch-Modus: wertet alle TAG-* und NONOS-* Spalten in einem Durchlauf aus.
+    Schreibt pro Spalte die eindeutigen Tags (wie im Einzelmodus) sowie
+    Häufigkeiten, Häufigkeiten pro Jahr und die Tag-Kookkurrenz mit PMI.
+    """
+    columns = tag_columns(df)
+    if not columns:
+        print("❌ Fehler: Die Datei enthält keine TAG-* oder NONOS-* Spalten.")
+        return
+
+    print(f"⏳ Werte {len(columns)} Tag-Spalten aus: {', '.join(columns)}")
+    start = time.perf_counter()
+    tags = CodedTags(df, columns)
+    print(f"✨ {tags.n_tags} eindeutige Tags in {len(tags.codes)} Zuordnungen gefunden "
+          f"({time.perf_counter() - start:.1f} s).")
+
+    # Eindeutige Tags pro Spalte, dieselben Dateien wie im Einzelmodus
+    for column, group in tags.vocabulary.groupby('SPALTE', sort=False)['TAG']:
+        output_df = pd.DataFrame({column: group.sort_values().tolist()})
+        output_df.to_csv(os.path.join(base_dir, f"{AUSGABE_PRAEFIX}{safe_name(column)}.csv"), index=False)
+
+    outputs = {'Tag-Haeufigkeiten': tags.frequencies()}
+    if 'DATUM' in df.columns:
+        dates, _ = parse_dates(df['DATUM'])
+        outputs['Tag-Haeufigkeiten-Jahr'] = tags.year_frequencies(dates.dt.year)
+    else:
+        print("Keine Spalte DATUM vorhanden, Häufigkeiten pro Jahr werden übersprungen.")
+    outputs['Tag-Kookkurrenz'] = tags.cooccurrence()
+
+    print(f"🎉 Erfolg! Eindeutige Tags für {len(columns)} Spalten und folgende Statistiken gespeichert:")
+    for name, result in outputs.items():
+        output_filepath = os.path.join(base_dir, f"{AUSGABE_PRAEFIX}{name}.csv")
+        result.to_csv(output_filepath, index=False)
+        print(f"    {output_filepath} ({len(result)} Zeilen)")
 
 
 def extract_and_normalize_tags():
     """
     Fragt nach einer CSV-Datei und einer Spalte, extrahiert eindeutige Tags
-    (durch ", " getrennt) und speichert sie in einer neuen CSV-Datei.
+    (durch ", " getrennt) und speichert sie in einer neuen CSV-Datei. Ohne
+    Spaltenangabe werden alle Tag-Spalten im Batch-Modus ausgewertet.
     """
     # 📌 Definiere den Basis-Ordnerpfad
     BASE_DIR = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
@@ -18,7 +69,8 @@ def extract_and_normalize_tags():
     input_filepath = os.path.join(BASE_DIR, input_filename)
 
     # 📝 Fragt nach dem Spaltennamen
-    column_name = input("Bitte geben Sie den genauen Namen der Spalte ein, aus der die Tags extrahiert werden sollen: ")
+    column_name = input("Bitte geben Sie den genauen Namen der Spalte ein, aus der die Tags extrahiert werden sollen "
+                        "(leer lassen für alle TAG-*/NONOS-* Spalten mit Statistiken): ").strip()
 
     # --- 2. Datei einlesen und Fehlerbehandlung ---
     if not os.path.exists(input_filepath):
@@ -26,12 +78,17 @@ def extract_and_normalize_tags():
         return
 
     try:
-        df = pd.read_csv(input_filepath)
+        df = load_table(input_filepath)
         print(f"✅ Datei '{input_filename}' erfolgreich eingelesen.")
     except Exception as e:
         print(f"❌ Fehler beim Lesen der CSV-Datei: {e}")
         return
 
+    if not column_name:
+        extract_all_tags(df, BASE_DIR)
+        print("--- Tag-Extraktion abgeschlossen ---")
+        return
+
     if column_name not in df.columns:
         print(
             f"❌ Fehler: Die Spalte '{column_name}' existiert nicht in der Datei. Verfügbare Spalten: {list(df.columns)}")
@@ -42,7 +99,7 @@ def extract_and_normalize_tags():
 
     # Füllt leere (NaN) Werte in der Spalte mit einem leeren String auf,
     # damit .str.split() keine Fehler verursacht.
-    tags_series = df[column_name].fillna('')
+    tags_series = df[column_name].astype(object).fillna('')
 
     # Teilt jeden String in eine Liste von Tags auf (Trenner ist ", ")
     # .explode() macht aus jeder Liste eine einzelne Zeile pro Tag
@@ -61,8 +118,7 @@ def extract_and_normalize_tags():
 
     # 📝 Definiere den Ausgabedateinamen
     # Ersetze ungültige Zeichen im Spaltennamen für den Dateinamen
-    safe_column_name = "".join([c for c in column_name if c.isalnum() or c in ('_', '-')]).rstrip()
-    output_filename = f"251204_NODEGOAT_{safe_column_name}.csv"
+    output_filename = f"{AUSGABE_PRAEFIX}{safe_name(column_name)}.csv"
     output_filepath = os.path.join(BASE_DIR, output_filename)
 
     # Speichert das Ergebnis in einer neuen CSV-Datei
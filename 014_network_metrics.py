@@ -0,0 +1,65 @@
+import os
+import time
+
+import pandas as pd
+
+from corpus import load_table
+from csv_stream import detect_encoding
+from network import CorrespondenceGraph, join_metrics
+
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+
+# Standarddateien (leere Eingabe übernimmt diese Namen)
+BRIEFE_DATEI = '251204_NODEGOAT_Briefe.csv'
+PERSONEN_DATEI = '251204_NODEGOAT_Personen.csv'
+
+
+def main():
+    print("--- Netzwerk-Kennzahlen ---")
+    print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
+
+    briefe_name = input(f"Brief-CSV (leer lassen für '{BRIEFE_DATEI}'): ").strip() or BRIEFE_DATEI
+    personen_name = input(f"Personen-CSV (leer lassen für '{PERSONEN_DATEI}'): ").strip() or PERSONEN_DATEI
+
+    file_briefe = os.path.join(BASE_FOLDER, briefe_name)
+    file_personen = os.path.join(BASE_FOLDER, personen_name)
+
+    if not os.path.exists(file_briefe) or not os.path.exists(file_personen):
+        print("Fehler: Die Dateien wurden unter dem angegebenen Pfad nicht gefunden.")
+        return
+
+    # 1. Graph aus ABS-ID -> EMP-ID aufbauen
+    df_briefe = load_table(file_briefe)
+    graph = CorrespondenceGraph.from_letters(df_briefe)
+    print(f"{len(df_briefe)} Briefe geladen: {graph.n} Personen, {graph.n_edges} gerichtete Verbindungen.")
+
+    # 2. Kennzahlen berechnen
+    start = time.perf_counter()
+    metrics = graph.metrics_table()
+    print(f"Kennzahlen berechnet ({time.perf_counter() - start:.1f} s).")
+
+    # 3. Ergebnis als eigene Tabelle und an die Personen-Tabelle angehängt speichern
+    basis = os.path.splitext(personen_name)[0]
+    file_metrics = os.path.join(BASE_FOLDER, f"{basis}_Netzwerk_Kennzahlen.csv")
+    file_joined = os.path.join(BASE_FOLDER, f"{basis}_mit_Kennzahlen.csv")
+
+    metrics.sort_values('NETZ-PAGERANK', ascending=False).to_csv(file_metrics, index=False, encoding='utf-8')
+
+    df_pers = pd.read_csv(file_personen, sep=',', dtype=str, encoding=detect_encoding(file_personen))
+    join_metrics(df_pers, metrics).to_csv(file_joined, index=False, encoding='utf-8')
+
+    fehlend = (~metrics['PERSON-ID'].isin(df_pers['PERSON-ID'])).sum()
+    if fehlend:
+        print(f"Hinweis: {fehlend} IDs aus den Briefen fehlen in der Personen-Tabelle.")
+
+    print("\nTop 10 nach PageRank:")
+    print(metrics.nlargest(10, 'NETZ-PAGERANK')[['PERSON-ID', 'NETZ-GRAD', 'NETZ-PAGERANK', 'NETZ-BETWEENNESS']]
+          .to_string(index=False))
+
+    print(f"\nGespeichert:\n{file_metrics}\n{file_joined}")
+    print("Fertig!")
+
+
+if __name__ == "__main__":
+    main()
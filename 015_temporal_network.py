@@ -0,0 +1,67 @@
+import os
+import time
+
+from corpus import load_table, add_date_columns
+from network import sliding_window_metrics
+
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+
+# Standardwerte für das gleitende Zeitfenster
+FENSTER_JAHRE = 5
+SCHRITT_JAHRE = 1
+
+# Anzahl der zentralsten Personen, die pro Fenster ausgegeben werden
+TOP_N = 5
+
+
+def frage_zahl(text, standard):
+    """Fragt eine positive ganze Zahl ab (leere Eingabe = Standardwert)."""
+    while True:
+        eingabe = input(f"{text} (leer lassen für {standard}): ").strip()
+        if not eingabe:
+            return standard
+        try:
+            zahl = int(eingabe)
+            if zahl > 0:
+                return zahl
+        except ValueError:
+            pass
+        print("Ungültige Eingabe. Bitte geben Sie eine positive ganze Zahl ein.")
+
+
+def main():
+    print("--- Zeitfenster-Analyse des Korrespondenznetzwerks ---")
+    print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
+
+    file_name = input("Dateiname der Brief-CSV: ").strip()
+    file_path = os.path.join(BASE_FOLDER, file_name)
+
+    if not os.path.exists(file_path):
+        print(f"Fehler: Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
+        return
+
+    fenster = frage_zahl("Fensterbreite in Jahren", FENSTER_JAHRE)
+    schritt = frage_zahl("Schrittweite in Jahren", SCHRITT_JAHRE)
+
+    df = load_table(file_path, prepare=add_date_columns)
+    print(f"{len(df)} Briefe geladen. Berechne Zeitfenster ({fenster} Jahre, Schritt {schritt})...")
+
+    start = time.perf_counter()
+    ergebnis = sliding_window_metrics(df, fenster, schritt, TOP_N)
+    print(f"{len(ergebnis)} Zeitfenster berechnet ({time.perf_counter() - start:.1f} s).")
+
+    output_path = os.path.join(BASE_FOLDER, f"{os.path.splitext(file_name)[0]}_Zeitfenster_{fenster}J_{schritt}J.csv")
+    ergebnis.to_csv(output_path, index=False, encoding='utf-8')
+
+    if len(ergebnis):
+        print()
+        print(ergebnis[['FENSTER_START', 'FENSTER_ENDE', 'BRIEFE', 'KORRESPONDENTEN', 'VERBINDUNGEN', 'DICHTE']]
+              .to_string(index=False))
+
+    print(f"\nGespeichert unter:\n{output_path}")
+    print("Fertig!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import re
+import time
+
+from corpus import load_table, add_date_columns
+from fulltext import index_path, open_index, tokenize
+
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+
+# Anzahl der Treffer, die pro Suche angezeigt werden
+ANZEIGE_MAX = 20
+
+
+def main():
+    print("--- Volltextsuche in Transkriptionen und Beschreibungen ---")
+    print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
+
+    file_name = input("Dateiname der Brief-CSV: ").strip()
+    file_path = os.path.join(BASE_FOLDER, file_name)
+
+    if not os.path.exists(file_path):
+        print(f"Fehler: Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
+        return
+
+    df = load_table(file_path, prepare=add_date_columns)
+    start = time.perf_counter()
+    index = open_index(index_path(file_path), df)
+    print(f"{len(df)} Briefe geladen, Index bereit ({time.perf_counter() - start:.1f} s).")
+
+    print("\nSuche nach Wörtern (alle müssen vorkommen), \"Phrasen\" oder Präfixen wie 'schädel*'.")
+    print("Mit 'speichern' werden die Treffer der letzten Suche als CSV gespeichert, leere Eingabe beendet.")
+
+    last_query, last_ids = None, []
+    while True:
+        query = input("\nSuche: ").strip()
+        if not query:
+            break
+
+        if query.lower() == 'speichern':
+            if not last_query:
+                print("Es gibt noch keine Suche, deren Treffer gespeichert werden könnten.")
+                continue
+            slug = '-'.join(tokenize(last_query))[:40]
+            output_path = os.path.join(BASE_FOLDER, f"{os.path.splitext(file_name)[0]}_Volltext_{slug}.csv")
+            df[df['BRIEF-ID'].astype(str).isin(last_ids)].to_csv(output_path, index=False, encoding='utf-8')
+            print(f"{len(last_ids)} Briefe gespeichert unter:\n{output_path}")
+            continue
+
+        start = time.perf_counter()
+        last_query, last_ids = query, index.search(query)
+        print(f"{len(last_ids)} Briefe gefunden ({(time.perf_counter() - start) * 1000:.1f} ms).")
+
+        treffer = df[df['BRIEF-ID'].astype(str).isin(last_ids[:ANZEIGE_MAX])]
+        for brief_id, datum, titel in treffer[['BRIEF-ID', 'DATUM', 'BRIEF-TITEL']].itertuples(index=False):
+            titel = re.sub(r'\s+', ' ', str(titel))
+            print(f"  {brief_id}  {datum}  {titel}")
+        if len(last_ids) > ANZEIGE_MAX:
+            print(f"  ... und {len(last_ids) - ANZEIGE_MAX} weitere")
+
+    index.close()
+    print("Fertig!")
+
+
+if __name__ == "__main__":
+    main()
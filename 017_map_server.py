@@ -0,0 +1,291 @@
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+import webbrowser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import folium
+import numpy as np
+
+from borders import SharedBorders
+from corpus import load_letters
+from flow_cube import FlowCube
+from flows import SIDECAR_ON_EACH_FEATURE, flows_to_geojson, letter_sidecar_js
+from fulltext import index_path, open_index
+from person_index import PersonIndex
+
+networks = importlib.import_module('01_networks')
+
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+
+# --- Server ---
+# Nur lokal erreichbar; der Korpus wird einmal beim Start geladen
+HOST = '127.0.0.1'
+PORT = 8017
+
+# Anzahl der Abfrageergebnisse, die im Speicher gehalten werden (LRU)
+CACHE_GROESSE = 256
+
+# Ordner mit leaflet.js/leaflet.css (und optional Kacheln unter kacheln/{z}/{x}/{y}.png).
+# Der Server läuft vollständig offline: Leaflet wird nur von hier ausgeliefert, ohne
+# lokale Kacheln bleibt der Kartenhintergrund leer (die Grenzen dienen zur Orientierung).
+OFFLINE_ORDNER = os.path.join(BASE_FOLDER, 'offline')
+LEAFLET_DATEIEN = ('leaflet.js', 'leaflet.css')
+
+# Hintergrundfarbe der Karte ohne Kacheln
+HINTERGRUND = '#1a1a1a'
+
+ROLLEN = ('beide', 'abs', 'emp')
+
+# Eingabemaske über der Karte
+FORMULAR_HTML = """
+<div id="abfrage" style="position: fixed; top: 10px; right: 10px; z-index: 1000; background: white;
+     padding: 8px 10px; font: 13px sans-serif; border-radius: 4px; box-shadow: 0 1px 5px rgba(0,0,0,0.4);">
+  <form id="abfrage-form">
+    <label>Von <input name="start" type="number" value="%(start)d" style="width: 5em"></label>
+    <label>bis <input name="end" type="number" value="%(end)d" style="width: 5em"></label><br>
+    <label>Schlagwort <input name="kw" placeholder="z.B. literaturversand"></label><br>
+    <label>Person <input name="person" placeholder="Name oder ID"></label>
+    <select name="rolle">
+      <option value="beide">als Absender oder Empfänger</option>
+      <option value="abs">als Absender</option>
+      <option value="emp">als Empfänger</option>
+    </select><br>
+    <label>Volltext <input name="text" placeholder='z.B. "schädel aus mauer"'></label><br>
+    <button type="submit">Anzeigen</button> <span id="abfrage-status"></span>
+  </form>
+</div>
+"""
+
+# Lädt die Routen einer Abfrage vom Server und ersetzt die bisherige Ebene
+ABFRAGE_SCRIPT = """
+(function () {
+    var karte = %(karte)s;
+    var ebene = null;
+    var status = document.getElementById('abfrage-status');
+    var beiKlick = %(on_each_feature)s;
+    var form = document.getElementById('abfrage-form');
+    form.addEventListener('submit', function (e) {
+        e.preventDefault();
+        var parameter = new URLSearchParams(new FormData(form));
+        status.textContent = 'lädt...';
+        fetch('/flows?' + parameter.toString())
+            .then(function (antwort) { return antwort.json(); })
+            .then(function (daten) {
+                if (daten.fehler) {
+                    status.textContent = daten.fehler;
+                    return;
+                }
+                if (ebene) {
+                    karte.removeLayer(ebene);
+                }
+                ebene = L.geoJSON(daten.geojson, {
+                    style: function (feature) {
+                        return {color: feature.properties.color, weight: feature.properties.weight,
+                                opacity: feature.properties.opacity};
+                    },
+                    onEachFeature: beiKlick
+                }).addTo(karte);
+                status.textContent = daten.briefe + ' Briefe, ' + daten.routen + ' Routen';
+            });
+    });
+    form.dispatchEvent(new Event('submit'));
+})();
+"""
+
+
+class FlowService:
+    """
+    Hält den vorbereiteten Korpus und den Würfel im Speicher und beantwortet
+    Abfragen (Zeitraum, Schlagwort, Person als Absender/Empfänger, Volltext in
+    TRANSK/BESCHR) mit den aggregierten Routen als GeoJSON. Ergebnisse werden pro Abfrage im LRU-Cache
+    gehalten, Wiederholungen kosten nur ein Nachschlagen.
+    """
+
+    def __init__(self, df, cube, historic_borders=None, text_index=None, cache_size=CACHE_GROESSE):
+        self.df = df
+        self.cube = cube
+        self.historic_borders = historic_borders
+        self.text_index = text_index
+        self._text_lock = threading.Lock()
+        years = df['DATUM_JAHR'].dropna()
+        self.min_year = int(years.min()) if len(years) else 1800
+        self.max_year = int(years.max()) if len(years) else 1950
+
+        self.person_index = PersonIndex(df)
+
+        self.query = functools.lru_cache(maxsize=cache_size)(self._query)
+        self._page = None
+        self._sidecar = None
+
+    def _query(self, start_year, end_year, keyword='', person='', rolle='beide', text=''):
+        positions = self.cube.letter_positions(start_year, end_year, keyword)
+        if person:
+            positions = np.intersect1d(positions, self.person_index.rows(person, rolle), assume_unique=True)
+        if text and self.text_index is not None:
+            with self._text_lock:
+                text_mask = self.text_index.mask(self.df, text)
+            positions = positions[text_mask[positions]]
+        flows = self.cube.flows(start_year, end_year, keyword, positions)
+        antwort = {
+            'briefe': int(len(positions)),
+            'routen': int(len(flows)),
+            'geojson': flows_to_geojson(flows),
+        }
+        return json.dumps(antwort, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def page(self):
+        """Basiskarte mit Eingabemaske (einmal erzeugt)."""
+        if self._page is None:
+            self._page = self._render_page().encode('utf-8')
+        return self._page
+
+    def sidecar(self):
+        """Brief-Details für die Popups (einmal erzeugt)."""
+        if self._sidecar is None:
+            self._sidecar = letter_sidecar_js(self.df).encode('utf-8')
+        return self._sidecar
+
+    def _render_page(self):
+        m = folium.Map(location=[49.40768, 8.69079], zoom_start=6, tiles=None)
+        if os.path.isdir(os.path.join(OFFLINE_ORDNER, 'kacheln')):
+            folium.TileLayer('/offline/kacheln/{z}/{x}/{y}.png', attr='Lokale Kacheln').add_to(m)
+        else:
+            m.get_root().header.add_child(folium.Element(
+                f'<style>.leaflet-container {{ background: {HINTERGRUND}; }}</style>'))
+
+        # Nur Leaflet wird benötigt, ausschließlich aus dem Offline-Ordner (siehe missing_assets)
+        m.default_js = [('leaflet', '/offline/leaflet.js')]
+        m.default_css = [('leaflet_css', '/offline/leaflet.css')]
+
+        # Vereinfachte Grenzen aus der gemeinsamen Grenzdatei (siehe 01_networks.load_historic_borders)
+        if self.historic_borders is not None:
+            SharedBorders('/grenzen/' + self.historic_borders).add_to(m)
+
+        root = m.get_root()
+        root.html.add_child(folium.Element(FORMULAR_HTML % {'start': self.min_year, 'end': self.max_year}))
+        root.script.add_child(folium.Element(ABFRAGE_SCRIPT % {
+            'karte': m.get_name(),
+            'on_each_feature': SIDECAR_ON_EACH_FEATURE % json.dumps('/briefe.js'),
+        }))
+        return root.render()
+
+    def parse_query(self, query_string):
+        """Prüft und normalisiert die Parameter von /flows (gleiche Abfrage -> gleicher Cache-Schlüssel)."""
+        params = {k: v[-1].strip() for k, v in parse_qs(query_string).items()}
+        try:
+            start_year = int(params.get('start') or self.min_year)
+            end_year = int(params.get('end') or self.max_year)
+        except ValueError:
+            raise ValueError("Start- und Endjahr müssen ganze Zahlen sein.")
+        if start_year > end_year:
+            raise ValueError("Das Startjahr muss vor oder gleich dem Endjahr liegen.")
+        rolle = params.get('rolle') or 'beide'
+        if rolle not in ROLLEN:
+            raise ValueError(f"Unbekannte Rolle '{rolle}' (erlaubt: {', '.join(ROLLEN)}).")
+        return (start_year, end_year, params.get('kw', '').lower(), params.get('person', '').lower(), rolle,
+                params.get('text', ''))
+
+
+def missing_assets():
+    """Fehlende Leaflet-Dateien im Offline-Ordner."""
+    return [name for name in LEAFLET_DATEIEN if not os.path.isfile(os.path.join(OFFLINE_ORDNER, name))]
+
+
+class MapRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path):
+        # Nur Dateien innerhalb des Offline-Ordners ausliefern
+        full_path = os.path.realpath(os.path.join(OFFLINE_ORDNER, path))
+        if not full_path.startswith(os.path.realpath(OFFLINE_ORDNER) + os.sep) or not os.path.isfile(full_path):
+            self._send(404, b'Nicht gefunden', 'text/plain; charset=utf-8')
+            return
+        content_type = {'.js': 'application/javascript', '.css': 'text/css',
+                        '.png': 'image/png'}.get(os.path.splitext(full_path)[1], 'application/octet-stream')
+        with open(full_path, 'rb') as f:
+            self._send(200, f.read(), content_type)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/':
+            self._send(200, self.service.page(), 'text/html; charset=utf-8')
+        elif url.path == '/flows':
+            start = time.perf_counter()
+            try:
+                key = self.service.parse_query(url.query)
+            except ValueError as e:
+                body = json.dumps({'fehler': str(e)}, ensure_ascii=False).encode('utf-8')
+                self._send(400, body, 'application/json; charset=utf-8')
+                return
+            self._send(200, self.service.query(*key), 'application/json; charset=utf-8')
+            print(f"Abfrage {key}: {(time.perf_counter() - start) * 1000:.1f} ms")
+        elif url.path == '/briefe.js':
+            self._send(200, self.service.sidecar(), 'application/javascript; charset=utf-8')
+        elif url.path == '/grenzen/' + str(self.service.historic_borders):
+            with open(os.path.join(BASE_FOLDER, self.service.historic_borders), 'rb') as f:
+                self._send(200, f.read(), 'application/javascript; charset=utf-8')
+        elif url.path.startswith('/offline/'):
+            self._send_file(url.path[len('/offline/'):])
+        else:
+            self._send(404, b'Nicht gefunden', 'text/plain; charset=utf-8')
+
+    def log_message(self, format, *args):
+        # Zugriffe nicht einzeln protokollieren, Abfragezeiten werden in do_GET ausgegeben
+        pass
+
+
+def main():
+    print("--- Lokaler Karten-Server ---")
+    print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
+
+    missing = missing_assets()
+    if missing:
+        print(f"❌ Fehler: {', '.join(missing)} fehlt im Ordner '{OFFLINE_ORDNER}'.")
+        print("Der Server lädt nichts aus dem Internet. Bitte Leaflet 1.9.3 einmalig herunterladen "
+              "(https://leafletjs.com/download.html) und leaflet.js und leaflet.css dort ablegen.")
+        return
+    file_name = input("Dateiname der Brief-CSV: ").strip()
+    file_path = os.path.join(BASE_FOLDER, file_name)
+
+    if not os.path.exists(file_path):
+        print(f"Fehler: Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
+        return
+
+    df = load_letters(file_path)
+    df, tag_index = networks.prepare_corpus(df)
+    cube = FlowCube.load(file_path, df, networks.TAG_SPALTEN, by='FARBE')
+    print(f"{len(df)} Briefe geladen.")
+
+    text_index = open_index(index_path(file_path), df)
+
+    MapRequestHandler.service = FlowService(df, cube, networks.load_historic_borders(df), text_index)
+    server = ThreadingHTTPServer((HOST, PORT), MapRequestHandler)
+    url = f"http://{HOST}:{PORT}/"
+    print(f"Server läuft unter {url} (Beenden mit Strg+C)")
+    webbrowser.open(url)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        text_index.close()
+    print("Server beendet.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import time
+
+import pandas as pd
+
+from csv_stream import detect_encoding
+from entity_resolution import suggest_person_merges, suggest_place_merges
+
+# --- Pfad-Definitionen (wie in 012_replace_names_with_IDs.py) ---
+PERSON_MAPPING_FILE = r'D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten\251128_Person-IDs.csv'
+PLACE_MAPPING_FILE = r'D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten\251128_Places_with_Geoname-IDs.csv'
+
+# Bericht der nicht aufgelösten Werte aus 012_replace_names_with_IDs.py (optional);
+# diese Werte werden ohne ID mit abgeglichen, um fehlende Varianten zu finden
+UNRESOLVED_FILE = r'D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten\251128_NODEGOAT_Briefe_nicht_aufgeloest.csv'
+
+
+def with_unresolved(df, name_column, id_column, report, columns):
+    """Hängt die nicht aufgelösten Werte der angegebenen Briefspalten (ohne ID) an die Mapping-Tabelle an."""
+    if report is None:
+        return df
+    values = report.loc[report['SPALTE'].isin(columns), 'WERT'].dropna().unique()
+    return pd.concat([df[[name_column, id_column]], pd.DataFrame({name_column: values})], ignore_index=True)
+
+
+def write_suggestions(suggestions, mapping_file, label):
+    output_file = os.path.splitext(mapping_file)[0] + '_Vorschlaege.csv'
+    suggestions.to_csv(output_file, index=False, encoding='utf-8')
+    print(f"{len(suggestions)} Vorschläge für {label} gespeichert unter:\n{output_file}")
+
+
+def main():
+    print("--- Zusammenführungsvorschläge für Personen und Orte ---")
+
+    try:
+        df_persons = pd.read_csv(PERSON_MAPPING_FILE, sep=',', dtype=str, encoding=detect_encoding(PERSON_MAPPING_FILE))
+        df_places = pd.read_csv(PLACE_MAPPING_FILE, sep=',', dtype=str, encoding=detect_encoding(PLACE_MAPPING_FILE))
+
+        report = None
+        if os.path.exists(UNRESOLVED_FILE):
+            report = pd.read_csv(UNRESOLVED_FILE, dtype=str, encoding='utf-8')
+            print(f"{len(report)} nicht aufgelöste Werte aus dem letzten Lauf werden mit abgeglichen.")
+
+        start = time.perf_counter()
+        persons = suggest_person_merges(with_unresolved(df_persons, 'KORR-NAME', 'PERSON-ID', report,
+                                                        ['ABS-ID', 'EMP-ID']))
+        print(f"Personen verglichen ({time.perf_counter() - start:.1f} s).")
+        write_suggestions(persons, PERSON_MAPPING_FILE, 'Personen')
+
+        start = time.perf_counter()
+        places = suggest_place_merges(with_unresolved(df_places, 'ORT-NAME', 'ORT-GEONAMES', report,
+                                                      ['ABS-GEONAMES', 'EMP-GEONAMES']))
+        print(f"Orte verglichen ({time.perf_counter() - start:.1f} s).")
+        write_suggestions(places, PLACE_MAPPING_FILE, 'Orte')
+
+        print("✅ Fertig! Die Vorschläge müssen vor dem Übernehmen geprüft werden.")
+
+    except FileNotFoundError as e:
+        print(f"❌ Fehler: Datei nicht gefunden. {e}")
+    except KeyError as e:
+        print(f"❌ Fehler: Spaltenname nicht gefunden. {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,215 +1,325 @@
-import pandas as pd
 import folium
 import math
 import os
-import json  # Für die Verarbeitung der GeoJSON-Datei
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-print("Starte Skript...")
+from borders import SharedBorders, shared_borders_file
+from corpus import load_letters
+from flow_cube import FlowCube
+from flows import aggregate_flows, add_flows, write_letter_sidecar
+from fulltext import index_path, open_index, tokenize
+from tag_index import TagIndex
+from tag_vocab import load_vocabulary
 
+# --- Fester Ordnerpfad ---
+BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
 
-# --- SCHRITT 1: DATEN LADEN UND VORBEREITEN (PANDAS) ---
+# --- Darstellung der Briefverbindungen ---
+# 'geojson': eine GeoJSON-Ebene pro Layer, Brief-Details in einer Side-Car-Datei neben der Karte
+# 'polyline': eine folium.PolyLine pro Route mit eingebettetem Popup
+KARTEN_MODUS = 'geojson'
 
-def parse_coords(coord_str):
-    """
-    Konvertiert einen Koordinaten-String "lat, lon" in ein Tupel (lat, lon).
-    Behandelt fehlende, ungültige und reine Text-Werte robust.
-    """
-    if pd.isna(coord_str):
-        return None
+# --- Batch-Modus ---
+# Anzahl paralleler Prozesse beim Erstellen mehrerer Karten (None = alle CPU-Kerne)
+BATCH_PROZESSE = None
 
-    cleaned_str = str(coord_str).replace(' ', '')
+# --- Vorberechneter Würfel ---
+# Jahr × Tag × Route einmal pro Korpus berechnen (neben der CSV gespeichert) und
+# Karten aus dessen Zellen statt durch Filtern aller Briefe erstellen
+WUERFEL = True
 
-    if ',' not in cleaned_str:
-        return None
+# --- Historisches Grenz-Overlay ---
+# world_1914.geojson wird einmal vereinfacht (Toleranz und Rand in Grad, gerundet auf
+# GRENZEN_STELLEN Nachkommastellen), auf die Briefkoordinaten zugeschnitten und als gemeinsame
+# Datei neben den Karten abgelegt, statt die Geometrie in jede Karte einzubetten
+GRENZEN_TOLERANZ = 0.02
+GRENZEN_STELLEN = 3
+GRENZEN_RAND = 5
 
-    try:
-        parts = cleaned_str.split(',')
-        if len(parts) != 2:
-            return None
+# Tag-Spalten, die für den Schlagwortfilter durchsucht werden
+TAG_SPALTEN = ['TAG-FACH', 'TAG-FUNK', 'TAG-INH']
 
-        lat = float(parts[0])
-        lon = float(parts[1])
 
-        if -90 <= lat <= 90 and -180 <= lon <= 180:
-            return (lat, lon)
-        else:
-            return None
+# --- SCHRITT 1: DATEN LADEN UND VORBEREITEN (PANDAS) ---
 
-    except ValueError:
-        return None
-    except Exception:
-        return None
+# Logik für die Einfärbung der Linien basierend auf den Tags.
+# Die erste zutreffende Regel bestimmt die Farbe, sonst 'blue'. Geprüft werden kanonische
+# Tags samt Oberbegriffen (siehe tag_aliases.csv, z.B. Archäologe -> Archäologie),
+# keine Teilstrings.
+FARB_REGELN = [
+    ('red', [('TAG-FACH', 'Archäologie'), ('TAG-FUNK', 'Archäologie')]),
+    ('green', [('TAG-FACH', 'Geologie'), ('TAG-FUNK', 'Geologie')]),
+    ('purple', [('TAG-FACH', 'Medizin'), ('TAG-FUNK', 'Medizin')]),
+]
 
 
-# --- Fester Ordnerpfad ---
-BASE_FOLDER = r"D:\OneDrive - Universität Heidelberg\Studium\Veranstaltungen\19-WiSe25-HIS-MA Masterarbeit\Quellen\Daten"
+def prepare_corpus(df):
+    """
+    Berechnet einmal pro Korpus alles, was jede Karte benötigt: den Tag-Index
+    für den Schlagwortfilter und die Linienfarbe jedes Briefs.
+    """
+    vocabulary = load_vocabulary(BASE_FOLDER)
+    vocabulary.warn_unassigned(dict.fromkeys(category for _, checks in FARB_REGELN for _, category in checks))
+    tag_index = TagIndex(df, TAG_SPALTEN, vocabulary)
+    df['FARBE'] = tag_index.select(FARB_REGELN, default='blue')
+    return df, tag_index
 
-print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
-print("Bitte geben Sie den Dateinamen Ihrer CSV-Datei ein (inkl. .csv Endung).")
-file_name = input("Dateiname: ")
 
-# --- Kombinieren von Ordner und Dateiname ---
-file_path = os.path.join(BASE_FOLDER, file_name)
+def filter_letters(df, tag_index, start_year, end_year, keyword_filter='', text_mask=None):
+    """
+    Wendet Datums- und (optional) Schlagwortfilter auf den vorbereiteten Korpus an.
+    text_mask: optionale Maske der Treffer einer Volltextsuche (siehe fulltext.py).
+    """
+    mask = ((df['DATUM_JAHR'] >= start_year) & (df['DATUM_JAHR'] <= end_year)).to_numpy()
 
-# Laden der CSV-Datei
-try:
-    df = pd.read_csv(file_path)
-    print(f"CSV-Datei '{file_path}' erfolgreich geladen. {len(df)} Zeilen gefunden.")
+    # Filterung auf alle drei Tag-Spalten (FACH, FUNK, INH) über den Tag-Index
+    if keyword_filter:
+        mask = mask & tag_index.mask(keyword_filter, TAG_SPALTEN)
 
-    df['DATUM_DATE'] = pd.to_datetime(df['DATUM'], errors='coerce')
+    if text_mask is not None:
+        mask = mask & text_mask
 
-except FileNotFoundError:
-    print(f"--- FEHLER ---")
-    print(f"Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
-    print("Bitte überprüfen Sie die Schreibweise des Dateinamens und des Pfades.")
-    exit()
-except Exception as e:
-    print(f"Ein unerwarteter Fehler ist beim Laden der Datei aufgetreten: {e}")
-    exit()
+    return df[mask]
 
-# Anwenden der robusteren Parsing-Funktion auf die Koordinatenspalten
-df['ABS_KOOR_TUPLE'] = df['ABS-KOOR'].apply(parse_coords)
-df['EMP_KOOR_TUPLE'] = df['EMP-KOOR'].apply(parse_coords)
 
-# --- ABFRAGE UND ANWENDUNG DES DATUMS-FILTERS ---
+def load_historic_borders(df=None):
+    """
+    Bereitet das historische GeoJSON-Overlay vor (vereinfacht und auf die
+    Koordinaten der Briefe in df zugeschnitten, siehe borders.py) und gibt den
+    Dateinamen der gemeinsamen Grenzdatei im BASE_FOLDER zurück (oder None,
+    falls world_1914.geojson fehlt).
+    """
+    geojson_path = os.path.join(BASE_FOLDER, 'world_1914.geojson')
 
-while True:
     try:
-        start_year = int(input("\nFilter 1/2: Geben Sie das Startjahr (z.B. 1890) ein: "))
-        end_year = int(input("Filter 1/2: Geben Sie das Endjahr (z.B. 1910) ein: "))
-        if start_year <= end_year and start_year > 1800:
-            break
-        else:
-            print("Ungültiger Zeitraum. Das Startjahr muss vor oder gleich dem Endjahr liegen.")
-    except ValueError:
-        print("Ungültige Eingabe. Bitte geben Sie eine ganze Zahl (Jahr) ein.")
+        return shared_borders_file(geojson_path, BASE_FOLDER, df, tolerance=GRENZEN_TOLERANZ,
+                                   decimals=GRENZEN_STELLEN, padding=GRENZEN_RAND)
+    except FileNotFoundError:
+        print(
+            f"\nWARNUNG: GeoJSON-Datei '{os.path.basename(geojson_path)}' nicht gefunden. Bitte stellen Sie sicher, dass sie im Ordner '{BASE_FOLDER}' liegt.")
+    except Exception as e:
+        print(f"\nFEHLER beim Laden des GeoJSON-Overlays: {e}")
+    return None
+
+
+def output_filename_for(start_year, end_year, keyword_filter='', text_query=''):
+    suffix = ''
+    if text_query:
+        # Volltextanfrage in eine dateinamentaugliche Form bringen (nur die gefalteten Wörter)
+        suffix = '_volltext-' + '-'.join(tokenize(text_query))[:40]
+    if keyword_filter:
+        return f"briefnetzwerk_karte_{start_year}-{end_year}_{keyword_filter}{suffix}.html"
+    return f"briefnetzwerk_karte_{start_year}-{end_year}_alle{suffix}.html"
 
-print(f"Wende Datumsfilter an: {start_year} bis {end_year}...")
-df_filtered = df[(df['DATUM_DATE'].dt.year >= start_year) &
-                 (df['DATUM_DATE'].dt.year <= end_year)].copy()
 
-print(f"Nach Datumsfilterung: {len(df_filtered)} Briefe verbleiben.")
+# --- SCHRITT 2: KARTE ERSTELLEN UND LINIEN ZEICHNEN (FOLIUM) ---
 
-# --- ABFRAGE UND ANWENDUNG DES SCHLAGWORT-FILTERS (Filter 2/2) ---
+def render_map(df, tag_index, start_year, end_year, keyword_filter='', historic_borders=None, cube=None,
+               text_query='', text_mask=None):
+    """
+    Erstellt die Karte für einen Zeitraum und ein Schlagwort aus dem
+    vorbereiteten Korpus und speichert sie im BASE_FOLDER. Mit cube
+    (flow_cube.FlowCube) werden Briefe und Routen aus dem Würfel abgefragt.
+    text_mask schränkt auf die Treffer der Volltextanfrage text_query ein.
+    Gibt den Pfad der Karte und die Anzahl der gezeichneten Briefe zurück.
+    """
+    if cube is not None:
+        positions = cube.letter_positions(start_year, end_year, keyword_filter)
+        if text_mask is not None:
+            positions = positions[text_mask[positions]]
+        df_filtered = df.iloc[positions]
+        # Briefe mit identischer Route und Farbe sind im Würfel bereits gebündelt
+        flows = cube.flows(start_year, end_year, keyword_filter, positions)
+    else:
+        df_filtered = filter_letters(df, tag_index, start_year, end_year, keyword_filter, text_mask)
+        # Briefe mit identischer Route und Farbe zu einer Linie bündeln
+        flows = aggregate_flows(df_filtered, by='FARBE')
 
-print(
-    "\nFilter 2/2: Optional können Sie die Verbindungen zusätzlich nach einem Schlagwort in TAG-FACH, TAG-FUNK oder TAG-INH eingrenzen (z.B. 'archäologie' oder 'literaturversand').")
-keyword_filter = input("Schlagwort (leer lassen für alle): ").lower().strip()
+    # Den Mittelpunkt der Karte festlegen (z.B. Heidelberg)
+    map_center = [49.40768, 8.69079]
 
-# Wenn ein Schlagwort eingegeben wurde, filtere den bereits nach Datum gefilterten DataFrame
-if keyword_filter:
-    print(f"Wende Schlagwortfilter an: '{keyword_filter}'...")
+    # Hintergrund: CartoDB DarkMatter für minimalen visuellen Konflikt
+    m = folium.Map(location=map_center, zoom_start=6, tiles="CartoDB dark_matter")
 
-    # KORREKTUR: Filterung auf alle drei Tag-Spalten (FACH, FUNK, INH) erweitert.
-    df_filtered = df_filtered[
-        df_filtered['TAG-FACH'].astype(str).str.lower().str.contains(keyword_filter, na=False) |
-        df_filtered['TAG-FUNK'].astype(str).str.lower().str.contains(keyword_filter, na=False) |
-        df_filtered['TAG-INH'].astype(str).str.lower().str.contains(keyword_filter, na=False)
-        ].copy()
+    # --- Hinzufügen des historischen GeoJSON-Overlays ---
+    # Die Karte verweist auf die gemeinsame Grenzdatei (historic_borders, Dateiname im BASE_FOLDER)
+    if historic_borders is not None:
+        SharedBorders(historic_borders).add_to(m)
 
-    print(f"Nach Schlagwort-Filterung: {len(df_filtered)} Briefe verbleiben.")
+        folium.LayerControl().add_to(m)
 
+    # Dateinamen der Karte und der Side-Car-Datei mit den Brief-Details
+    output_filename = output_filename_for(start_year, end_year, keyword_filter, text_query)
+    sidecar_filename = output_filename.replace('.html', '_briefe.js') if KARTEN_MODUS == 'geojson' else None
 
-# --- SCHRITT 2: KARTE ERSTELLEN UND LINIEN ZEICHNEN (FOLIUM) ---
+    add_flows(m, flows, weight=2, opacity=0.7, mode=KARTEN_MODUS, sidecar=sidecar_filename)
 
-def get_line_color(row):
-    """
-    Definiert die Logik für die Einfärbung der Linien basierend auf den Tags.
-    """
-    tag_fach = str(row['TAG-FACH']).lower()
-    tag_funk = str(row['TAG-FUNK']).lower()
+    # --- Speicherung im BASE_FOLDER ---
+    output_path = os.path.join(BASE_FOLDER, output_filename)
 
-    if 'archäologie' in tag_fach or 'archäologe' in tag_funk:
-        return 'red'
-    if 'geologie' in tag_fach or 'geologe' in tag_funk or 'paläontologe' in tag_funk:
-        return 'green'
-    if 'medizin' in tag_fach or 'anthropologe' in tag_funk:
-        return 'purple'
+    # Speichern der fertigen Karte als HTML-Datei
+    m.save(output_path)
 
-    return 'blue'
+    if sidecar_filename:
+        write_letter_sidecar(df_filtered, os.path.join(BASE_FOLDER, sidecar_filename))
 
+    return output_path, len(df_filtered)
 
-# Den Mittelpunkt der Karte festlegen (z.B. Heidelberg)
-map_center = [49.40768, 8.69079]
 
-# Hintergrund: CartoDB DarkMatter für minimalen visuellen Konflikt
-m = folium.Map(location=map_center, zoom_start=6, tiles="CartoDB dark_matter")
+# --- BATCH-MODUS: VIELE KARTEN AUS EINEM KORPUS ---
 
-# --- Laden und Hinzufügen des historischen GeoJSON-Overlays ---
+_worker_corpus = None
+_worker_tag_index = None
+_worker_borders = None
+_worker_cube = None
 
-geojson_path = os.path.join(BASE_FOLDER, 'world_1914.geojson')
 
-try:
-    with open(geojson_path, 'r', encoding='utf-8') as f:
-        historic_borders = json.load(f)
+def _init_worker(df, tag_index, historic_borders, cube=None):
+    """Übergibt Korpus, Tag-Index, Grenzen und Würfel einmal pro Prozess statt einmal pro Karte."""
+    global _worker_corpus, _worker_tag_index, _worker_borders, _worker_cube
+    _worker_corpus = df
+    _worker_tag_index = tag_index
+    _worker_borders = historic_borders
+    _worker_cube = cube
 
-    # GeoJSON als Overlay hinzufügen
-    folium.GeoJson(
-        historic_borders,
-        name='Historische Grenzen (1914)',
-        style_function=lambda x: {
-            'fillColor': 'none',
-            'color': 'white',  # Weiße Linien für guten Kontrast
-            'weight': 1.5,
-            'dashArray': '5, 5',
-            'opacity': 0.9
-        },
-        tooltip=folium.GeoJsonTooltip(fields=['NAME'], aliases=['Land:'])
-    ).add_to(m)
 
-    folium.LayerControl().add_to(m)
+def _render_worker(spec):
+    return render_map(_worker_corpus, _worker_tag_index, *spec, historic_borders=_worker_borders,
+                      cube=_worker_cube)
 
 
-except FileNotFoundError:
-    print(
-        f"\nWARNUNG: GeoJSON-Datei '{os.path.basename(geojson_path)}' nicht gefunden. Bitte stellen Sie sicher, dass sie im Ordner '{BASE_FOLDER}' liegt.")
-except Exception as e:
-    print(f"\nFEHLER beim Laden des GeoJSON-Overlays: {e}")
+def read_batch_specs(spec_path):
+    """
+    Liest die Kartenliste für den Batch-Modus. Jede Zeile der Datei hat die Form
+    'Startjahr,Endjahr[,Schlagwort]', z.B. '1890,1899,archäologie'.
+    Ungültige Zeilen (z.B. eine Kopfzeile) werden mit Zeilennummer gemeldet und übersprungen.
+    """
+    specs = []
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            parts = [p.strip() for p in line.split(',')]
+            if not parts[0] or parts[0].startswith('#'):
+                continue
+            if len(parts) < 2:
+                print(f"Zeile {line_number} übersprungen: Startjahr und Endjahr erwartet, gefunden '{line.strip()}'.")
+                continue
+            try:
+                start_year, end_year = int(parts[0]), int(parts[1])
+            except ValueError:
+                print(f"Zeile {line_number} übersprungen: Start- und Endjahr müssen ganze Zahlen sein, "
+                      f"gefunden '{line.strip()}'.")
+                continue
+            if start_year > end_year:
+                print(f"Zeile {line_number} übersprungen: Das Startjahr muss vor oder gleich dem Endjahr liegen.")
+                continue
+            keyword = parts[2].lower() if len(parts) > 2 else ''
+            specs.append((start_year, end_year, keyword))
+    return specs
+
+
+def render_batch(df, tag_index, specs, historic_borders=None, max_workers=BATCH_PROZESSE, cube=None):
+    """
+    Erstellt alle Karten aus specs [(start_year, end_year, keyword), ...]
+    parallel in einem Prozess-Pool. Der Korpus wird nur einmal geladen und
+    vorbereitet und an jeden Prozess einmalig übergeben.
+    """
+    output_paths = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(df, tag_index, historic_borders, cube)) as executor:
+        futures = {executor.submit(_render_worker, spec): spec for spec in specs}
+        for future in as_completed(futures):
+            start_year, end_year, keyword_filter = futures[future]
+            output_path, anzahl = future.result()
+            print(f"Karte {start_year}-{end_year} ({keyword_filter or 'alle'}): {anzahl} Briefe -> {output_path}")
+            output_paths.append(output_path)
+    return output_paths
 
-print("Karte initialisiert. Zeichne Briefverbindungen...")
 
-# Iterieren durch den GEFILTERTEN DataFrame
-for index, row in df_filtered.iterrows():
+def main():
+    print("Starte Skript...")
 
-    start_coords = row['ABS_KOOR_TUPLE']
-    end_coords = row['EMP_KOOR_TUPLE']
+    print(f"Das Skript sucht im folgenden Ordner nach Dateien:\n{BASE_FOLDER}\n")
+    print("Bitte geben Sie den Dateinamen Ihrer CSV-Datei ein (inkl. .csv Endung).")
+    file_name = input("Dateiname: ")
 
-    if not start_coords or not end_coords:
-        continue
+    # --- Kombinieren von Ordner und Dateiname ---
+    file_path = os.path.join(BASE_FOLDER, file_name)
 
-    line_color = get_line_color(row)
+    # Laden der CSV-Datei
+    try:
+        df = load_letters(file_path)
+        print(f"CSV-Datei '{file_path}' erfolgreich geladen. {len(df)} Zeilen gefunden.")
+
+    except FileNotFoundError:
+        print(f"--- FEHLER ---")
+        print(f"Die Datei '{file_name}' wurde im Ordner '{BASE_FOLDER}' nicht gefunden.")
+        print("Bitte überprüfen Sie die Schreibweise des Dateinamens und des Pfades.")
+        exit()
+    except Exception as e:
+        print(f"Ein unerwarteter Fehler ist beim Laden der Datei aufgetreten: {e}")
+        exit()
+
+    df, tag_index = prepare_corpus(df)
+    cube = FlowCube.load(file_path, df, TAG_SPALTEN, by='FARBE') if WUERFEL else None
+
+    # --- OPTIONAL: BATCH-MODUS ---
+
+    print("\nOptional: Dateiname einer Batch-Datei mit einer Karte pro Zeile ('Startjahr,Endjahr[,Schlagwort]').")
+    batch_name = input("Batch-Datei (leer lassen für eine einzelne Karte): ").strip()
+
+    if batch_name:
+        specs = read_batch_specs(os.path.join(BASE_FOLDER, batch_name))
+        if not specs:
+            print(f"Fehler: Die Batch-Datei '{batch_name}' enthält keine gültige Zeile.")
+            return
+        print(f"Erstelle {len(specs)} Karten im Batch-Modus...")
+        output_paths = render_batch(df, tag_index, specs, load_historic_borders(df), cube=cube)
+
+        print(f"--- FERTIG ---")
+        print(f"{len(output_paths)} Karten wurden im Ordner '{BASE_FOLDER}' gespeichert.")
+        return
+
+    # --- ABFRAGE DES DATUMS-FILTERS ---
+
+    while True:
+        try:
+            start_year = int(input("\nFilter 1/2: Geben Sie das Startjahr (z.B. 1890) ein: "))
+            end_year = int(input("Filter 1/2: Geben Sie das Endjahr (z.B. 1910) ein: "))
+            if start_year <= end_year and start_year > 1800:
+                break
+            else:
+                print("Ungültiger Zeitraum. Das Startjahr muss vor oder gleich dem Endjahr liegen.")
+        except ValueError:
+            print("Ungültige Eingabe. Bitte geben Sie eine ganze Zahl (Jahr) ein.")
+
+    # --- ABFRAGE DES SCHLAGWORT-FILTERS (Filter 2/2) ---
 
-    popup_text = f"""
-    <b>Brief-ID:</b> {row['BRIEF-ID']}<br><br>
-    <b>Von:</b> {row['ABS-NAME']} ({row['ABS-ORT']})<br>
-    <b>An:</b> {row['EMP-NAME']} ({row['EMP-ORT']})<br>
-    <b>Datum:</b> {row['DATUM']}<br>
-    <hr>
-    <b>Funktion:</b> {row['TAG-FUNK']}<br>
-    <b>Fach:</b> {row['TAG-FACH']}
-    """
+    print(
+        "\nFilter 2/2: Optional können Sie die Verbindungen zusätzlich nach einem Schlagwort in TAG-FACH, TAG-FUNK oder TAG-INH eingrenzen (z.B. 'archäologie' oder 'literaturversand').")
+    keyword_filter = input("Schlagwort (leer lassen für alle): ").lower().strip()
+
+    # --- OPTIONAL: VOLLTEXTSUCHE IN TRANSKRIPTION UND BESCHREIBUNG ---
 
-    folium.PolyLine(
-        locations=[start_coords, end_coords],
-        weight=2,
-        color=line_color,
-        opacity=0.7,
-        popup=folium.Popup(popup_text, max_width=300)
-    ).add_to(m)
+    print("\nOptional: Volltextsuche in TRANSK und BESCHR (Wörter, \"Phrasen\" oder Präfixe wie 'schädel*').")
+    text_query = input("Volltext (leer lassen für keine): ").strip()
+    text_mask = None
+    if text_query:
+        with open_index(index_path(file_path), df) as index:
+            text_mask = index.mask(df, text_query)
+        print(f"Volltextsuche '{text_query}': {text_mask.sum()} Briefe gefunden.")
 
-# --- Speicherung im BASE_FOLDER ---
+    print(f"Wende Filter an: {start_year} bis {end_year}, Schlagwort: '{keyword_filter or 'alle'}'...")
+    print("Karte wird erstellt. Zeichne Briefverbindungen...")
 
-if keyword_filter:
-    output_filename = f"briefnetzwerk_karte_{start_year}-{end_year}_{keyword_filter}.html"
-else:
-    output_filename = f"briefnetzwerk_karte_{start_year}-{end_year}_alle.html"
+    output_path, anzahl = render_map(df, tag_index, start_year, end_year, keyword_filter,
+                                   load_historic_borders(df), cube, text_query, text_mask)
 
-output_path = os.path.join(BASE_FOLDER, output_filename)
+    print(f"Nach Filterung: {anzahl} Briefe verbleiben.")
+    print(f"--- FERTIG ---")
+    print(
+        f"Die interaktive Karte (Filter: {start_year}-{end_year}, Schlagwort: {'alle' if not keyword_filter else keyword_filter}) wurde erfolgreich gespeichert unter:\n{output_path}")
+    print(f"Öffnen Sie diese Datei in einem Webbrowser, um das Ergebnis zu sehen.")
 
-# Speichern der fertigen Karte als HTML-Datei
-m.save(output_path)
 
-print(f"--- FERTIG ---")
-print(
-    f"Die interaktive Karte (Filter: {start_year}-{end_year}, Schlagwort: {'alle' if not keyword_filter else keyword_filter}) wurde erfolgreich gespeichert unter:\n{output_path}")
-print(f"Öffnen Sie diese Datei in einem Webbrowser, um das Ergebnis zu sehen.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
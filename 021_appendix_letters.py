@@ -4,8 +4,114 @@ import re
 from datetime import datetime
 from docx import Document
 from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
 from copy import deepcopy
 
+from docx_shards import SHARD_GROESSE, insert_sharded
+from docx_template import SlotTemplate, fill, set_cell_text, template_cells
+
+# --- Parallelmodus ---
+# Briefe werden in Shards von SHARD_GROESSE Einträgen auf PROZESSE Prozesse verteilt
+# (None = alle CPU-Kerne) und danach in Reihenfolge zusammengeführt
+PARALLEL_MODUS = True
+PROZESSE = None
+
+# Reduzierte Liste der Platzhalter
+SPALTEN_LISTE = [
+    "BRIEF-TITEL", "ABS-ORT", "EMP-ORT",
+    "ARCHIV", "TRANSK", "TAG-FUNK", "TAG-THEMA"
+]
+
+
+# Mehrfache Leerzeichen werden beim Einfügen zu einem zusammengefasst
+DOPPELTE_LEERZEICHEN = re.compile(r' {2,}')
+ZEILENABSTAND = 1.15
+
+
+def bereinige_wert(wert):
+    """Zellwert ohne Randleerzeichen und doppelte Leerzeichen, geschützte Leerzeichen als normale Leerzeichen."""
+    return DOPPELTE_LEERZEICHEN.sub(' ', str(wert).strip().replace('\u00A0', ' '))
+
+
+def normalisiere_absatz(absatz):
+    """
+    Fasst doppelte Leerzeichen zusammen und setzt den Zeilenabstand. Der Text
+    wird direkt in den vorhandenen Runs geändert, die Formatierung bleibt erhalten.
+    """
+    vorher_leerzeichen = False
+    for t in absatz._p.iter(qn('w:t')):
+        text = DOPPELTE_LEERZEICHEN.sub(' ', t.text or '')
+        if vorher_leerzeichen and text.startswith(' '):
+            text = text[1:]
+        if text != t.text:
+            t.text = text
+        if text:
+            vorher_leerzeichen = text.endswith(' ')
+    absatz.paragraph_format.line_spacing = ZEILENABSTAND
+
+
+def normalisiere_dokument(doc):
+    """Normalisiert alle Absätze und Tabellenzellen, die bereits im Dokument stehen."""
+    for absatz in doc.paragraphs:
+        normalisiere_absatz(absatz)
+    for tabelle in doc.tables:
+        for zelle in template_cells(tabelle._tbl):
+            for absatz in zelle.paragraphs:
+                normalisiere_absatz(absatz)
+
+
+def fuege_briefe_ein(doc, template_para_xml, template_table_xml, rows, spalten_liste=SPALTEN_LISTE, start=1):
+    """
+    Hängt für jeden Brief eine Kopie von Titel-Absatz und Tabelle an das
+    Dokument an und füllt die Platzhalter. Die Vorlage wird vorab einmal
+    analysiert (siehe docx_template.SlotTemplate) und normalisiert (doppelte
+    Leerzeichen, Zeilenabstand); pro Brief werden nur die bekannten
+    Platzhalter-Stellen beschrieben und formatiert. Die eingefügten Elemente
+    werden direkt gekapselt, statt doc.paragraphs/doc.tables neu aufzubauen.
+    start ist die Nummer des ersten Briefs (für den Parallelmodus).
+    Gibt die Anzahl der eingefügten Briefe zurück.
+    """
+    body = doc._body
+
+    template_para_xml = deepcopy(template_para_xml)
+    normalisiere_absatz(Paragraph(template_para_xml, None))
+    titel_vorlage = SlotTemplate(template_para_xml, ["BRIEF-TITEL"])
+
+    tabellen_vorlage = SlotTemplate(deepcopy(template_table_xml), spalten_liste)
+    for zelle in template_cells(tabellen_vorlage.xml):
+        for absatz in zelle.paragraphs:
+            normalisiere_absatz(absatz)
+
+    leerzeile_xml = OxmlElement('w:p')
+    Paragraph(leerzeile_xml, None).paragraph_format.line_spacing = ZEILENABSTAND
+
+    i = start - 1
+    for i, row in enumerate(rows, start=start):
+        # 1. TITEL-ABSATZ einfügen
+        new_p_element, titel_slots = titel_vorlage.copy()
+        doc._element.body.append(new_p_element)
+
+        if titel_slots:
+            wert = bereinige_wert(row.get("BRIEF-TITEL", ""))
+            Paragraph(new_p_element, body).text = f"{i}. {wert}"
+
+        # 2. TABELLE einfügen
+        new_tbl_element, zell_slots = tabellen_vorlage.copy()
+        doc._element.body.append(new_tbl_element)
+        aktuelle_tabelle = Table(new_tbl_element, body)
+
+        werte = {spalte: bereinige_wert(row.get(spalte, "")) for spalte in tabellen_vorlage.placeholders}
+        for tc, teile in zell_slots:
+            zelle = set_cell_text(tc, DOPPELTE_LEERZEICHEN.sub(' ', fill(teile, werte)), aktuelle_tabelle)
+            zelle.paragraphs[0].paragraph_format.line_spacing = ZEILENABSTAND
+
+        # 3. LEERZEILE einfügen
+        doc._element.body.append(deepcopy(leerzeile_xml))
+
+    return i - start + 1
+
 
 def erstelle_brief_anhang():
     print("--- Brief-Anhang Generator (Reduzierte Version) ---")
@@ -30,12 +136,6 @@ def erstelle_brief_anhang():
     template_para_xml = deepcopy(template_para._element)
     template_table_xml = deepcopy(template_table._element)
 
-    # Reduzierte Liste der Platzhalter
-    spalten_liste = [
-        "BRIEF-TITEL", "ABS-ORT", "EMP-ORT",
-        "ARCHIV", "TRANSK", "TAG-FUNK", "TAG-THEMA"
-    ]
-
     try:
         with open(input_csv, mode='r', encoding='utf-8-sig') as csvfile:
             sample = csvfile.read(4096)
@@ -47,47 +147,14 @@ def erstelle_brief_anhang():
             template_para._element.getparent().remove(template_para._element)
             template_table._element.getparent().remove(template_table._element)
 
-            for i, row in enumerate(reader, start=1):
-                # 1. TITEL-ABSATZ einfügen
-                new_p_element = deepcopy(template_para_xml)
-                doc._element.body.append(new_p_element)
-                aktiver_absatz = doc.paragraphs[-1]
-
-                if "BRIEF-TITEL" in aktiver_absatz.text:
-                    wert = str(row.get("BRIEF-TITEL", "")).strip()
-                    wert = wert.replace('\u00A0', ' ')
-                    aktiver_absatz.text = f"{i}. {wert}"
-
-                # 2. TABELLE einfügen
-                new_tbl_element = deepcopy(template_table_xml)
-                doc._element.body.append(new_tbl_element)
-                aktuelle_tabelle = doc.tables[-1]
-
-                for zeile in aktuelle_tabelle.rows:
-                    for zelle in zeile.cells:
-                        for spalte in spalten_liste:
-                            if spalte in zelle.text:
-                                wert = str(row.get(spalte, "")).strip()
-                                wert = wert.replace('\u00A0', ' ')
-                                zelle.text = zelle.text.replace(spalte, wert)
-
-                # 3. LEERZEILE einfügen
-                doc._element.body.append(OxmlElement('w:p'))
-
-        # --- BEREINIGUNG: DOPPELTE LEERZEICHEN & ZEILENABSTAND ---
-        def clean_spaces(text):
-            return re.sub(r' {2,}', ' ', text)
-
-        for para in doc.paragraphs:
-            para.text = clean_spaces(para.text)
-            para.paragraph_format.line_spacing = 1.15
-
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        para.text = clean_spaces(para.text)
-                        para.paragraph_format.line_spacing = 1.15
+            # Übrigen Vorlageninhalt einmal bereinigen, neue Briefe werden beim Einfügen bereinigt
+            normalisiere_dokument(doc)
+
+            if PARALLEL_MODUS:
+                i = insert_sharded(doc, fuege_briefe_ein, template_para_xml, template_table_xml, reader,
+                                   SHARD_GROESSE, PROZESSE)
+            else:
+                i = fuege_briefe_ein(doc, template_para_xml, template_table_xml, reader)
 
         doc.save(output_docx)
         print(f"\nErfolg! {i} Briefe wurden verarbeitet.")
@@ -2,11 +2,89 @@ import csv
 import os
 from docx import Document
 from docx.oxml import OxmlElement
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
 from copy import deepcopy
 from datetime import datetime
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Pt  # Für präzise Abstände
 
+from docx_shards import SHARD_GROESSE, insert_sharded
+from docx_template import SlotTemplate, fill, template_cells
+
+# --- Parallelmodus ---
+# Personen werden in Shards von SHARD_GROESSE Einträgen auf PROZESSE Prozesse verteilt
+# (None = alle CPU-Kerne) und danach in Reihenfolge zusammengeführt
+PARALLEL_MODUS = True
+PROZESSE = None
+
+SPALTEN_LISTE = [
+    "KORR-NACHNAME", "KORR-VORNAME", "KORR-BERU",
+    "TAG-TAET", "TAG-FACH", "TAG-INST",
+    "REF-1", "REF-2", "REF-3", "REF-4"
+]
+
+
+def bereinige_zelle(zelle, cell_text):
+    """Setzt den Zelltext ohne leere Zeilen, linksbündig und mit 1,15 Zeilenabstand."""
+    # Leere Zeilen in Referenzen löschen
+    lines = cell_text.splitlines()
+    cleaned_lines = [l.strip() for l in lines if l.strip() and any(c.isalnum() for c in l)]
+    zelle.text = "\n".join(cleaned_lines)
+
+    # Linksbündig & 1,15 Zeilenabstand pro Zelle
+    for paragraph in zelle.paragraphs:
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        paragraph.paragraph_format.line_spacing = 1.15
+
+
+def fuege_personen_ein(doc, template_para_xml, template_table_xml, rows, spalten_liste=SPALTEN_LISTE, start=1):
+    """
+    Hängt für jede Person eine Kopie von Absatz und Tabelle an das Dokument an
+    und füllt die Platzhalter. Die Vorlage wird vorab einmal analysiert und
+    formatiert (siehe docx_template.SlotTemplate); pro Person werden nur die
+    bekannten Platzhalter-Zellen beschrieben. Die eingefügten Elemente werden
+    direkt gekapselt, statt doc.paragraphs/doc.tables neu aufzubauen.
+    start ist die Nummer des ersten Eintrags (für den Parallelmodus).
+    Gibt die Anzahl der eingefügten Personen zurück.
+    """
+    body = doc._body
+
+    # Zeilenabstand des Absatzes und Zellen ohne Platzhalter einmalig in der Vorlage setzen
+    template_para_xml = deepcopy(template_para_xml)
+    Paragraph(template_para_xml, None).paragraph_format.line_spacing = 1.15
+
+    tabellen_vorlage = SlotTemplate(deepcopy(template_table_xml), spalten_liste)
+    for zelle in template_cells(tabellen_vorlage.xml):
+        if not tabellen_vorlage.pattern.search(zelle.text):
+            bereinige_zelle(zelle, zelle.text)
+
+    absatz_vorlage = SlotTemplate(template_para_xml, spalten_liste)
+    platzhalter = list(dict.fromkeys(absatz_vorlage.placeholders + tabellen_vorlage.placeholders))
+
+    i = start - 1
+    for i, row in enumerate(rows, start=start):
+        werte = {spalte: str(row.get(spalte, "")).strip() for spalte in platzhalter}
+
+        # A) Absatz einfügen
+        new_p_element, absatz_slots = absatz_vorlage.copy()
+        doc._element.body.append(new_p_element)
+        for p, teile in absatz_slots:
+            Paragraph(p, body).text = fill(teile, werte)
+
+        # B) Tabelle einfügen
+        new_tbl_element, zell_slots = tabellen_vorlage.copy()
+        doc._element.body.append(new_tbl_element)
+        aktuelle_tabelle = Table(new_tbl_element, body)
+
+        for tc, teile in zell_slots:
+            bereinige_zelle(_Cell(tc, aktuelle_tabelle), fill(teile, werte))
+
+        # C) Leerzeile
+        doc._element.body.append(OxmlElement('w:p'))
+
+    return i - start + 1
+
 
 def erstelle_personen_anhang():
     print("--- Personen-Anhang Generator ---")
@@ -43,12 +121,6 @@ def erstelle_personen_anhang():
     template_para_xml = deepcopy(template_para._element)
     template_table_xml = deepcopy(template_table._element)
 
-    spalten_liste = [
-        "KORR-NACHNAME", "KORR-VORNAME", "KORR-BERU",
-        "TAG-TAET", "TAG-FACH", "TAG-INST",
-        "REF-1", "REF-2", "REF-3", "REF-4"
-    ]
-
     try:
         with open(input_csv, mode='r', encoding='utf-8-sig') as csvfile:
             sample = csvfile.read(4096)
@@ -59,46 +131,11 @@ def erstelle_personen_anhang():
             template_para._element.getparent().remove(template_para._element)
             template_table._element.getparent().remove(template_table._element)
 
-            i = 0
-            for i, row in enumerate(reader, start=1):
-                # A) Absatz einfügen
-                new_p_element = deepcopy(template_para_xml)
-                doc._element.body.append(new_p_element)
-                aktiver_absatz = doc.paragraphs[-1]
-
-                # Zeilenabstand auch für den neuen Absatz sicherstellen
-                aktiver_absatz.paragraph_format.line_spacing = 1.15
-
-                for spalte in spalten_liste:
-                    if spalte in aktiver_absatz.text:
-                        wert = str(row.get(spalte, "")).strip()
-                        aktiver_absatz.text = aktiver_absatz.text.replace(spalte, wert)
-
-                # B) Tabelle einfügen
-                new_tbl_element = deepcopy(template_table_xml)
-                doc._element.body.append(new_tbl_element)
-                aktuelle_tabelle = doc.tables[-1]
-
-                for zeile in aktuelle_tabelle.rows:
-                    for zelle in zeile.cells:
-                        cell_text = zelle.text
-                        for spalte in spalten_liste:
-                            if spalte in cell_text:
-                                wert = str(row.get(spalte, "")).strip()
-                                cell_text = cell_text.replace(spalte, wert)
-
-                        # Leere Zeilen in Referenzen löschen
-                        lines = cell_text.splitlines()
-                        cleaned_lines = [l.strip() for l in lines if l.strip() and any(c.isalnum() for c in l)]
-                        zelle.text = "\n".join(cleaned_lines)
-
-                        # Linksbündig & 1,15 Zeilenabstand pro Zelle
-                        for paragraph in zelle.paragraphs:
-                            paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-                            paragraph.paragraph_format.line_spacing = 1.15
-
-                # C) Leerzeile
-                doc._element.body.append(OxmlElement('w:p'))
+            if PARALLEL_MODUS:
+                i = insert_sharded(doc, fuege_personen_ein, template_para_xml, template_table_xml, reader,
+                                   SHARD_GROESSE, PROZESSE)
+            else:
+                i = fuege_personen_ein(doc, template_para_xml, template_table_xml, reader)
 
         doc.save(output_docx)
         print(f"\nErfolg! {i} Personen wurden verarbeitet.")
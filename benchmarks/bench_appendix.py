@@ -0,0 +1,146 @@
+"""
+Benchmark: Skalierung der Anhang-Generatoren (021/022).
+
+Misst die Einfügeschleife für wachsende Eintragszahlen einmal in der früheren
+Form (doc.paragraphs[-1] / doc.tables[-1] nach jedem Einfügen, Suche aller
+Platzhalter in jeder Zelle) und einmal mit der aktuellen Implementierung
+(direkt gekapselte Elemente, vorab analysierte Vorlage). Die Vorlage wird
+synthetisch erzeugt.
+
+Aufruf: python benchmarks/bench_appendix.py [N1 N2 ...]
+"""
+import importlib
+import os
+import re
+import sys
+import time
+from copy import deepcopy
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+briefe = importlib.import_module('021_appendix_letters')
+personen = importlib.import_module('022_appendix_persons')
+
+GROESSEN = [250, 500, 1000, 2000, 5000]
+
+# Die alte Variante wächst quadratisch und wird oberhalb dieser Größe übersprungen
+MAX_ALT = 5000
+
+
+def vorlage(titel, platzhalter):
+    """Dokument mit einem Titel-Absatz und einer zweispaltigen Platzhalter-Tabelle."""
+    doc = Document()
+    doc.add_paragraph(titel)
+    table = doc.add_table(rows=len(platzhalter), cols=2)
+    for zeile, name in zip(table.rows, platzhalter):
+        zeile.cells[0].text = name.title()
+        zeile.cells[1].text = name
+    para, tbl = doc.paragraphs[0], doc.tables[0]
+    para_xml, tbl_xml = deepcopy(para._element), deepcopy(tbl._element)
+    para._element.getparent().remove(para._element)
+    tbl._element.getparent().remove(tbl._element)
+    return doc, para_xml, tbl_xml
+
+
+def brief_zeilen(n):
+    return [{name: f"{name} {i}" for name in briefe.SPALTEN_LISTE} for i in range(n)]
+
+
+def personen_zeilen(n):
+    return [{name: f"{name} {i}" for name in personen.SPALTEN_LISTE} for i in range(n)]
+
+
+def briefe_alt(doc, template_para_xml, template_table_xml, rows, spalten_liste=briefe.SPALTEN_LISTE):
+    """Frühere Einfügeschleife aus 021_appendix_letters inklusive abschließender Bereinigung (Referenz)."""
+    i = 0
+    for i, row in enumerate(rows, start=1):
+        doc._element.body.append(deepcopy(template_para_xml))
+        aktiver_absatz = doc.paragraphs[-1]
+        if "BRIEF-TITEL" in aktiver_absatz.text:
+            wert = str(row.get('BRIEF-TITEL', '')).strip().replace('\u00A0', ' ')
+            aktiver_absatz.text = f"{i}. {wert}"
+
+        doc._element.body.append(deepcopy(template_table_xml))
+        aktuelle_tabelle = doc.tables[-1]
+        for zeile in aktuelle_tabelle.rows:
+            for zelle in zeile.cells:
+                for spalte in spalten_liste:
+                    if spalte in zelle.text:
+                        wert = str(row.get(spalte, "")).strip().replace('\u00A0', ' ')
+                        zelle.text = zelle.text.replace(spalte, wert)
+
+        doc._element.body.append(OxmlElement('w:p'))
+
+    for para in doc.paragraphs:
+        para.text = re.sub(r' {2,}', ' ', para.text)
+        para.paragraph_format.line_spacing = 1.15
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for para in cell.paragraphs:
+                    para.text = re.sub(r' {2,}', ' ', para.text)
+                    para.paragraph_format.line_spacing = 1.15
+    return i
+
+
+def personen_alt(doc, template_para_xml, template_table_xml, rows, spalten_liste=personen.SPALTEN_LISTE):
+    """Frühere Einfügeschleife aus 022_appendix_persons (Referenz)."""
+    i = 0
+    for i, row in enumerate(rows, start=1):
+        doc._element.body.append(deepcopy(template_para_xml))
+        aktiver_absatz = doc.paragraphs[-1]
+        aktiver_absatz.paragraph_format.line_spacing = 1.15
+        for spalte in spalten_liste:
+            if spalte in aktiver_absatz.text:
+                aktiver_absatz.text = aktiver_absatz.text.replace(spalte, str(row.get(spalte, "")).strip())
+
+        doc._element.body.append(deepcopy(template_table_xml))
+        aktuelle_tabelle = doc.tables[-1]
+        for zeile in aktuelle_tabelle.rows:
+            for zelle in zeile.cells:
+                cell_text = zelle.text
+                for spalte in spalten_liste:
+                    if spalte in cell_text:
+                        cell_text = cell_text.replace(spalte, str(row.get(spalte, "")).strip())
+                lines = cell_text.splitlines()
+                zelle.text = "\n".join(l.strip() for l in lines if l.strip() and any(c.isalnum() for c in l))
+                for paragraph in zelle.paragraphs:
+                    paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+                    paragraph.paragraph_format.line_spacing = 1.15
+
+        doc._element.body.append(OxmlElement('w:p'))
+    return i
+
+
+def messen(einfuegen, titel, platzhalter, rows):
+    doc, para_xml, tbl_xml = vorlage(titel, platzhalter)
+    start = time.perf_counter()
+    einfuegen(doc, para_xml, tbl_xml, rows)
+    return time.perf_counter() - start
+
+
+def main():
+    groessen = [int(n) for n in sys.argv[1:]] or GROESSEN
+
+    faelle = [
+        ('021 Briefe', 'BRIEF-TITEL', briefe.SPALTEN_LISTE[1:], brief_zeilen,
+         briefe_alt, briefe.fuege_briefe_ein),
+        ('022 Personen', 'KORR-NACHNAME, KORR-VORNAME', personen.SPALTEN_LISTE[2:], personen_zeilen,
+         personen_alt, personen.fuege_personen_ein),
+    ]
+
+    for name, titel, platzhalter, zeilen, alt, neu in faelle:
+        print(f"\n{name}")
+        print(f"{'Einträge':>10} {'alt [s]':>10} {'neu [s]':>10} {'alt/Eintrag [ms]':>18} {'neu/Eintrag [ms]':>18}")
+        for n in groessen:
+            rows = zeilen(n)
+            t_alt = messen(alt, titel, platzhalter, rows) if n <= MAX_ALT else float('nan')
+            t_neu = messen(neu, titel, platzhalter, rows)
+            print(f"{n:>10} {t_alt:>10.2f} {t_neu:>10.2f} {1000 * t_alt / n:>18.3f} {1000 * t_neu / n:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: Anreicherung der Briefe in 00_tagtransfer.
+
+Vergleicht die frühere Umsetzung (iterrows-Lookup + apply(axis=1)) mit dem
+vektorisierten Index-Join anreichern() auf einem synthetischen Korpus und
+prüft, dass beide Varianten identische Ergebnisse liefern.
+
+Aufruf: python benchmarks/bench_tagtransfer.py [ANZAHL_BRIEFE] [ANZAHL_BRIEFE_ALT]
+"""
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+tagtransfer = importlib.import_module('00_tagtransfer')
+
+# Größe des synthetischen Korpus
+N_BRIEFE = 1_000_000
+N_PERSONEN = 5_000
+
+# Die alte Variante ist zu langsam für den vollen Korpus; sie läuft auf einer Teilmenge
+N_BRIEFE_ALT = 100_000
+
+
+def synthetischer_korpus(n_briefe, n_personen, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"{i:04d}-P" for i in range(n_personen)] + [tagtransfer.EIGENE_ID], dtype=object)
+
+    df_pers = pd.DataFrame({
+        'PERSON-ID': ids,
+        'TAG-TAET': [f"Tätigkeit {i % 40}" for i in range(len(ids))],
+        'TAG-FACH': [f"Fach {i % 25}" for i in range(len(ids))],
+        'TAG-INST': [f"Institution {i % 300}" for i in range(len(ids))],
+    })
+
+    # Hälfte der Briefe von, Hälfte an die eigene Person; ein Teil mit unbekannter ID
+    gegenueber = ids[rng.integers(0, n_personen, n_briefe)].copy()
+    gegenueber[rng.random(n_briefe) < 0.05] = 'unbekannt'
+    von_eigener = rng.random(n_briefe) < 0.5
+
+    df_briefe = pd.DataFrame({
+        'BRIEF-ID': [f"B{i:07d}" for i in range(n_briefe)],
+        'ABS-ID': np.where(von_eigener, tagtransfer.EIGENE_ID, gegenueber),
+        'EMP-ID': np.where(von_eigener, gegenueber, tagtransfer.EIGENE_ID),
+        'NONOS-TAET': '',
+        'NONOS-FACH': '',
+        'NONOS-INST': '',
+    })
+    return df_briefe, df_pers
+
+
+def anreichern_alt(df_briefe, df_pers):
+    """Frühere Umsetzung aus daten_anreichern (Referenz für Ergebnis und Laufzeit)."""
+    personen_lookup = {}
+    for index, row in df_pers.iterrows():
+        p_id = row['PERSON-ID']
+        personen_lookup[p_id] = {
+            'TAG-TAET': row['TAG-TAET'],
+            'TAG-FACH': row['TAG-FACH'],
+            'TAG-INST': row['TAG-INST']
+        }
+
+    def update_row(row):
+        if row['ABS-ID'] != '069-SO':
+            target_id = row['ABS-ID']
+        else:
+            target_id = row['EMP-ID']
+
+        if target_id in personen_lookup:
+            match = personen_lookup[target_id]
+            row['NONOS-TAET'] = match['TAG-TAET']
+            row['NONOS-FACH'] = match['TAG-FACH']
+            row['NONOS-INST'] = match['TAG-INST']
+
+        return row
+
+    return df_briefe.apply(update_row, axis=1)
+
+
+def messen(funktion, *args):
+    start = time.perf_counter()
+    ergebnis = funktion(*args)
+    return ergebnis, time.perf_counter() - start
+
+
+def main():
+    n_briefe = int(sys.argv[1]) if len(sys.argv) > 1 else N_BRIEFE
+    n_alt = min(int(sys.argv[2]) if len(sys.argv) > 2 else N_BRIEFE_ALT, n_briefe)
+
+    df_briefe, df_pers = synthetischer_korpus(n_briefe, N_PERSONEN)
+    teil = df_briefe.iloc[:n_alt]
+
+    alt, t_alt = messen(anreichern_alt, teil, df_pers)
+    neu_teil, t_neu_teil = messen(tagtransfer.anreichern, teil, df_pers)
+    identisch = alt.to_csv(index=False) == neu_teil.to_csv(index=False)
+
+    _, t_neu = messen(tagtransfer.anreichern, df_briefe, df_pers)
+
+    print(f"Alt  (apply, {n_alt:>9,} Briefe): {t_alt:8.2f} s")
+    print(f"Neu  (Join,  {n_alt:>9,} Briefe): {t_neu_teil:8.2f} s  -> Faktor {t_alt / t_neu_teil:,.0f}x")
+    print(f"Neu  (Join,  {n_briefe:>9,} Briefe): {t_neu:8.2f} s")
+    print(f"Alt hochgerechnet auf {n_briefe:,} Briefe: {t_alt * n_briefe / n_alt:8.1f} s")
+    print(f"Ergebnisse identisch: {identisch}")
+
+
+if __name__ == "__main__":
+    main()
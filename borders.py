@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from jinja2 import Template
+
+from corpus import file_hash
+
+# Bei Änderungen an der Vereinfachung erhöhen, damit alte Dateien neu erzeugt werden
+GRENZEN_VERSION = 2
+
+# Globale JavaScript-Variable, unter der die gemeinsame Datei die Grenzen ablegt
+GRENZEN_VARIABLE = 'GRENZEN'
+
+# Eigenschaften der Features, die erhalten bleiben (für den Tooltip)
+GRENZEN_FELDER = ['NAME']
+
+# Darstellung wie bisher in 01_networks.py: weiße, gestrichelte Linien ohne Füllung
+GRENZEN_STIL = {
+    'fillColor': 'none',
+    'color': 'white',
+    'weight': 1.5,
+    'dashArray': '5, 5',
+    'opacity': 0.9,
+}
+
+
+# --- GEOMETRIE ---
+
+def simplify_line(points, tolerance):
+    """
+    Douglas-Peucker-Vereinfachung einer Punktfolge (n x 2, Grad). Behält Anfang
+    und Ende und alle Punkte, die weiter als tolerance von der vereinfachten
+    Linie abweichen. Die Abstände eines Abschnitts werden vektorisiert berechnet.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        inner = points[first + 1:last]
+        d = b - a
+        length = np.hypot(d[0], d[1])
+        if length == 0:
+            # Geschlossener Ring: Abstand zum Anfangspunkt
+            dist = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (inner[:, 1] - a[1]) - d[1] * (inner[:, 0] - a[0])) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return points[keep]
+
+
+def clip_line(line, bbox):
+    """
+    Schneidet eine Punktfolge auf bbox (min_lon, min_lat, max_lon, max_lat) zu
+    (Liang-Barsky, vektorisiert über alle Kanten) und gibt die Abschnitte
+    innerhalb als Liste von Punktfolgen zurück.
+
+    Anders als beim Zuschneiden der Fläche entstehen dabei keine neuen Kanten
+    entlang des Rechtecks: die Grenzen werden nur als Linien gezeichnet
+    (GRENZEN_STIL ohne Füllung), solche Kanten erschienen sonst als falsche
+    Grenzlinien am Rand des Ausschnitts.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lo, hi = line.min(axis=0), line.max(axis=0)
+    if hi[0] < min_lon or lo[0] > max_lon or hi[1] < min_lat or lo[1] > max_lat:
+        return []
+    if lo[0] >= min_lon and hi[0] <= max_lon and lo[1] >= min_lat and hi[1] <= max_lat:
+        return [line]
+
+    points, d = line[:-1], np.diff(line, axis=0)
+    t0, t1 = np.zeros(len(d)), np.ones(len(d))
+    for axis, low, high in ((0, min_lon, max_lon), (1, min_lat, max_lat)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_low = (low - points[:, axis]) / d[:, axis]
+            t_high = (high - points[:, axis]) / d[:, axis]
+        parallel = d[:, axis] == 0
+        t_enter = np.where(parallel, -np.inf, np.minimum(t_low, t_high))
+        t_exit = np.where(parallel, np.inf, np.maximum(t_low, t_high))
+        # Achsenparallele Kanten außerhalb des Streifens entfallen ganz
+        outside = parallel & ((points[:, axis] < low) | (points[:, axis] > high))
+        t0 = np.maximum(t0, t_enter)
+        t1 = np.where(outside, -1.0, np.minimum(t1, t_exit))
+
+    segments = np.flatnonzero(t0 <= t1)
+    if len(segments) == 0:
+        return []
+    starts = points + t0[:, None] * d
+    ends = points + t1[:, None] * d
+
+    # Aufeinanderfolgende, am gemeinsamen Punkt nicht beschnittene Kanten bilden einen Abschnitt
+    connected = (np.diff(segments) == 1) & (t1[segments[:-1]] == 1) & (t0[segments[1:]] == 0)
+    runs = np.split(segments, np.flatnonzero(~connected) + 1)
+    return [np.vstack([starts[run[:1]], ends[run]]) for run in runs]
+
+
+def _prepare_ring(coordinates, bbox, tolerance, decimals):
+    """Zuschneiden, vereinfachen und runden eines Rings; Liste der verbleibenden Linien."""
+    ring = np.asarray(coordinates, dtype=np.float64)[:, :2]
+    lines = clip_line(ring, bbox) if bbox is not None else [ring]
+
+    prepared = []
+    for line in lines:
+        line = np.round(simplify_line(line, tolerance), decimals)
+        # Nach dem Runden doppelte aufeinanderfolgende Punkte entfernen
+        line = line[np.r_[True, (np.diff(line, axis=0) != 0).any(axis=1)]]
+        if len(line) < 2:
+            continue
+        prepared.append(line.astype(np.int64).tolist() if decimals <= 0 else line.tolist())
+    return prepared
+
+
+def simplify_borders(geojson, tolerance=0.02, bbox=None, decimals=3, fields=None):
+    """
+    Vereinfacht eine GeoJSON-FeatureCollection mit (Multi-)Polygonen zu
+    Grenzlinien: Ringe werden auf bbox zugeschnitten (siehe clip_line), mit
+    Douglas-Peucker (tolerance in Grad) vereinfacht und auf decimals
+    Nachkommastellen gerundet. Jedes Feature wird ein MultiLineString; Features
+    ohne verbleibende Linie entfallen, von den Eigenschaften bleiben nur fields.
+    """
+    fields = GRENZEN_FELDER if fields is None else fields
+    features = []
+    for feature in geojson.get('features', []):
+        geometry = feature.get('geometry') or {}
+        kind = geometry.get('type')
+        if kind == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif kind == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+
+        lines = [line for rings in polygons for ring in rings
+                 for line in _prepare_ring(ring, bbox, tolerance, decimals)]
+        if not lines:
+            continue
+
+        properties = feature.get('properties') or {}
+        features.append({
+            'type': 'Feature',
+            'properties': {k: properties.get(k) for k in fields},
+            'geometry': {'type': 'MultiLineString', 'coordinates': lines},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def letters_bbox(df, padding=5.0):
+    """Umgebendes Rechteck (min_lon, min_lat, max_lon, max_lat) aller gültigen Briefkoordinaten plus Rand in Grad."""
+    valid = df[df['KOOR_OK']]
+    if valid.empty:
+        return None
+    lats = np.concatenate([valid['ABS_LAT'].to_numpy(dtype=np.float64), valid['EMP_LAT'].to_numpy(dtype=np.float64)])
+    lons = np.concatenate([valid['ABS_LON'].to_numpy(dtype=np.float64), valid['EMP_LON'].to_numpy(dtype=np.float64)])
+    return (max(-180.0, float(lons.min()) - padding), max(-90.0, float(lats.min()) - padding),
+            min(180.0, float(lons.max()) + padding), min(90.0, float(lats.max()) + padding))
+
+
+# --- GEMEINSAME DATEI NEBEN DEN KARTEN ---
+
+def shared_borders_file(source_path, target_folder, df=None, tolerance=0.02, decimals=3, padding=5.0):
+    """
+    Erzeugt (einmal) die vereinfachte Grenzdatei als JavaScript
+    (window.GRENZEN = {...}) im Zielordner und gibt ihren Dateinamen zurück.
+
+    Der Name enthält einen Schlüssel aus Quelldatei, Parametern und Zuschnitt;
+    solange sich nichts davon ändert, wird die vorhandene Datei wiederverwendet.
+    Ist die Quelldatei nicht vorhanden, wird FileNotFoundError ausgelöst.
+    """
+    bbox = letters_bbox(df, padding) if df is not None else None
+    params = json.dumps({'v': GRENZEN_VERSION, 'tol': tolerance, 'dec': decimals,
+                         'bbox': [round(x, 4) for x in bbox] if bbox else None, 'fields': GRENZEN_FELDER})
+    key = hashlib.sha256((file_hash(source_path) + params).encode('utf-8')).hexdigest()[:12]
+
+    base = os.path.splitext(os.path.basename(source_path))[0]
+    file_name = f"{base}_vereinfacht_{key}.js"
+    target_path = os.path.join(target_folder, file_name)
+
+    if not os.path.exists(target_path):
+        with open(source_path, 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+        simplified = simplify_borders(geojson, tolerance, bbox, decimals)
+
+        tmp_path = target_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f'window.{GRENZEN_VARIABLE} = ')
+            json.dump(simplified, f, ensure_ascii=False, separators=(',', ':'))
+            f.write(';')
+        os.replace(tmp_path, target_path)
+
+    return file_name
+
+
+class SharedBorders(JSCSSMixin, Layer):
+    """
+    Folium-Layer für die gemeinsame Grenzdatei: die Karte bindet die Datei per
+    <script src> ein und zeichnet window.GRENZEN, statt die Geometrie einzubetten.
+    Erscheint wie ein folium.GeoJson in der LayerControl.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.geoJSON(window[{{ this.variable|tojson }}] || [], {
+            style: function (feature) { return {{ this.style|tojson }}; },
+            onEachFeature: function (feature, layer) {
+                if (feature.properties && feature.properties.NAME) {
+                    layer.bindTooltip('Land: ' + feature.properties.NAME);
+                }
+            }
+        });
+        {% endmacro %}
+    """)
+
+    def __init__(self, src, name='Historische Grenzen (1914)', style=None, show=True):
+        super().__init__(name=name, overlay=True, show=show)
+        self._name = 'SharedBorders'
+        self.variable = GRENZEN_VARIABLE
+        self.style = style or GRENZEN_STIL
+        self.default_js = [('grenzen_' + os.path.basename(src), src)]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+def parse_coord_strings(values):
+    """
+    Konvertiert eine ganze Spalte von Koordinaten-Strings "lat, lon".
+
+    Jeder eindeutige Ortsstring wird nur einmal geparst: Leerzeichen werden
+    entfernt, es müssen genau zwei Zahlen sein, lat in [-90, 90] und lon in
+    [-180, 180]. Fehlende, ungültige und reine Text-Werte gelten als ungültig.
+    Gibt drei Arrays zurück: lat (float64), lon (float64) und eine Maske der
+    gültigen Einträge. Ungültige Einträge haben lat/lon = NaN.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=True)
+
+    cleaned = pd.Series(uniques, dtype=object).astype(str).str.replace(' ', '', regex=False)
+    parts = cleaned.str.split(',', n=1, expand=True).reindex(columns=[0, 1])
+
+    # Genau zwei Teile: exakt ein Komma im bereinigten String
+    two_parts = cleaned.str.count(',').to_numpy() == 1
+
+    u_lat = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype='float64', copy=True)
+    u_lon = pd.to_numeric(parts[1], errors='coerce').to_numpy(dtype='float64', copy=True)
+
+    with np.errstate(invalid='ignore'):
+        u_valid = (two_parts &
+                   (u_lat >= -90) & (u_lat <= 90) &
+                   (u_lon >= -180) & (u_lon <= 180))
+    u_lat[~u_valid] = np.nan
+    u_lon[~u_valid] = np.nan
+
+    # Fehlende Werte (Code -1) zeigen auf einen zusätzlichen ungültigen Eintrag
+    u_lat = np.append(u_lat, np.nan)
+    u_lon = np.append(u_lon, np.nan)
+    u_valid = np.append(u_valid, False)
+
+    return u_lat[codes], u_lon[codes], u_valid[codes]
+
+
+def add_coord_columns(df, abs_col='ABS-KOOR', emp_col='EMP-KOOR'):
+    """
+    Parst Absende- und Empfangskoordinaten in einem gemeinsamen Durchlauf und
+    ergänzt den DataFrame um die Spalten ABS_LAT, ABS_LON, EMP_LAT, EMP_LON
+    sowie KOOR_OK (beide Koordinaten gültig).
+    """
+    n = len(df)
+    lat, lon, valid = parse_coord_strings(
+        pd.concat([df[abs_col], df[emp_col]], ignore_index=True))
+
+    df['ABS_LAT'] = lat[:n]
+    df['ABS_LON'] = lon[:n]
+    df['EMP_LAT'] = lat[n:]
+    df['EMP_LON'] = lon[n:]
+    df['KOOR_OK'] = valid[:n] & valid[n:]
+    return df
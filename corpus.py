@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (is_datetime64_any_dtype, is_object_dtype, is_string_dtype,
+                              CategoricalDtype)
+
+from coords import add_coord_columns
+from dates import parse_dates
+
+# Bei Änderungen an den abgeleiteten Spalten erhöhen, damit alte Caches verworfen werden
+CACHE_VERSION = 2
+
+
+# --- ABGELEITETE SPALTEN ---
+
+def add_date_columns(df):
+    """
+    Ergänzt DATUM_DATE (datetime64), DATUM_GENAUIGKEIT (tag/monat/jahr/unbekannt,
+    siehe dates.parse_dates) und DATUM_JAHR. Briefe, deren Datum nur auf Monat
+    oder Jahr genau bekannt ist, behalten so ihr Jahr für die Jahresfilter.
+    """
+    df['DATUM_DATE'], df['DATUM_GENAUIGKEIT'] = parse_dates(df['DATUM'])
+    df['DATUM_JAHR'] = df['DATUM_DATE'].dt.year
+    return df
+
+
+def prepare_letters(df):
+    """
+    Ergänzt die Spalten, die alle Kartenskripte benötigen: DATUM_DATE,
+    DATUM_JAHR und die geparsten Koordinaten (siehe coords.add_coord_columns).
+    """
+    add_date_columns(df)
+
+    # Vektorisiertes Parsen beider Koordinatenspalten (jeder Ort wird nur einmal geparst)
+    add_coord_columns(df)
+    return df
+
+
+# --- SPALTENORIENTIERTER CACHE NEBEN DER CSV-DATEI ---
+
+def file_hash(file_path):
+    """
+    SHA-256 des Dateiinhalts. Das Ergebnis wird zusammen mit Größe und
+    Änderungszeit gemerkt, damit unveränderte Dateien nicht erneut gelesen werden.
+    """
+    stat = os.stat(file_path)
+    stamp_path = os.path.join(cache_root(file_path), 'stamp.json')
+
+    try:
+        with open(stamp_path, 'r', encoding='utf-8') as f:
+            stamp = json.load(f)
+        if stamp['size'] == stat.st_size and stamp['mtime_ns'] == stat.st_mtime_ns:
+            return stamp['sha256']
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    os.makedirs(cache_root(file_path), exist_ok=True)
+    with open(stamp_path, 'w', encoding='utf-8') as f:
+        json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}, f)
+    return digest
+
+
+def cache_root(file_path):
+    """Cache-Ordner einer CSV-Datei, z.B. 'Briefe.csv' -> 'Briefe.csv.cache'."""
+    return file_path + '.cache'
+
+
+def write_frame_cache(df, cache_dir):
+    """
+    Speichert einen DataFrame spaltenweise: Text-Spalten als Kategorien
+    (int32-Codes + Kategorienliste), Datumswerte als datetime64 und Zahlen
+    als float/int/bool-Arrays. Jede Spalte liegt in einer eigenen .npy-Datei.
+    """
+    tmp_dir = cache_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    meta = {'version': CACHE_VERSION, 'n_rows': len(df), 'columns': []}
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        file_name = f"{i:03d}.npy"
+
+        if isinstance(series.dtype, CategoricalDtype) or is_object_dtype(series.dtype) or \
+                is_string_dtype(series.dtype):
+            categorical = pd.Categorical(series.astype(object))
+            np.save(os.path.join(tmp_dir, file_name), categorical.codes.astype(np.int32))
+            meta['columns'].append({'name': column, 'kind': 'category', 'file': file_name,
+                                    'categories': [str(c) for c in categorical.categories]})
+        elif is_datetime64_any_dtype(series.dtype):
+            np.save(os.path.join(tmp_dir, file_name), series.to_numpy(dtype='datetime64[ns]'))
+            meta['columns'].append({'name': column, 'kind': 'datetime', 'file': file_name})
+        else:
+            np.save(os.path.join(tmp_dir, file_name), series.to_numpy())
+            meta['columns'].append({'name': column, 'kind': 'array', 'file': file_name})
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def read_frame_cache(cache_dir):
+    """Liest einen mit write_frame_cache gespeicherten DataFrame (Arrays per Memory-Map)."""
+    with open(os.path.join(cache_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    columns = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(cache_dir, column['file']), mmap_mode='r')
+        if column['kind'] == 'category':
+            columns[column['name']] = pd.Categorical.from_codes(values, categories=column['categories'])
+        else:
+            columns[column['name']] = values
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta['n_rows']), copy=False)
+
+
+def load_table(file_path, prepare=None, use_cache=True):
+    """
+    Lädt eine CSV-Datei über den spaltenorientierten Cache.
+
+    Der Cache liegt neben der CSV-Datei und ist über den Inhalts-Hash der
+    Datei, die Vorbereitungsfunktion und CACHE_VERSION eindeutig bestimmt.
+    Ändert sich die CSV-Datei, wird der Cache beim nächsten Aufruf neu erstellt.
+    """
+    if not use_cache:
+        df = pd.read_csv(file_path)
+        return prepare(df) if prepare else df
+
+    variant = prepare.__name__ if prepare else 'roh'
+    cache_dir = os.path.join(cache_root(file_path),
+                             f"{variant}-{file_hash(file_path)[:16]}-v{CACHE_VERSION}")
+
+    if os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        return read_frame_cache(cache_dir)
+
+    df = pd.read_csv(file_path)
+    if prepare:
+        df = prepare(df)
+
+    # Veraltete Caches derselben Variante entfernen
+    for entry in os.listdir(cache_root(file_path)):
+        if entry.startswith(variant + '-'):
+            shutil.rmtree(os.path.join(cache_root(file_path), entry), ignore_errors=True)
+
+    write_frame_cache(df, cache_dir)
+    return read_frame_cache(cache_dir)
+
+
+def load_letters(file_path, use_cache=True):
+    """Lädt den Brief-Export inklusive Datums- und Koordinatenspalten (siehe prepare_letters)."""
+    return load_table(file_path, prepare_letters, use_cache)
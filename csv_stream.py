@@ -0,0 +1,94 @@
+import codecs
+import os
+
+import pandas as pd
+
+# Größe der Byte-Stichproben (Dateianfang und -ende) für die Kodierungserkennung
+SAMPLE_BYTES = 1 << 20
+
+
+def detect_encoding(file_path, sample_bytes=SAMPLE_BYTES):
+    """
+    Bestimmt die Kodierung einer CSV-Datei anhand von Stichproben am Anfang
+    und Ende der Datei, ohne sie vollständig zu lesen: 'utf-8-sig' bei BOM,
+    'utf-8' wenn die Stichproben gültiges UTF-8 sind, sonst 'latin1'
+    (typisch für Excel-Exporte). Liegt ein latin1-Zeichen nur in der Mitte
+    der Datei, fängt read_csv_chunks das beim Lesen ab.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(sample_bytes)
+        f.seek(max(size - sample_bytes, len(head)))
+        tail = f.read(sample_bytes)
+
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    try:
+        # final=False: ein am Stichprobenende abgeschnittenes Zeichen ist kein Fehler
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        if tail:
+            # Fortsetzungsbytes am Anfang der End-Stichprobe überspringen
+            start = next((i for i, b in enumerate(tail[:4]) if b & 0xC0 != 0x80), 0)
+            codecs.getincrementaldecoder('utf-8')().decode(tail[start:], final=True)
+    except UnicodeDecodeError:
+        return 'latin1'
+    return 'utf-8'
+
+
+def read_csv_chunks(file_path, chunksize=None, encoding=None, **kwargs):
+    """
+    Liest eine CSV-Datei als Folge von DataFrames mit höchstens chunksize
+    Zeilen (chunksize=None: die ganze Datei als ein DataFrame). Die Kodierung
+    wird vorab aus einer Stichprobe erkannt, sodass die Datei nur einmal
+    gelesen wird. Stößt das Lesen später doch auf ein ungültiges Zeichen, wird
+    ab der ersten noch nicht ausgegebenen Zeile mit latin1 weitergelesen.
+    """
+    encoding = encoding or detect_encoding(file_path)
+    if chunksize is None:
+        try:
+            yield pd.read_csv(file_path, encoding=encoding, **kwargs)
+        except UnicodeDecodeError:
+            # Wie früher in 00_tagtransfer: zweiter Versuch mit latin1
+            yield pd.read_csv(file_path, encoding='latin1', **kwargs)
+        return
+
+    n_rows = 0
+    try:
+        with pd.read_csv(file_path, encoding=encoding, chunksize=chunksize, **kwargs) as reader:
+            for chunk in reader:
+                n_rows += len(chunk)
+                yield chunk
+    except UnicodeDecodeError:
+        # Kopfzeile behalten, bereits ausgegebene Zeilen überspringen
+        print(f"Hinweis: Ungültiges Zeichen nach Zeile {n_rows} in '{os.path.basename(file_path)}', "
+              "lese ab dort mit latin1 weiter.")
+        with pd.read_csv(file_path, encoding='latin1', chunksize=chunksize,
+                         skiprows=lambda row: 0 < row <= n_rows, **kwargs) as reader:
+            for chunk in reader:
+                chunk.index += n_rows
+                yield chunk
+
+
+def write_csv_chunks(chunks, output_path, **kwargs):
+    """
+    Schreibt eine Folge von DataFrames nacheinander in eine CSV-Datei
+    (Kopfzeile nur beim ersten Block). Gibt die Anzahl der Zeilen zurück.
+
+    Geschrieben wird in output_path + '.tmp'; erst wenn alle Blöcke
+    geschrieben sind, ersetzt die Datei die Ausgabe. Bricht das Lesen ab
+    (z.B. wegen eines Kodierungsfehlers), bleibt die vorherige Ausgabe erhalten.
+    """
+    tmp_path = output_path + '.tmp'
+    n_rows = 0
+    try:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False, **kwargs)
+            n_rows += len(chunk)
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return n_rows
@@ -0,0 +1,115 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Genauigkeit eines geparsten Datums (Spalte DATUM_GENAUIGKEIT)
+TAG = 'tag'
+MONAT = 'monat'
+JAHR = 'jahr'
+UNBEKANNT = 'unbekannt'
+GENAUIGKEITEN = [TAG, MONAT, JAHR, UNBEKANNT]
+
+# Monatsnamen (die ersten drei Buchstaben genügen, z.B. 'Okt.' oder 'Oktober')
+MONATE = {'jan': 1, 'feb': 2, 'mär': 3, 'mae': 3, 'mar': 3, 'apr': 4, 'mai': 5, 'jun': 6,
+          'jul': 7, 'aug': 8, 'sep': 9, 'okt': 10, 'nov': 11, 'dez': 12}
+
+# Zusätze ungefährer oder erschlossener Angaben, die vor dem Parsen entfernt werden
+# ('ca. 1905', 'um 1900', '[1905]', '1905?')
+ZUSAETZE = re.compile(r'^(?:ca\.?|circa|um|etwa|vermutl(?:ich|\.)|~)\s*|[\[\]?]')
+
+_MONATSNAME = r'[a-zäöü]{3,9}\.?'
+
+# Unterstützte Formate; Gruppen je Format: t = Tag, m = Monat, n = Monatsname, j = Jahr
+FORMATE = [
+    r'(?P<j1>\d{4})-(?P<m1>\d{1,2})-(?P<t1>\d{1,2})(?:[t ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?',  # 1905-03-12
+    r'(?P<t2>\d{1,2})[./-]\s*(?P<m2>\d{1,2})[./-]\s*(?P<j2>\d{4})',  # 12.03.1905, 12-03-1905, 12/03/1905
+    r'(?P<j3>\d{4})-(?P<m3>\d{1,2})',  # 1905-03
+    r'(?P<m4>\d{1,2})[./-]\s*(?P<j4>\d{4})',  # 03.1905, 03-1905
+    rf'(?:(?P<t5>\d{{1,2}})\.?\s*)?(?P<n5>{_MONATSNAME})\s+(?P<j5>\d{{4}})',  # 12. März 1905, März 1905
+    r'(?P<j6>\d{4})(?:\s*[-/]\s*\d{2,4})?',  # 1905, Jahresbereich 1905/06 (erstes Jahr)
+]
+DATUMS_MUSTER = '^(?:' + '|'.join(FORMATE) + ')$'
+
+
+def _column(parts, prefix):
+    """Fasst die Gruppen eines Bestandteils (z.B. alle j-Gruppen) zu einer Spalte zusammen."""
+    result = pd.Series(None, index=parts.index, dtype=object)
+    for column in parts.columns:
+        if column[0] == prefix:
+            result = result.where(result.notna(), parts[column].astype(object))
+    return result
+
+
+def _parse_unique(strings):
+    """
+    Parst die eindeutigen Datumsstrings mit einem einzigen regulären Ausdruck.
+    Gibt datetime64[D] und die Genauigkeit (Codes in GENAUIGKEITEN) zurück.
+    """
+    cleaned = strings.str.lower().str.strip().str.replace(ZUSAETZE, '', regex=True).str.strip()
+    parts = cleaned.str.extract(DATUMS_MUSTER)
+
+    year = pd.to_numeric(_column(parts, 'j'), errors='coerce').to_numpy(dtype=np.float64)
+    month = pd.to_numeric(_column(parts, 'm'), errors='coerce').to_numpy(dtype=np.float64)
+    names = _column(parts, 'n').astype(object).where(lambda s: s.notna(), '').astype(str).str[:3]
+    month_from_name = names.map(MONATE).to_numpy(dtype=np.float64)
+    month = np.where(np.isnan(month), month_from_name, month)
+    day = pd.to_numeric(_column(parts, 't'), errors='coerce').to_numpy(dtype=np.float64)
+
+    has_year = ~np.isnan(year)
+    has_month = has_year & (month >= 1) & (month <= 12)
+
+    # Tage pro Monat über datetime64[M], damit z.B. der 31.02. auf Monatsgenauigkeit zurückfällt
+    months = np.where(has_month, (year - 1970) * 12 + month - 1, 0).astype(np.int64).astype('datetime64[M]')
+    days_in_month = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    has_day = has_month & (day >= 1) & (day <= days_in_month)
+
+    precision = np.full(len(strings), GENAUIGKEITEN.index(UNBEKANNT), dtype=np.int8)
+    precision[has_year] = GENAUIGKEITEN.index(JAHR)
+    precision[has_month] = GENAUIGKEITEN.index(MONAT)
+    precision[has_day] = GENAUIGKEITEN.index(TAG)
+
+    # Unvollständige Datumsangaben auf den Anfang des Monats bzw. Jahres setzen
+    month_index = np.where(has_month, month, 1)
+    day_index = np.where(has_day, day, 1)
+    dates = np.full(len(strings), np.datetime64('NaT'), dtype='datetime64[D]')
+    start = (np.where(has_year, year, 1970) - 1970) * 12 + month_index - 1
+    dates[has_year] = (start[has_year].astype(np.int64).astype('datetime64[M]').astype('datetime64[D]')
+                       + (day_index[has_year].astype(np.int64) - 1))
+    return dates, precision
+
+
+def parse_dates(values):
+    """
+    Vektorisiertes Parsen der NODEGOAT-Datumsangaben (ISO, deutsche Schreibweise,
+    Monat/Jahr, Monatsnamen, nur Jahr, 'ca.'-Angaben). Jeder eindeutige String
+    wird nur einmal geparst.
+
+    Gibt (dates, precision) zurück: dates als datetime64-Series (unvollständige
+    Angaben am Monats- bzw. Jahresanfang, sonst NaT) und precision als
+    Kategorie mit den Werten aus GENAUIGKEITEN.
+    """
+    series = pd.Series(values, copy=False)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+    u_dates, u_precision = _parse_unique(pd.Series(uniques, dtype=object).astype(str))
+
+    # Fehlende Werte (Code -1) zeigen auf einen angehängten NaT-/unbekannt-Eintrag
+    u_dates = np.append(u_dates, np.datetime64('NaT'))
+    u_precision = np.append(u_precision, np.int8(GENAUIGKEITEN.index(UNBEKANNT)))
+
+    dates = pd.Series(u_dates[codes].astype('datetime64[us]'), index=series.index)
+    precision = pd.Series(pd.Categorical.from_codes(u_precision[codes], categories=GENAUIGKEITEN),
+                          index=series.index)
+    return dates, precision
+
+
+def format_date(date_value, precision=TAG):
+    """Datum in der Schreibweise seiner Genauigkeit ('1905-03-12', '1905-03' oder '1905')."""
+    if pd.isna(date_value) or precision == UNBEKANNT:
+        return None
+    if precision == JAHR:
+        return date_value.strftime('%Y')
+    if precision == MONAT:
+        return date_value.strftime('%Y-%m')
+    return date_value.strftime('%Y-%m-%d')
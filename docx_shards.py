@@ -0,0 +1,92 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from docx import Document
+from docx.oxml import parse_xml
+from lxml import etree
+
+# Anzahl Datensätze pro Shard im Parallelmodus
+SHARD_GROESSE = 500
+
+
+def shard_bounds(n_records, shard_size=SHARD_GROESSE):
+    """Zerlegt n_records sortierte Datensätze in zusammenhängende Bereiche [(start, stop), ...]."""
+    return [(start, min(start + shard_size, n_records)) for start in range(0, n_records, shard_size)]
+
+
+def body_xml(document):
+    """Serialisiert den Body eines Shard-Dokuments ohne dessen abschließendes sectPr."""
+    body = document._element.body
+    if body.sectPr is not None:
+        body.remove(body.sectPr)
+    return etree.tostring(body)
+
+
+def append_body_xml(document, xml, before_sectpr=True):
+    """
+    Hängt alle Elemente eines mit body_xml serialisierten Bodys in Reihenfolge
+    an das Dokument an – vor dessen abschließendes sectPr (wie add_paragraph)
+    oder, mit before_sectpr=False, ans Ende des Bodys (wie body.append).
+    """
+    body = document._element.body
+    sectPr = body.sectPr if before_sectpr else None
+    for child in list(parse_xml(xml)):
+        if sectPr is not None:
+            sectPr.addprevious(child)
+        else:
+            body.append(child)
+
+
+def render_shards(render_shard, shards, max_workers=None, initializer=None, initargs=()):
+    """
+    Rendert die Shards in einem Prozess-Pool und liefert die Ergebnisse in
+    Shard-Reihenfolge, sobald sie vorliegen. render_shard muss eine Funktion
+    auf Modulebene sein, damit sie an die Prozesse übergeben werden kann.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        yield from executor.map(render_shard, shards)
+
+
+# --- ANHANG-GENERATOREN: VORLAGE PRO DATENSATZ (021/022) ---
+
+_worker_vorlage = None
+
+
+def _init_template_worker(insert, template_para_xml, template_table_xml):
+    """Übergibt Einfügefunktion und Vorlage einmal pro Prozess statt einmal pro Shard."""
+    global _worker_vorlage
+    _worker_vorlage = (insert, parse_xml(template_para_xml), parse_xml(template_table_xml))
+
+
+def _render_template_shard(shard):
+    start, rows = shard
+    insert, template_para_xml, template_table_xml = _worker_vorlage
+
+    document = Document()
+    document._element.body.clear_content()
+    insert(document, template_para_xml, template_table_xml, rows, start=start)
+    return body_xml(document)
+
+
+def insert_sharded(doc, insert, template_para_xml, template_table_xml, rows,
+                   shard_size=SHARD_GROESSE, max_workers=None):
+    """
+    Parallelversion der Einfügeschleifen aus 021/022 (insert = fuege_briefe_ein
+    oder fuege_personen_ein). Die Datensätze werden in zusammenhängende Shards
+    zerlegt, jeder Shard wird in einem eigenen Prozess in einen leeren Body
+    gerendert und die Bodies werden in Reihenfolge an doc angehängt. Die
+    Nummerierung läuft über start durchgehend weiter.
+    Gibt die Anzahl der eingefügten Datensätze zurück.
+    """
+    rows = list(rows)
+    shards = [(start + 1, rows[start:stop]) for start, stop in shard_bounds(len(rows), shard_size)]
+
+    if len(shards) < 2:
+        return insert(doc, template_para_xml, template_table_xml, rows)
+
+    for xml in render_shards(_render_template_shard, shards, max_workers,
+                             initializer=_init_template_worker,
+                             initargs=(insert, etree.tostring(template_para_xml),
+                                       etree.tostring(template_table_xml))):
+        append_body_xml(doc, xml, before_sectpr=False)
+    return len(rows)
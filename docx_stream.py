@@ -0,0 +1,102 @@
+import os
+import zipfile
+from io import BytesIO
+
+from docx import Document
+from lxml import etree
+
+DOCUMENT_PART = 'word/document.xml'
+
+
+def _inner_xml(body):
+    """Serialisiert die Kinder des Bodys ohne das umschließende w:body-Tag (und ohne Namespace-Deklarationen)."""
+    xml = etree.tostring(body, encoding='unicode')
+    if xml.endswith('/>'):
+        return ''
+    return xml[xml.index('>') + 1:xml.rindex('</')]
+
+
+class StreamingDocument:
+    """
+    Schreibt ein DOCX-Dokument absatzweise direkt in die ZIP-Datei, statt den
+    gesamten python-docx-Objektbaum bis zum Speichern im Speicher zu halten.
+
+    Inhalte werden wie gewohnt über python-docx in ein Arbeitsdokument
+    (self.document, z.B. mit add_heading/add_paragraph/add_section) geschrieben.
+    flush() überträgt die bisher geschriebenen Elemente in word/document.xml
+    und entfernt sie aus dem Arbeitsdokument. Stile, Einstellungen und alle
+    übrigen Teile stammen aus der Vorlage, das Ergebnis entspricht also einem
+    mit document.save gespeicherten Dokument.
+
+    Geschrieben wird in path + '.tmp'; erst close() ersetzt damit die Ausgabe.
+    Bricht die Erzeugung ab, bleibt ein zuvor gespeichertes Dokument erhalten.
+    """
+
+    def __init__(self, path, template=None):
+        self.document = Document(template)
+        body = self.document._element.body
+        body.clear_content()
+
+        # Alle Teile außer word/document.xml aus der leeren Vorlage übernehmen
+        package = BytesIO()
+        self.document.save(package)
+
+        self.path = path
+        self._tmp_path = path + '.tmp'
+        self._zip = zipfile.ZipFile(self._tmp_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(package) as source:
+            for info in source.infolist():
+                if info.filename != DOCUMENT_PART:
+                    self._zip.writestr(info, source.read(info.filename))
+
+        # Kopf und Ende von word/document.xml aus dem Wurzelelement ableiten
+        sectPr = body.sectPr
+        body.remove(sectPr)
+        root_xml = etree.tostring(self.document._element, encoding='UTF-8', standalone=True).decode('utf-8')
+        body.append(sectPr)
+
+        empty_body = root_xml.index('<w:body/>')
+        self._head = root_xml[:empty_body] + '<w:body>'
+        self._tail = '</w:body>' + root_xml[empty_body + len('<w:body/>'):]
+
+        self._stream = self._zip.open(DOCUMENT_PART, 'w', force_zip64=True)
+        self._stream.write(self._head.encode('utf-8'))
+
+    def flush(self):
+        """Schreibt alle neuen Elemente des Arbeitsdokuments in die ZIP-Datei und verwirft sie."""
+        body = self.document._element.body
+        sectPr = body.sectPr
+        body.remove(sectPr)
+        self._stream.write(_inner_xml(body).encode('utf-8'))
+        body.clear_content()
+        body.append(sectPr)
+
+    def close(self):
+        """Schreibt das abschließende sectPr, schließt die Datei und ersetzt damit die Ausgabe."""
+        self.flush()
+        self._stream.write((_inner_xml(self.document._element.body) + self._tail).encode('utf-8'))
+        self._stream.close()
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Bricht ab: schließt und löscht die unvollständige Datei, die Ausgabe bleibt unverändert."""
+        try:
+            self._stream.close()
+            self._zip.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+            return
+        try:
+            self.close()
+        except BaseException:
+            self.discard()
+            raise
@@ -0,0 +1,85 @@
+import re
+from copy import deepcopy
+
+from docx.oxml.ns import qn
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
+
+
+def template_cells(table_xml):
+    """
+    Alle Zellen einer Vorlagen-Tabelle in Lesereihenfolge. Verbundene Zellen,
+    die python-docx mehrfach liefert, werden nur einmal zurückgegeben.
+    """
+    # Die Menge hält die lxml-Elemente am Leben, ihre Identität bleibt so eindeutig
+    seen = set()
+    for row in Table(table_xml, None).rows:
+        for cell in row.cells:
+            if cell._tc not in seen:
+                seen.add(cell._tc)
+                yield cell
+
+
+def element_path(root, element):
+    """Kindindizes vom Wurzelelement bis zum Element."""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+class SlotTemplate:
+    """
+    Einmal analysierte Vorlage (Absatz oder Tabelle) für die Anhang-Generatoren.
+
+    Beim Anlegen wird festgehalten, welche Absätze bzw. Zellen welche
+    Platzhalter enthalten (als Pfad im XML-Baum und als Textschablone).
+    Pro Datensatz wird die Vorlage nur kopiert und die bekannten Stellen
+    werden direkt gefüllt – ohne erneutes Durchsuchen aller Zellen.
+    """
+
+    def __init__(self, template_xml, placeholders):
+        self.xml = template_xml
+        # Längere Namen zuerst, damit z.B. 'REF-10' nicht als 'REF-1' erkannt wird
+        self.pattern = re.compile('(' + '|'.join(
+            re.escape(p) for p in sorted(placeholders, key=len, reverse=True)) + ')')
+        self.slots = []
+
+        if template_xml.tag == qn('w:p'):
+            candidates = [(template_xml, Paragraph(template_xml, None).text)]
+        else:
+            candidates = [(cell._tc, cell.text) for cell in template_cells(template_xml)]
+
+        for element, text in candidates:
+            parts = self.pattern.split(text)
+            if len(parts) > 1:
+                self.slots.append((element_path(template_xml, element), parts))
+
+        # Nur die tatsächlich verwendeten Platzhalter müssen pro Datensatz aufbereitet werden
+        self.placeholders = list(dict.fromkeys(
+            name for _, parts in self.slots for name in parts[1::2]))
+
+    def copy(self):
+        """Kopie der Vorlage und Liste der (Element, Textschablone) mit Platzhaltern."""
+        new_xml = deepcopy(self.xml)
+        slots = []
+        for path, parts in self.slots:
+            element = new_xml
+            for index in path:
+                element = element[index]
+            slots.append((element, parts))
+        return new_xml, slots
+
+
+def fill(parts, values):
+    """Setzt die Werte in eine Textschablone ein (ungerade Positionen = Platzhalter)."""
+    return ''.join(values.get(part, '') if i % 2 else part for i, part in enumerate(parts))
+
+
+def set_cell_text(tc, text, table=None):
+    """Ersetzt den Inhalt einer Zelle durch einen einzelnen Absatz (wie _Cell.text)."""
+    cell = _Cell(tc, table)
+    cell.text = text
+    return cell
@@ -0,0 +1,245 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from fulltext import tokenize
+
+# Blöcke mit mehr Namen als diesem Wert sind zu unspezifisch (z.B. häufige n-Gramme)
+# und werden beim Blocking übersprungen
+BLOCK_MAX = 50
+
+# Länge der n-Gramme für Blocking und Ähnlichkeit
+NGRAM = 3
+
+# Mindestähnlichkeit für einen Vorschlag. Orte: Jaccard der Trigramme, bei gleichem Klang
+# (Kölner Phonetik) genügt die Hälfte, damit Tippfehler wie 'Heidelburg' gefunden werden.
+# Personen: Mittel aus Nachnamen- und Vornamenähnlichkeit (siehe given_name_similarity),
+# bei gleichem Klang des Nachnamens und gleichen Vornamen immer ein Vorschlag ('Meier'/'Maier')
+SCHWELLE_PERSONEN = 0.6
+SCHWELLE_ORTE = 0.6
+
+# Vornamenähnlichkeit: gleich, verträglich (Initiale zu ausgeschriebenem Namen oder
+# zusätzlicher Vorname), unbekannt (auf einer Seite fehlend) und widersprüchlich
+VORNAME_GLEICH = 1.0
+VORNAME_VERTRAEGLICH = 0.75
+VORNAME_UNBEKANNT = 0.5
+VORNAME_WIDERSPRUCH = 0.0
+
+# Buchstabengruppen der Kölner Phonetik
+_VOKALE = set('aeijouy')
+_CODES = {'b': '1', 'f': '3', 'v': '3', 'w': '3', 'g': '4', 'k': '4', 'q': '4',
+          'l': '5', 'm': '6', 'n': '6', 'r': '7', 's': '8', 'z': '8'}
+
+
+@functools.lru_cache(maxsize=None)
+def koelner_phonetik(word):
+    """
+    Kölner Phonetik eines (gefalteten) Wortes, z.B. 'schoetensack' -> '82684'.
+    Gleich klingende Schreibweisen wie Schötensack/Schoetensack/Schötensak
+    erhalten denselben Code.
+    """
+    word = ''.join(c for c in word if 'a' <= c <= 'z')
+    codes = []
+    for i, c in enumerate(word):
+        before = word[i - 1] if i > 0 else ''
+        after = word[i + 1] if i + 1 < len(word) else ''
+        if c in _VOKALE:
+            code = '0'
+        elif c == 'h':
+            code = ''
+        elif c == 'p':
+            code = '3' if after == 'h' else '1'
+        elif c in 'dt':
+            code = '8' if after in ('c', 's', 'z') and after else '2'
+        elif c == 'c':
+            if i == 0:
+                code = '4' if after and after in 'ahkloqrux' else '8'
+            else:
+                code = '4' if after and after in 'ahkoqux' and before not in ('s', 'z') else '8'
+        elif c == 'x':
+            code = '8' if before in ('c', 'k', 'q') and before else '48'
+        else:
+            code = _CODES.get(c, '')
+        codes.append(code)
+
+    # Doppelte aufeinanderfolgende Codes zusammenfassen, Nullen außer am Anfang entfernen
+    result = []
+    for code in ''.join(codes):
+        if not result or result[-1] != code:
+            result.append(code)
+    if not result:
+        return ''
+    return result[0] + ''.join(c for c in result[1:] if c != '0')
+
+
+def split_person(name):
+    """(Nachname, Vornamen) als gefaltete Wortlisten; 'Nachname, Vorname' oder 'Vorname Nachname'."""
+    name = str(name)
+    if ',' in name:
+        last, first = name.split(',', 1)
+        return tokenize(last), tokenize(first)
+    words = tokenize(name)
+    return words[-1:], words[:-1]
+
+
+@functools.lru_cache(maxsize=None)
+def given_name_similarity(first_a, first_b):
+    """
+    Ähnlichkeit zweier Vornamenfolgen (Tupel gefalteter Wörter). Verglichen wird
+    Wort für Wort: eine Initiale passt zu jedem Namen mit demselben Anfangsbuchstaben,
+    zwei ausgeschriebene Namen nur, wenn sie gleich sind ('hans' und 'hanna' widersprechen sich).
+    """
+    if not first_a or not first_b:
+        return VORNAME_UNBEKANNT
+    if first_a == first_b:
+        return VORNAME_GLEICH
+    for word_a, word_b in zip(first_a, first_b):
+        if len(word_a) == 1 or len(word_b) == 1:
+            if word_a[0] != word_b[0]:
+                return VORNAME_WIDERSPRUCH
+        elif word_a != word_b:
+            return VORNAME_WIDERSPRUCH
+    return VORNAME_VERTRAEGLICH
+
+
+def _ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class _GramSets:
+    """
+    n-Gramm-Mengen aller Namen als sortierte int64-Codes (Name * Anzahl n-Gramme
+    + n-Gramm), damit die Schnittmengen vieler Paare auf einmal gezählt werden können.
+    """
+
+    def __init__(self, texts):
+        grams = [_ngrams(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(g) for g in grams])
+        gram_codes, vocabulary = pd.factorize(pd.Series([g for s in grams for g in s], dtype=object))
+        self.n_grams = max(len(vocabulary), 1)
+
+        self.codes = np.unique(rows.astype(np.int64) * self.n_grams + gram_codes)
+        self.sizes = np.bincount(rows, minlength=len(texts)).astype(np.int64)
+        self.starts = np.concatenate([[0], np.cumsum(self.sizes)[:-1]])
+
+    def jaccard(self, a, b):
+        """Jaccard-Ähnlichkeit der n-Gramm-Mengen für die Paare (a[i], b[i])."""
+        sizes_a = self.sizes[a]
+        pair = np.repeat(np.arange(len(a)), sizes_a)
+        offset = np.arange(len(pair)) - np.repeat(np.cumsum(sizes_a) - sizes_a, sizes_a)
+        grams = self.codes[self.starts[a][pair] + offset] % self.n_grams
+
+        # Jedes n-Gramm von a im Code-Bereich von b nachschlagen
+        probe = b[pair].astype(np.int64) * self.n_grams + grams
+        found = np.searchsorted(self.codes, probe)
+        hit = self.codes[np.minimum(found, len(self.codes) - 1)] == probe
+
+        common = np.bincount(pair, weights=hit, minlength=len(a))
+        union = sizes_a + self.sizes[b] - common
+        return np.where(union > 0, common / np.maximum(union, 1), 0.0)
+
+
+def candidate_pairs(keys, block_max=BLOCK_MAX):
+    """
+    Kandidatenpaare (a, b) mit a < b aus Blockschlüsseln. keys ist ein DataFrame
+    mit den Spalten 'satz' (Nummer des Namens) und 'schluessel'. Paare werden pro
+    Blockgröße vektorisiert erzeugt; zu große Blöcke entfallen.
+    """
+    keys = keys.drop_duplicates()
+    codes, _ = pd.factorize(keys['schluessel'])
+    order = np.argsort(codes, kind='stable')
+    codes, records = codes[order], keys['satz'].to_numpy(dtype=np.int64)[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    sizes = np.diff(np.r_[starts, len(codes)])
+
+    pairs = []
+    for size in np.unique(sizes[(sizes >= 2) & (sizes <= block_max)]):
+        blocks = records[starts[sizes == size][:, None] + np.arange(size)]
+        i, j = np.triu_indices(size, k=1)
+        pairs.append(np.stack([blocks[:, i].ravel(), blocks[:, j].ravel()], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pairs = np.concatenate(pairs)
+    pairs = np.sort(pairs, axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return np.unique(pairs, axis=0)
+
+
+def _suggestions(names, ids, a, b, score, sound, keep, extra):
+    # Namen mit derselben ID sind bereits zusammengeführt
+    same = (ids[a] == ids[b]) & pd.notna(ids[a])
+    keep &= ~same
+    a, b = a[keep], b[keep]
+    result = pd.DataFrame({
+        'NAME_A': names[a], 'ID_A': ids[a],
+        'NAME_B': names[b], 'ID_B': ids[b],
+        'AEHNLICHKEIT': np.round(score[keep], 3),
+        'GLEICHER_KLANG': sound[keep],
+    })
+    for column, values in extra.items():
+        result[column] = values[keep]
+    return result.sort_values(['AEHNLICHKEIT', 'NAME_A', 'NAME_B'], ascending=[False, True, True], ignore_index=True)
+
+
+def _records(df, name_column, id_column):
+    records = df[[name_column, id_column]].astype(object)
+    records = records[records[name_column].notna()].copy()
+    records[name_column] = records[name_column].astype(str).str.strip()
+    records = records[records[name_column] != ''].drop_duplicates(ignore_index=True)
+    return records[name_column].to_numpy(dtype=object), records[id_column].to_numpy(dtype=object)
+
+
+def suggest_person_merges(df, name_column='KORR-NAME', id_column='PERSON-ID', threshold=SCHWELLE_PERSONEN):
+    """
+    Zusammenführungsvorschläge für die Personentabelle. Blockschlüssel sind die
+    Kölner Phonetik und die Trigramme des Nachnamens. Die Ähnlichkeit ist das
+    Mittel aus der Trigramm-Ähnlichkeit des Nachnamens und der Vornamenähnlichkeit:
+    Initialen wie 'O.' passen zu 'Otto', verschiedene ausgeschriebene Vornamen
+    ('Hans'/'Heinrich') senken sie unter die Schwelle. Gleich klingende Nachnamen
+    mit gleichen Vornamen ('Meier, Karl'/'Maier, Karl') werden immer vorgeschlagen.
+    """
+    names, ids = _records(df, name_column, id_column)
+    parts = [split_person(name) for name in names]
+    last = [' '.join(l) for l, _ in parts]
+    first = [tuple(f) for _, f in parts]
+    phonetic = np.array([koelner_phonetik(''.join(l)) for l, _ in parts], dtype=object)
+
+    keys = [(i, 'k:' + code) for i, code in enumerate(phonetic) if code]
+    keys += [(i, 'n:' + g) for i, text in enumerate(last) if text for g in _ngrams(text)]
+    pairs = candidate_pairs(pd.DataFrame(keys, columns=['satz', 'schluessel']))
+    a, b = pairs[:, 0], pairs[:, 1]
+
+    last_score = _GramSets(last).jaccard(a, b)
+    given_score = np.array([given_name_similarity(first[i], first[j]) for i, j in zip(a, b)], dtype=np.float64)
+    score = (last_score + given_score) / 2
+    sound = (phonetic[a] == phonetic[b]) & (phonetic[a] != '')
+    keep = (score >= threshold) | (sound & (given_score == VORNAME_GLEICH))
+
+    return _suggestions(names, ids, a, b, score, sound, keep,
+                        {'NACHNAME_AEHNLICHKEIT': np.round(last_score, 3),
+                         'VORNAME_AEHNLICHKEIT': given_score})
+
+
+def suggest_place_merges(df, name_column='ORT-NAME', id_column='ORT-GEONAMES', threshold=SCHWELLE_ORTE):
+    """
+    Zusammenführungsvorschläge für die Ortstabelle. Blockschlüssel sind die
+    Kölner Phonetik des ersten Wortes und die Trigramme des Namens.
+    """
+    names, ids = _records(df, name_column, id_column)
+    words = [tokenize(name) for name in names]
+    texts = [' '.join(w) for w in words]
+    phonetic = np.array([koelner_phonetik(w[0]) if w else '' for w in words], dtype=object)
+
+    keys = [(i, 'k:' + code) for i, code in enumerate(phonetic) if code]
+    keys += [(i, 'n:' + g) for i, text in enumerate(texts) if text for g in _ngrams(text)]
+    pairs = candidate_pairs(pd.DataFrame(keys, columns=['satz', 'schluessel']))
+    a, b = pairs[:, 0], pairs[:, 1]
+
+    score = _GramSets(texts).jaccard(a, b)
+    sound = (phonetic[a] == phonetic[b]) & (phonetic[a] != '')
+    keep = (score >= threshold) | (sound & (score >= threshold / 2))
+    return _suggestions(names, ids, a, b, score, sound, keep, {})
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from corpus import CACHE_VERSION, cache_root, file_hash, read_frame_cache, write_frame_cache
+from flows import ROUTE_COLUMNS
+from tag_index import TAG_COLUMNS, split_tags
+
+# Bei Änderungen am Aufbau des Würfels erhöhen, damit alte Caches verworfen werden
+CUBE_VERSION = 1
+
+# Tag-Eintrag, unter dem jeder datierte Brief einmal geführt wird (Abfrage ohne Schlagwort)
+ALLE = ''
+
+
+def _ragged(starts, counts):
+    """Indizes aller Bereiche [start, start + count) hintereinander."""
+    total = counts.sum()
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(total) + np.repeat(starts - np.cumsum(counts) + counts, counts)
+
+
+def _first_valid(values, route, route_ids):
+    """
+    Pro Route (route aufsteigend sortiert) der erste Wert, der nicht NaN ist,
+    wie 'first' in groupby; NaN, wenn die Route keinen solchen Wert hat.
+    """
+    result = np.full(len(route_ids), np.nan, dtype=object)
+    valid = ~pd.isna(values)
+    valid_ids, first = np.unique(route[valid], return_index=True)
+    result[np.searchsorted(route_ids, valid_ids)] = values[valid][first]
+    return result
+
+
+class FlowCube:
+    """
+    Vorberechneter Würfel (Jahr × Tag × Route) über einen vorbereiteten Korpus.
+
+    Jede Zelle enthält die Anzahl der Briefe und die Liste ihrer
+    Zeilenpositionen. Eine Route ist ein Paar aus Absende- und Empfangsort
+    (Koordinaten, optional zusätzlich die Spalte by, z.B. die Linienfarbe);
+    Briefe ohne gültige Koordinaten werden unter der Route -1 geführt, damit
+    sie in den Briefzahlen mitzählen. Tags sind die normalisierten Tags aller
+    tag_columns (wie im TagIndex), zusätzlich steht jeder datierte Brief unter
+    dem Tag ALLE.
+
+    Die Zellen sind nach (Tag, Jahr, Route) sortiert: ein Jahresbereich eines
+    Tags ist ein zusammenhängender Ausschnitt, den zwei Binärsuchen finden.
+    """
+
+    def __init__(self, df, cells, positions, routes, tags, by=None):
+        self.df = df
+        self.by = by
+        self.tags = tags
+        self.cell_tag = cells['TAG'].to_numpy()
+        self.cell_year = cells['JAHR'].to_numpy()
+        self.cell_route = cells['ROUTE'].to_numpy()
+        self.cell_start = cells['START'].to_numpy()
+        self.cell_count = cells['ANZAHL'].to_numpy()
+        self.positions = positions
+        self.routes = routes
+        self.tag_bounds = np.searchsorted(self.cell_tag, np.arange(len(tags) + 1))
+
+        # Brief-Felder für die Popups einmal als Arrays bereitstellen
+        self.brief_ids = df['BRIEF-ID'].astype(str).to_numpy(dtype=object)
+        self.abs_ort = df['ABS-ORT'].to_numpy(dtype=object)
+        self.emp_ort = df['EMP-ORT'].to_numpy(dtype=object)
+
+        # Route jedes Briefs (-1: ohne gültige Koordinaten oder ohne Datum)
+        self.letter_route = np.full(len(df), -1, dtype=np.int64)
+        alle = self._cell_range(tags.index(ALLE), -np.inf, np.inf) if ALLE in tags else np.empty(0, dtype=np.int64)
+        self.letter_route[positions[_ragged(self.cell_start[alle], self.cell_count[alle])]] = \
+            np.repeat(self.cell_route[alle], self.cell_count[alle])
+
+    # --- AUFBAU ---
+
+    @classmethod
+    def build(cls, df, tag_columns=None, by=None):
+        """Baut den Würfel aus dem vorbereiteten Korpus (Spalten aus corpus.prepare_letters)."""
+        tag_columns = list(tag_columns or TAG_COLUMNS)
+        n = len(df)
+        years = df['DATUM_JAHR'].to_numpy(dtype=np.float64)
+        dated = ~np.isnan(years)
+
+        # Routen wie in flows.aggregate_flows gruppieren
+        keys = ROUTE_COLUMNS + ([by] if by else [])
+        routable = df['KOOR_OK'].to_numpy() & dated
+        grouped = df[routable].groupby(keys, sort=False, observed=True)
+        letter_route = np.full(n, -1, dtype=np.int64)
+        letter_route[routable] = grouped.ngroup().to_numpy()
+        routes = grouped.size().reset_index()[keys]
+
+        # (Brief, Tag)-Paare: jeder datierte Brief unter ALLE und unter jedem seiner Tags
+        rows = [np.flatnonzero(dated)]
+        tags = [np.full(len(rows[0]), ALLE, dtype=object)]
+        for column in tag_columns:
+            column_rows, column_tags = split_tags(df[column])
+            keep = dated[column_rows]
+            rows.append(column_rows[keep])
+            tags.append(column_tags[keep])
+        rows = np.concatenate(rows)
+        vocabulary, tag_codes = np.unique(np.concatenate(tags).astype(str), return_inverse=True)
+
+        # Doppelte Tags eines Briefs (z.B. in mehreren Spalten) nur einmal zählen
+        pairs = np.unique(tag_codes.astype(np.int64) * max(n, 1) + rows)
+        tag_codes, rows = pairs // max(n, 1), pairs % max(n, 1)
+
+        year = years[rows].astype(np.int64)
+        route = letter_route[rows]
+        order = np.lexsort((rows, route, year, tag_codes))
+        tag_codes, year, route, rows = tag_codes[order], year[order], route[order], rows[order]
+
+        new_cell = np.ones(len(rows), dtype=bool)
+        new_cell[1:] = (tag_codes[1:] != tag_codes[:-1]) | (year[1:] != year[:-1]) | (route[1:] != route[:-1])
+        starts = np.flatnonzero(new_cell)
+        cells = pd.DataFrame({
+            'TAG': tag_codes[starts],
+            'JAHR': year[starts],
+            'ROUTE': route[starts],
+            'START': starts,
+            'ANZAHL': np.diff(np.append(starts, len(rows))),
+        })
+        return cls(df, cells, rows, routes, list(vocabulary), by)
+
+    @classmethod
+    def load(cls, file_path, df, tag_columns=None, by=None):
+        """
+        Lädt den Würfel aus dem Cache neben der CSV-Datei oder baut und
+        speichert ihn. Der Cache ist über den Inhalt der CSV-Datei, die
+        Tag-Spalten und den Inhalt der Spalte by eindeutig bestimmt.
+        """
+        tag_columns = list(tag_columns or TAG_COLUMNS)
+        # Die Version des Korpus-Caches gehört dazu, da sich abgeleitete Spalten (z.B. DATUM_JAHR) ändern können
+        params = hashlib.sha256(json.dumps([tag_columns, by, CACHE_VERSION]).encode('utf-8'))
+        if by:
+            params.update(pd.util.hash_pandas_object(df[by], index=False).to_numpy().tobytes())
+        variant = f"cube-{by or 'routen'}"
+        cache_dir = os.path.join(cache_root(file_path), f"{variant}-{file_hash(file_path)[:16]}-"
+                                                        f"{params.hexdigest()[:8]}-v{CUBE_VERSION}")
+
+        if os.path.exists(os.path.join(cache_dir, 'meta.json')):
+            with open(os.path.join(cache_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+                tags = json.load(f)['tags']
+            return cls(df, read_frame_cache(os.path.join(cache_dir, 'zellen')),
+                       read_frame_cache(os.path.join(cache_dir, 'briefe'))['POS'].to_numpy(),
+                       read_frame_cache(os.path.join(cache_dir, 'routen')), tags, by)
+
+        cube = cls.build(df, tag_columns, by)
+
+        # Veraltete Würfel derselben Variante entfernen
+        for entry in os.listdir(cache_root(file_path)):
+            if entry.startswith(variant + '-'):
+                shutil.rmtree(os.path.join(cache_root(file_path), entry), ignore_errors=True)
+
+        tmp_dir = cache_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        write_frame_cache(pd.DataFrame({'TAG': cube.cell_tag, 'JAHR': cube.cell_year, 'ROUTE': cube.cell_route,
+                                        'START': cube.cell_start, 'ANZAHL': cube.cell_count}),
+                          os.path.join(tmp_dir, 'zellen'))
+        write_frame_cache(pd.DataFrame({'POS': cube.positions}), os.path.join(tmp_dir, 'briefe'))
+        write_frame_cache(cube.routes, os.path.join(tmp_dir, 'routen'))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': CUBE_VERSION, 'tags': cube.tags}, f, ensure_ascii=False)
+        os.replace(tmp_dir, cache_dir)
+        return cube
+
+    # --- ABFRAGEN ---
+
+    def tags_matching(self, keyword=''):
+        """Tag-Codes für ein Schlagwort (Teilstring eines Tags); ohne Schlagwort: ALLE."""
+        keyword = keyword.lower().strip()
+        if not keyword:
+            return [self.tags.index(ALLE)] if ALLE in self.tags else []
+        return [code for code, tag in enumerate(self.tags) if tag != ALLE and keyword in tag]
+
+    def _cell_range(self, tag_code, start_year, end_year):
+        """Zellen eines Tags im Jahresbereich (inklusive Grenzen)."""
+        a, b = self.tag_bounds[tag_code], self.tag_bounds[tag_code + 1]
+        years = self.cell_year[a:b]
+        lo = a + np.searchsorted(years, start_year, side='left')
+        hi = a + np.searchsorted(years, end_year, side='right')
+        return np.arange(lo, hi)
+
+    def cells(self, start_year, end_year, keyword=''):
+        """Alle Zellen im Jahresbereich für die zum Schlagwort passenden Tags."""
+        ranges = [self._cell_range(code, start_year, end_year) for code in self.tags_matching(keyword)]
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def letter_positions(self, start_year, end_year, keyword=''):
+        """Sortierte Zeilenpositionen aller Briefe, die Jahresbereich und Schlagwort erfüllen."""
+        cells = self.cells(start_year, end_year, keyword)
+        positions = self.positions[_ragged(self.cell_start[cells], self.cell_count[cells])]
+        # Ein Brief mit mehreren passenden Tags liegt in mehreren Zellen
+        return np.unique(positions)
+
+    def letter_count(self, start_year, end_year, keyword=''):
+        """
+        Anzahl der Briefe im Jahresbereich. Passt das Schlagwort auf genau einen
+        Tag (oder ist leer), ist das eine Summe über die Zellen.
+        """
+        if len(self.tags_matching(keyword)) <= 1:
+            return int(self.cell_count[self.cells(start_year, end_year, keyword)].sum())
+        return len(self.letter_positions(start_year, end_year, keyword))
+
+    def route_counts(self, start_year, end_year, keyword=''):
+        """Briefe pro Route (Index = Routennummer) als Summe über die Zellen eines Tags."""
+        codes = self.tags_matching(keyword)
+        if len(codes) > 1:
+            routes = self.letter_route[self.letter_positions(start_year, end_year, keyword)]
+            return np.bincount(routes[routes >= 0], minlength=len(self.routes))
+        cells = self.cells(start_year, end_year, keyword)
+        cells = cells[self.cell_route[cells] >= 0]
+        return np.bincount(self.cell_route[cells], weights=self.cell_count[cells],
+                           minlength=len(self.routes)).astype(np.int64)
+
+    def year_counts(self, keyword=''):
+        """Briefe pro Jahr (Series) für ein Schlagwort."""
+        cells = self.cells(-np.inf, np.inf, keyword)
+        if len(self.tags_matching(keyword)) > 1:
+            positions = self.letter_positions(-np.inf, np.inf, keyword)
+            years = self.df['DATUM_JAHR'].to_numpy()[positions].astype(np.int64)
+            return pd.Series(years).value_counts().sort_index()
+        counts = pd.Series(self.cell_count[cells]).groupby(self.cell_year[cells]).sum()
+        return counts.sort_index()
+
+    def flows(self, start_year, end_year, keyword='', positions=None):
+        """
+        Aggregierte Routen im selben Format wie flows.aggregate_flows für die
+        gefilterten Briefe (inklusive Reihenfolge, erstes vorhandenes
+        ABS-ORT/EMP-ORT und BRIEF_IDS). positions: bereits abgefragte letter_positions.
+        """
+        if positions is None:
+            positions = self.letter_positions(start_year, end_year, keyword)
+        route = self.letter_route[positions]
+        positions, route = positions[route >= 0], route[route >= 0]
+
+        order = np.argsort(route, kind='stable')
+        positions, route = positions[order], route[order]
+        route_ids, first, counts = np.unique(route, return_index=True, return_counts=True)
+        first_positions = positions[first]
+
+        flows = self.routes.iloc[route_ids].reset_index(drop=True)
+        flows['ABS-ORT'] = _first_valid(self.abs_ort[positions], route, route_ids)
+        flows['EMP-ORT'] = _first_valid(self.emp_ort[positions], route, route_ids)
+        flows['ANZAHL'] = counts
+        brief_ids = self.brief_ids[positions]
+        flows['BRIEF_IDS'] = [list(ids) for ids in np.split(brief_ids, first[1:])] if len(flows) else []
+
+        # Reihenfolge wie groupby(sort=False): nach erstem Auftreten, dann schwache Verbindungen zuerst
+        flows = flows.iloc[np.argsort(first_positions, kind='stable')]
+        return flows.sort_values('ANZAHL', kind='stable').reset_index(drop=True)
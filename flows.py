@@ -0,0 +1,198 @@
+import json
+import math
+
+import folium
+import numpy as np
+from folium.utilities import JsCode
+
+ROUTE_COLUMNS = ['ABS_LAT', 'ABS_LON', 'EMP_LAT', 'EMP_LON']
+
+
+# Felder pro Brief, die in der Side-Car-Datei für die Popups abgelegt werden
+SIDECAR_COLUMNS = ['DATUM', 'ABS-NAME', 'ABS-ORT', 'EMP-NAME', 'EMP-ORT', 'TAG-FUNK', 'TAG-FACH', 'TAG-INH']
+
+# Lädt die Side-Car-Datei beim ersten Klick nach und baut das Popup einer Route
+# aus den dort abgelegten Brief-Details. Funktioniert auch bei file://-Aufrufen.
+SIDECAR_ON_EACH_FEATURE = """
+function (feature, layer) {
+    layer.on('click', function (e) {
+        var p = feature.properties;
+        var zeige = function () {
+            var briefe = window.BRIEFE || {};
+            var html = '<b>Von:</b> ' + p.von + '<br><b>An:</b> ' + p.an +
+                       '<br><b>Briefe:</b> ' + p.anzahl + '<hr>';
+            p.briefe.split(', ').forEach(function (id) {
+                var b = briefe[id];
+                html += '<b>Brief-ID:</b> ' + id;
+                if (b) {
+                    html += ' (' + b[0] + ')<br><b>Von:</b> ' + b[1] + ' (' + b[2] + ')' +
+                            '<br><b>An:</b> ' + b[3] + ' (' + b[4] + ')' +
+                            '<br><i>' + b.slice(5).filter(Boolean).join('; ') + '</i>';
+                }
+                html += '<br><br>';
+            });
+            L.popup({maxWidth: 300, maxHeight: 300}).setLatLng(e.latlng).setContent(html).openOn(layer._map);
+        };
+        if (window.BRIEFE) {
+            zeige();
+            return;
+        }
+        var script = document.createElement('script');
+        script.src = %s;
+        script.onload = zeige;
+        script.onerror = zeige;
+        document.head.appendChild(script);
+    });
+}
+"""
+
+
+def aggregate_flows(df, by=None):
+    """
+    Fasst alle Briefe mit identischer Route (Absende- und Empfangskoordinaten)
+    zu einer Zeile zusammen. Optional wird zusätzlich nach einer Spalte
+    (z.B. der Linienfarbe) gruppiert.
+
+    Erwartet die Spalten aus coords.add_coord_columns. Ergebnis: eine Zeile pro
+    Route mit ABS-ORT, EMP-ORT, ANZAHL und der Liste der BRIEF_IDS.
+    """
+    keys = ROUTE_COLUMNS + ([by] if by else [])
+    valid = df[df['KOOR_OK']]
+
+    grouped = valid.groupby(keys, sort=False, observed=True)
+    flows = grouped.agg(
+        **{
+            'ABS-ORT': ('ABS-ORT', 'first'),
+            'EMP-ORT': ('EMP-ORT', 'first'),
+            'ANZAHL': ('BRIEF-ID', 'size'),
+        }
+    ).reset_index()
+
+    # Brief-IDs pro Route: nach Gruppennummer sortieren und in Blöcke zerlegen
+    group_ids = grouped.ngroup().to_numpy()
+    order = np.argsort(group_ids, kind='stable')
+    brief_ids = valid['BRIEF-ID'].astype(str).to_numpy(dtype=object)[order]
+    bounds = np.cumsum(flows['ANZAHL'].to_numpy())[:-1]
+    flows['BRIEF_IDS'] = [list(ids) for ids in np.split(brief_ids, bounds)] if len(flows) else []
+
+    # Schwache Verbindungen zuerst, damit starke Linien oben liegen
+    return flows.sort_values('ANZAHL', kind='stable').reset_index(drop=True)
+
+
+def flow_weight(anzahl, base_weight=2, max_weight=12):
+    """Linienstärke wächst logarithmisch mit der Anzahl der Briefe."""
+    return min(max_weight, base_weight * (1 + math.log2(anzahl)))
+
+
+def flow_popup_html(flow):
+    """Popup-Text einer aggregierten Route mit allen Brief-IDs."""
+    return f"""
+    <b>Von:</b> {flow['ABS-ORT']}<br>
+    <b>An:</b> {flow['EMP-ORT']}<br>
+    <b>Briefe:</b> {flow['ANZAHL']}<br>
+    <hr>
+    <b>Brief-IDs:</b> {', '.join(flow['BRIEF_IDS'])}
+    """
+
+
+def add_flow_lines(target, flows, color=None, weight=2, opacity=0.7):
+    """
+    Zeichnet eine gewichtete folium.PolyLine pro aggregierter Route.
+    Ist keine Farbe angegeben, wird die Spalte 'FARBE' der Route verwendet.
+    """
+    for flow in flows.to_dict('records'):
+        folium.PolyLine(
+            locations=[(flow['ABS_LAT'], flow['ABS_LON']),
+                       (flow['EMP_LAT'], flow['EMP_LON'])],
+            weight=flow_weight(flow['ANZAHL'], weight),
+            color=color or flow['FARBE'],
+            opacity=opacity,
+            popup=folium.Popup(flow_popup_html(flow), max_width=300)
+        ).add_to(target)
+
+
+def flows_to_geojson(flows, color=None, weight=2, opacity=0.7):
+    """
+    Wandelt aggregierte Routen in eine GeoJSON-FeatureCollection um.
+    Popup-Daten und Linienstil werden einmal pro Route als Properties abgelegt.
+    """
+    features = []
+    for i, flow in enumerate(flows.to_dict('records')):
+        features.append({
+            'type': 'Feature',
+            'id': i,
+            'geometry': {
+                'type': 'LineString',
+                'coordinates': [[flow['ABS_LON'], flow['ABS_LAT']],
+                                [flow['EMP_LON'], flow['EMP_LAT']]],
+            },
+            'properties': {
+                'von': str(flow['ABS-ORT']),
+                'an': str(flow['EMP-ORT']),
+                'anzahl': int(flow['ANZAHL']),
+                'briefe': ', '.join(flow['BRIEF_IDS']),
+                'color': color or flow['FARBE'],
+                'weight': round(flow_weight(flow['ANZAHL'], weight), 1),
+                'opacity': opacity,
+            },
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def letter_sidecar_js(df):
+    """
+    Popup-Felder aller Briefe mit gültigen Koordinaten als kompakter
+    JavaScript-Text (window.BRIEFE = {Brief-ID: [Felder...]}).
+    """
+    valid = df[df['KOOR_OK']]
+    columns = [c for c in SIDECAR_COLUMNS if c in valid.columns]
+    values = valid[columns].astype(object).where(valid[columns].notna(), '').astype(str)
+    briefe = dict(zip(valid['BRIEF-ID'].astype(str), values.values.tolist()))
+    return 'window.BRIEFE = ' + json.dumps(briefe, ensure_ascii=False, separators=(',', ':')) + ';'
+
+
+def write_letter_sidecar(df, path):
+    """Schreibt die Side-Car-Datei mit den Popup-Feldern aller Briefe (siehe letter_sidecar_js)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(letter_sidecar_js(df))
+
+
+def add_flow_geojson(target, flows, color=None, weight=2, opacity=0.7, sidecar=None):
+    """
+    Fügt alle Routen eines Layers als eine einzige folium.GeoJson-Ebene hinzu.
+
+    Ohne Side-Car zeigt das Popup die Route und ihre Brief-IDs aus den
+    Feature-Properties. Mit sidecar (Dateiname relativ zur HTML-Datei) werden
+    die Brief-Details erst beim Klick auf eine Linie nachgeladen.
+    """
+    if flows.empty:
+        return
+
+    popup = None
+    on_each_feature = None
+    if sidecar:
+        on_each_feature = JsCode(SIDECAR_ON_EACH_FEATURE % json.dumps(sidecar))
+    else:
+        popup = folium.GeoJsonPopup(fields=['von', 'an', 'anzahl', 'briefe'],
+                                    aliases=['Von:', 'An:', 'Briefe:', 'Brief-IDs:'],
+                                    max_width=300)
+
+    folium.GeoJson(
+        flows_to_geojson(flows, color, weight, opacity),
+        style_function=lambda feature: {
+            'color': feature['properties']['color'],
+            'weight': feature['properties']['weight'],
+            'opacity': feature['properties']['opacity'],
+        },
+        popup=popup,
+        on_each_feature=on_each_feature,
+        control=False
+    ).add_to(target)
+
+
+def add_flows(target, flows, mode='geojson', color=None, weight=2, opacity=0.7, sidecar=None):
+    """Zeichnet aggregierte Routen wahlweise als GeoJSON-Ebene oder als einzelne PolyLines."""
+    if mode == 'geojson':
+        add_flow_geojson(target, flows, color, weight, opacity, sidecar)
+    else:
+        add_flow_lines(target, flows, color, weight, opacity)
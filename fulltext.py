@@ -0,0 +1,266 @@
+import os
+import re
+import sqlite3
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from corpus import cache_root
+
+# Spalten, deren Text indexiert wird (Transkription und Beschreibung)
+VOLLTEXT_SPALTEN = ['TRANSK', 'BESCHR']
+
+# Name der Index-Datenbank; sie liegt im Cache-Ordner der jeweiligen CSV-Datei (siehe index_path),
+# damit verschiedene Exporte im selben Ordner sich nicht gegenseitig aus dem Index entfernen
+INDEX_DATEI = 'volltext_index.sqlite'
+
+# Bei Änderungen an Tokenisierung oder Schema erhöhen, damit der Index neu aufgebaut wird
+INDEX_VERSION = 1
+
+# Umlaute und ß werden ausgeschrieben, damit 'Schötensack' und 'Schoetensack' gleich behandelt werden
+FALTUNG = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss', 'ſ': 's'})
+
+TOKEN = re.compile(r'\w+')
+
+# Anfrage: Phrasen in Anführungszeichen oder einzelne Wörter (optional mit * als Präfixsuche)
+ANFRAGE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def fold(text):
+    """Kleinschreibung, Umlaut-/ß-Faltung und Entfernen übriger Akzente (é -> e)."""
+    text = str(text).lower().translate(FALTUNG)
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Gefaltete Wörter eines Textes in ihrer Reihenfolge."""
+    return TOKEN.findall(fold(text))
+
+
+def _text_hashes(df, columns):
+    """Ein 64-Bit-Hash pro Brief über alle indexierten Spalten (als int64 für SQLite)."""
+    texts = df[columns].astype(object).where(df[columns].notna(), '').astype(str)
+    return pd.util.hash_pandas_object(texts, index=False).to_numpy().view(np.int64)
+
+
+def _id_sort_key(brief_id):
+    # Numerische IDs vor allen übrigen, jeweils in ihrer natürlichen Reihenfolge
+    return (0, int(brief_id), '') if brief_id.isdigit() else (1, 0, brief_id)
+
+
+class FullTextIndex:
+    """
+    Invertierter Index mit Positionslisten über TRANSK und BESCHR, gespeichert
+    in einer SQLite-Datenbank.
+
+    Pro Wort und Brief (und Feld) wird das Array der Wortpositionen abgelegt,
+    damit neben einzelnen Wörtern auch Phrasen gesucht werden können. Der Index
+    wird pro BRIEF-ID inkrementell aktualisiert: nur neue oder geänderte Briefe
+    werden neu tokenisiert, gelöschte Briefe werden entfernt.
+    """
+
+    def __init__(self, db_path, columns=None):
+        self.columns = list(columns or VOLLTEXT_SPALTEN)
+        # Die Verbindung darf auch aus anderen Threads benutzt werden (z.B. im Karten-Server),
+        # der Aufrufer sorgt dann selbst dafür, dass nicht gleichzeitig gesucht wird
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != INDEX_VERSION:
+            self.conn.executescript("""
+                DROP TABLE IF EXISTS dokumente;
+                DROP TABLE IF EXISTS woerter;
+                DROP TABLE IF EXISTS postings;
+            """)
+            self.conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dokumente (
+                dok INTEGER PRIMARY KEY,
+                brief_id TEXT UNIQUE NOT NULL,
+                hash INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS woerter (
+                wort_id INTEGER PRIMARY KEY,
+                wort TEXT UNIQUE NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                wort_id INTEGER NOT NULL,
+                dok INTEGER NOT NULL,
+                feld INTEGER NOT NULL,
+                positionen BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS postings_wort ON postings (wort_id, dok);
+            CREATE INDEX IF NOT EXISTS postings_dok ON postings (dok);
+        """)
+        self.conn.commit()
+
+        # Dokumentnummer -> BRIEF-ID, beim ersten Suchen geladen
+        self._brief_ids = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- AUFBAU ---
+
+    def update(self, df, id_column='BRIEF-ID'):
+        """
+        Gleicht den Index mit den Briefen in df ab. Gibt (neu_oder_geaendert,
+        entfernt) als Anzahlen zurück.
+        """
+        columns = [c for c in self.columns if c in df.columns]
+        ids = df[id_column].astype(str).to_numpy(dtype=object)
+        hashes = _text_hashes(df, columns)
+
+        stored = dict(self.conn.execute('SELECT brief_id, hash FROM dokumente'))
+        current = dict(zip(ids, hashes.tolist()))
+        # Bei doppelten BRIEF-IDs zählt (wie in current) der letzte Eintrag
+        last = {brief_id: i for i, brief_id in enumerate(ids)}
+        changed = [i for brief_id, i in last.items() if stored.get(brief_id) != current[brief_id]]
+        removed = [brief_id for brief_id in stored if brief_id not in current]
+
+        if not changed and not removed:
+            return 0, 0
+
+        cur = self.conn.cursor()
+        stale = removed + [ids[i] for i in changed if ids[i] in stored]
+        for start in range(0, len(stale), 500):
+            chunk = stale[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            cur.execute(f'DELETE FROM postings WHERE dok IN (SELECT dok FROM dokumente WHERE brief_id IN ({marks}))',
+                        chunk)
+            cur.execute(f'DELETE FROM dokumente WHERE brief_id IN ({marks})', chunk)
+
+        word_ids = dict(cur.execute('SELECT wort, wort_id FROM woerter'))
+        new_words = []
+        postings = []
+        texts = {c: df[c].to_numpy(dtype=object) for c in columns}
+
+        for i in changed:
+            cur.execute('INSERT INTO dokumente (brief_id, hash) VALUES (?, ?)', (ids[i], int(hashes[i])))
+            dok = cur.lastrowid
+            for feld, column in enumerate(self.columns):
+                if column not in texts or pd.isna(texts[column][i]):
+                    continue
+                positions = {}
+                for position, token in enumerate(tokenize(texts[column][i])):
+                    positions.setdefault(token, []).append(position)
+                for token, pos in positions.items():
+                    wort_id = word_ids.get(token)
+                    if wort_id is None:
+                        wort_id = word_ids[token] = len(word_ids) + 1
+                        new_words.append((wort_id, token))
+                    postings.append((wort_id, dok, feld, np.asarray(pos, dtype=np.int32).tobytes()))
+
+        cur.executemany('INSERT INTO woerter (wort_id, wort) VALUES (?, ?)', new_words)
+        cur.executemany('INSERT INTO postings (wort_id, dok, feld, positionen) VALUES (?, ?, ?, ?)', postings)
+        self.conn.commit()
+        self._brief_ids = None
+        return len(changed), len(removed)
+
+    # --- SUCHE ---
+
+    def _word_filter(self, word):
+        """SQL-Bedingung für ein Wort; mit * am Ende für alle Wörter mit diesem Präfix."""
+        if word.endswith('*'):
+            prefix = word.rstrip('*')
+            return 'w.wort >= ? AND w.wort < ?', (prefix, prefix + '\uffff')
+        return 'w.wort = ?', (word,)
+
+    def _docs(self, word):
+        """Dokumentnummern aller Briefe, die das Wort enthalten."""
+        condition, params = self._word_filter(word)
+        rows = self.conn.execute(
+            'SELECT DISTINCT p.dok FROM woerter w JOIN postings p ON p.wort_id = w.wort_id '
+            f'WHERE {condition}', params)
+        return np.fromiter((row[0] for row in rows), dtype=np.int64)
+
+    def _positions(self, word):
+        """
+        Alle Vorkommen eines Wortes als int64-Codes (Dokument, Feld, Position),
+        sodass aufeinanderfolgende Wörter im selben Feld aufeinanderfolgende Codes haben.
+        """
+        condition, params = self._word_filter(word)
+        rows = self.conn.execute(
+            'SELECT p.dok, p.feld, p.positionen FROM woerter w JOIN postings p ON p.wort_id = w.wort_id '
+            f'WHERE {condition}', params).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        keys = np.array([(dok << 3) | feld for dok, feld, _ in rows], dtype=np.int64)
+        counts = np.array([len(blob) // 4 for _, _, blob in rows], dtype=np.int64)
+        positions = np.frombuffer(b''.join(blob for _, _, blob in rows), dtype=np.int32).astype(np.int64)
+        return np.unique((np.repeat(keys, counts) << 32) | positions)
+
+    def _phrase_docs(self, words):
+        """Dokumentnummern der Briefe, in denen die Wörter direkt aufeinander folgen (in einem Feld)."""
+        starts = self._positions(words[0])
+        for offset, word in enumerate(words[1:], start=1):
+            if not len(starts):
+                break
+            starts = starts[np.isin(starts + offset, self._positions(word), assume_unique=True)]
+        return np.unique(starts >> 35)
+
+    def search_docs(self, query):
+        """
+        Interne Dokumentnummern aller Briefe, die jeden Teil der Anfrage enthalten.
+        Teile sind Wörter (mit * für Präfixsuche) oder "Phrasen in Anführungszeichen";
+        ein Teil wie 'Kaiser-Wilhelm' wird als Phrase behandelt.
+        """
+        docs = None
+        for phrase, word in ANFRAGE.findall(query):
+            if word:
+                prefix = word.endswith('*')
+                words = tokenize(word)
+                if prefix and words:
+                    words[-1] += '*'
+            else:
+                words = tokenize(phrase)
+            if not words:
+                continue
+
+            found = self._docs(words[0]) if len(words) == 1 else self._phrase_docs(words)
+            docs = np.unique(found) if docs is None else np.intersect1d(docs, found)
+            if not len(docs):
+                break
+        return np.empty(0, dtype=np.int64) if docs is None else docs
+
+    def search(self, query):
+        """
+        Sortierte Liste der BRIEF-IDs, deren Transkription oder Beschreibung die
+        Anfrage erfüllt (numerische IDs nach Zahlenwert, also '11' vor '104').
+        """
+        if self._brief_ids is None:
+            rows = self.conn.execute('SELECT dok, brief_id FROM dokumente').fetchall()
+            self._brief_ids = np.empty(max((dok for dok, _ in rows), default=0) + 1, dtype=object)
+            for dok, brief_id in rows:
+                self._brief_ids[dok] = brief_id
+        return sorted(self._brief_ids[self.search_docs(query)].tolist(), key=_id_sort_key)
+
+    def mask(self, df, query, id_column='BRIEF-ID'):
+        """Boolesche Maske über die Zeilen von df: True für Briefe, die die Anfrage erfüllen."""
+        return df[id_column].astype(str).isin(self.search(query)).to_numpy()
+
+
+def index_path(file_path):
+    """Pfad der Index-Datenbank einer CSV-Datei, z.B. 'Briefe.csv.cache/volltext_index.sqlite'."""
+    os.makedirs(cache_root(file_path), exist_ok=True)
+    return os.path.join(cache_root(file_path), INDEX_DATEI)
+
+
+def open_index(db_path, df, columns=None, id_column='BRIEF-ID'):
+    """Öffnet (oder erstellt) den Index und gleicht ihn mit den Briefen in df ab."""
+    index = FullTextIndex(db_path, columns)
+    neu, entfernt = index.update(df, id_column)
+    if neu or entfernt:
+        print(f"Volltext-Index aktualisiert: {neu} Briefe neu indexiert, {entfernt} entfernt.")
+    return index
@@ -0,0 +1,363 @@
+import numpy as np
+import pandas as pd
+
+# Spalten der Brief-Tabelle, aus denen die Kanten Absender -> Empfänger gebildet werden
+ABS_SPALTE = 'ABS-ID'
+EMP_SPALTE = 'EMP-ID'
+
+# Schlüsselspalte der Personen-Tabelle (siehe 022_appendix_persons / 00_tagtransfer)
+PERSON_SPALTE = 'PERSON-ID'
+
+
+def _gather(indptr, nodes):
+    """
+    Positionen aller Kanten der angegebenen Knoten in einer CSR-Struktur
+    (ohne Python-Schleife). Gibt die Kantenpositionen und für jede Kante den
+    Index des zugehörigen Eintrags in nodes zurück.
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = counts.sum()
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return np.arange(total) + offsets, np.repeat(np.arange(len(nodes)), counts)
+
+
+def _csr(rows, cols, weights, n):
+    """Baut eine CSR-Struktur (indptr, indices, weights) mit nach Spalte sortierten Zeilen."""
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order], weights[order]
+
+
+def letter_edges(df, abs_col=ABS_SPALTE, emp_col=EMP_SPALTE):
+    """
+    Absender- und Empfänger-IDs aller verwertbaren Briefe. Briefe ohne
+    Absender- oder Empfänger-ID und Briefe an sich selbst werden übersprungen.
+    Gibt die Zeilenpositionen der verwendeten Briefe und die beiden ID-Arrays zurück.
+    """
+    sources = df[abs_col].astype(object)
+    targets = df[emp_col].astype(object)
+    positions = np.flatnonzero((sources.notna() & targets.notna()).to_numpy())
+    sources = sources.iloc[positions].astype(str).str.strip().to_numpy(dtype=object)
+    targets = targets.iloc[positions].astype(str).str.strip().to_numpy(dtype=object)
+    keep = (sources != targets) & (sources != '') & (targets != '')
+    return positions[keep], sources[keep], targets[keep]
+
+
+def edge_pagerank(src, dst, weights, n, active=None, start=None, damping=0.85, tol=1e-10, max_iter=200):
+    """
+    Gewichteter PageRank per Potenziteration über eine Kantenliste.
+
+    active begrenzt den Graphen auf einen Teil der Knoten (z.B. die in einem
+    Zeitfenster aktiven Personen); Sprünge und der Wert von Personen ohne
+    ausgehende Briefe werden gleichmäßig auf diese Knoten verteilt. Mit start
+    (z.B. dem Ergebnis des vorigen Zeitfensters) beginnt die Iteration bei
+    einer Näherung und konvergiert entsprechend schneller.
+    """
+    if active is None:
+        active = np.ones(n, dtype=bool)
+    n_active = active.sum()
+    if n_active == 0:
+        return np.zeros(n)
+    teleport = active / n_active
+
+    out_strength = np.bincount(src, weights=weights, minlength=n)
+    dangling = active & (out_strength == 0)
+    edge_share = weights / out_strength[src]
+
+    rank = teleport
+    if start is not None and start[active].sum() > 0:
+        rank = np.where(active, start, 0.0) / start[active].sum()
+
+    for _ in range(max_iter):
+        flow = np.bincount(dst, weights=rank[src] * edge_share, minlength=n)
+        new_rank = damping * (flow + rank[dangling].sum() * teleport) + (1.0 - damping) * teleport
+        converged = np.abs(new_rank - rank).sum() < n_active * tol
+        rank = new_rank
+        if converged:
+            break
+    return rank
+
+
+class CorrespondenceGraph:
+    """
+    Gerichteter, gewichteter Graph Absender -> Empfänger.
+
+    Knoten sind ganzzahlig indexiert (self.ids[i] ist die Personen-ID von
+    Knoten i). Die Kanten liegen als CSR-Struktur vor: die Nachfolger von
+    Knoten i sind indices[indptr[i]:indptr[i + 1]], das Gewicht einer Kante
+    ist die Anzahl der Briefe auf dieser Verbindung. Für eingehende Kanten
+    wird zusätzlich die transponierte Struktur gespeichert.
+    """
+
+    def __init__(self, sources, targets):
+        sources = np.asarray(sources, dtype=object)
+        targets = np.asarray(targets, dtype=object)
+
+        codes, self.ids = pd.factorize(np.concatenate([sources, targets]))
+        self.ids = np.asarray(self.ids, dtype=object)
+        self.n = len(self.ids)
+        src, dst = codes[:len(sources)], codes[len(sources):]
+
+        # Parallele Briefe zu einer Kante mit Gewicht zusammenfassen
+        pairs, weights = np.unique(src.astype(np.int64) * self.n + dst, return_counts=True)
+        self.src = pairs // self.n
+        self.dst = pairs % self.n
+        self.weights = weights.astype(np.float64)
+
+        self.indptr, self.indices, _ = _csr(self.src, self.dst, self.weights, self.n)
+        self.in_indptr, self.in_indices, _ = _csr(self.dst, self.src, self.weights, self.n)
+
+    @classmethod
+    def from_letters(cls, df, abs_col=ABS_SPALTE, emp_col=EMP_SPALTE):
+        """
+        Baut den Graphen aus der Brief-Tabelle. Briefe ohne Absender- oder
+        Empfänger-ID und Briefe an sich selbst werden nicht berücksichtigt.
+        """
+        _, sources, targets = letter_edges(df, abs_col, emp_col)
+        return cls(sources, targets)
+
+    @property
+    def n_edges(self):
+        return len(self.src)
+
+    # --- GRADE ---
+
+    def out_degree(self):
+        """Anzahl verschiedener Empfänger pro Person."""
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        """Anzahl verschiedener Absender pro Person."""
+        return np.diff(self.in_indptr)
+
+    def out_strength(self):
+        """Anzahl gesendeter Briefe pro Person (gewichteter Ausgangsgrad)."""
+        return np.bincount(self.src, weights=self.weights, minlength=self.n)
+
+    def in_strength(self):
+        """Anzahl empfangener Briefe pro Person (gewichteter Eingangsgrad)."""
+        return np.bincount(self.dst, weights=self.weights, minlength=self.n)
+
+    def undirected(self):
+        """Ungerichtete, ungewichtete Nachbarschaft als CSR (indptr, indices)."""
+        rows = np.concatenate([self.src, self.dst])
+        cols = np.concatenate([self.dst, self.src])
+        pairs = np.unique(rows * self.n + cols)
+        rows, cols = pairs // self.n, pairs % self.n
+        indptr, indices, _ = _csr(rows, cols, np.ones(len(rows)), self.n)
+        return indptr, indices
+
+    def degree(self):
+        """Anzahl verschiedener Korrespondenzpartner pro Person (ungerichtet)."""
+        return np.diff(self.undirected()[0])
+
+    # --- ZENTRALITÄTEN ---
+
+    def pagerank(self, damping=0.85, tol=1e-10, max_iter=200):
+        """
+        Gewichteter PageRank (siehe edge_pagerank). Personen ohne ausgehende
+        Briefe verteilen ihren Wert gleichmäßig auf alle Knoten.
+        """
+        return edge_pagerank(self.src, self.dst, self.weights, self.n,
+                             damping=damping, tol=tol, max_iter=max_iter)
+
+    def betweenness(self, normalized=True):
+        """
+        Betweenness-Zentralität (gerichtet, ungewichtete kürzeste Wege) nach
+        Brandes. Die Breitensuche läuft ebenenweise: pro Ebene werden alle
+        Kanten der aktuellen Front auf einmal verarbeitet.
+        """
+        bc = np.zeros(self.n)
+        for s in range(self.n):
+            dist = np.full(self.n, -1, dtype=np.int64)
+            sigma = np.zeros(self.n)
+            dist[s] = 0
+            sigma[s] = 1.0
+            frontier = np.array([s], dtype=np.int64)
+            levels = []
+            d = 0
+
+            while len(frontier):
+                edges, owner = _gather(self.indptr, frontier)
+                origin, neighbours = frontier[owner], self.indices[edges]
+
+                unseen = neighbours[dist[neighbours] < 0]
+                dist[unseen] = d + 1
+
+                on_path = dist[neighbours] == d + 1
+                origin, neighbours = origin[on_path], neighbours[on_path]
+                sigma += np.bincount(neighbours, weights=sigma[origin], minlength=self.n)
+                levels.append((origin, neighbours))
+
+                frontier = np.unique(neighbours)
+                d += 1
+
+            delta = np.zeros(self.n)
+            for origin, neighbours in reversed(levels):
+                share = sigma[origin] / sigma[neighbours] * (1.0 + delta[neighbours])
+                delta += np.bincount(origin, weights=share, minlength=self.n)
+            delta[s] = 0.0
+            bc += delta
+
+        if normalized and self.n > 2:
+            bc /= (self.n - 1) * (self.n - 2)
+        return bc
+
+    def clustering(self, block_size=1 << 20):
+        """
+        Lokaler Clustering-Koeffizient im ungerichteten, ungewichteten Graphen:
+        Anteil der verbundenen Paare unter den Korrespondenzpartnern einer Person.
+        Dreiecke werden über Schnittmengen der Nachbarlisten gezählt: für jede
+        Kante (u, v) und jeden Nachbarn w von u wird per Binärsuche geprüft, ob
+        (v, w) eine Kante ist. Die Kanten werden in Blöcken von höchstens
+        block_size solcher Prüfungen verarbeitet (begrenzter Speicherbedarf).
+        """
+        indptr, indices = self.undirected()
+        deg = np.diff(indptr)
+        edge_u = np.repeat(np.arange(self.n, dtype=np.int64), deg)
+        edge_v = indices
+        keys = edge_u * self.n + edge_v
+        wedges = np.cumsum(deg[edge_u])
+
+        triangles = np.zeros(self.n)
+        start = 0
+        while start < len(edge_u):
+            base = wedges[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(wedges, base + block_size, side='right')))
+            u, v = edge_u[start:stop], edge_v[start:stop]
+
+            positions, owner = _gather(indptr, u)
+            query = v[owner] * self.n + indices[positions]
+            found = keys[np.minimum(np.searchsorted(keys, query), len(keys) - 1)] == query
+            triangles += np.bincount(u[owner[found]], minlength=self.n)
+            start = stop
+
+        # Jedes Dreieck wird an u zweimal gezählt ((v, w) und (w, v))
+        pairs = deg * (deg - 1) / 2.0
+        return np.divide(triangles / 2.0, pairs, out=np.zeros(self.n), where=pairs > 0)
+
+    # --- EXPORT ---
+
+    def metrics_table(self, id_col=PERSON_SPALTE):
+        """
+        Kennzahlen aller Personen als DataFrame mit einer Zeile pro Person,
+        verknüpfbar über id_col mit der Personen-Tabelle.
+        """
+        return pd.DataFrame({
+            id_col: self.ids,
+            'NETZ-GRAD': self.degree(),
+            'NETZ-OUT-GRAD': self.out_degree(),
+            'NETZ-IN-GRAD': self.in_degree(),
+            'NETZ-BRIEFE-OUT': self.out_strength().astype(np.int64),
+            'NETZ-BRIEFE-IN': self.in_strength().astype(np.int64),
+            'NETZ-BETWEENNESS': self.betweenness(),
+            'NETZ-PAGERANK': self.pagerank(),
+            'NETZ-CLUSTERING': self.clustering(),
+        })
+
+
+def join_metrics(df_persons, metrics, id_col=PERSON_SPALTE):
+    """
+    Hängt die Kennzahlen an die Personen-Tabelle an (Left-Join über id_col).
+    Personen ohne Briefe im Korpus erhalten Grad 0 und leere Zentralitäten.
+    """
+    joined = df_persons.merge(metrics, on=id_col, how='left')
+    count_cols = ['NETZ-GRAD', 'NETZ-OUT-GRAD', 'NETZ-IN-GRAD', 'NETZ-BRIEFE-OUT', 'NETZ-BRIEFE-IN']
+    joined[count_cols] = joined[count_cols].fillna(0).astype(np.int64)
+    return joined
+
+
+# --- ZEITFENSTER ---
+
+def _top(ids, values, top_n, fmt):
+    """Die top_n Personen nach values als Text 'ID (Wert); ...' (nur Werte > 0)."""
+    top_n = min(top_n, int((values > 0).sum()))
+    if top_n == 0:
+        return ''
+    best = np.argpartition(-values, top_n - 1)[:top_n]
+    best = best[np.lexsort((ids[best], -values[best]))]
+    return '; '.join(f"{ids[i]} ({fmt(values[i])})" for i in best)
+
+
+def sliding_window_metrics(df, window_years=5, step_years=1, top_n=5, date_col='DATUM_DATE',
+                           abs_col=ABS_SPALTE, emp_col=EMP_SPALTE):
+    """
+    Netzwerk-Kennzahlen für gleitende Zeitfenster (window_years Jahre, um
+    step_years verschoben) über den ganzen Korpus.
+
+    Die Briefe werden einmal nach Datum sortiert. Beim Verschieben des
+    Fensters werden nur die hinzukommenden und wegfallenden Briefe auf die
+    Kanten- und Personenzähler addiert bzw. abgezogen, statt jedes Fenster neu
+    aufzubauen. Der PageRank eines Fensters startet beim Ergebnis des vorigen.
+    Briefe ohne Datum werden nicht berücksichtigt.
+
+    Ergebnis: eine Zeile pro Fenster mit Anzahl Briefe, aktiven Korrespondenten,
+    Verbindungen, Dichte und den zentralsten Personen.
+    """
+    positions, sources, targets = letter_edges(df, abs_col, emp_col)
+    years = df[date_col].iloc[positions].dt.year.to_numpy(dtype=np.float64)
+    dated = ~np.isnan(years)
+    years, sources, targets = years[dated], sources[dated], targets[dated]
+
+    codes, ids = pd.factorize(np.concatenate([sources, targets]))
+    ids = np.asarray(ids, dtype=object)
+    n = len(ids)
+    src, dst = codes[:len(sources)].astype(np.int64), codes[len(sources):].astype(np.int64)
+    edge, edge_keys = pd.factorize(src * n + dst)
+    edge_src, edge_dst = edge_keys // n, edge_keys % n
+
+    order = np.argsort(years, kind='stable')
+    years, src, dst, edge = years[order], src[order], dst[order], edge[order]
+
+    edge_letters = np.zeros(len(edge_keys), dtype=np.int64)
+    node_letters = np.zeros(n, dtype=np.int64)
+    counts = {'edges': 0, 'nodes': 0}
+
+    def update(lo, hi, sign):
+        if hi <= lo:
+            return
+        for key, values, totals in (('edges', edge[lo:hi], edge_letters),
+                                    ('nodes', np.concatenate([src[lo:hi], dst[lo:hi]]), node_letters)):
+            unique, number = np.unique(values, return_counts=True)
+            before = (totals[unique] > 0).sum()
+            totals[unique] += sign * number
+            counts[key] += (totals[unique] > 0).sum() - before
+
+    rows = []
+    if len(years) == 0:
+        return pd.DataFrame(rows)
+
+    first, last = int(years[0]), int(years[-1])
+    lo = hi = 0
+    rank = None
+    for start in range(first, max(first, last - window_years + 1) + 1, step_years):
+        new_lo = int(np.searchsorted(years, start, side='left'))
+        new_hi = int(np.searchsorted(years, start + window_years, side='left'))
+
+        # Nur die Briefe, die das Fenster verlassen bzw. neu hinzukommen
+        update(lo, min(hi, new_lo), -1)
+        update(max(hi, new_lo), new_hi, +1)
+        lo, hi = new_lo, new_hi
+
+        active = node_letters > 0
+        active_edges = np.flatnonzero(edge_letters)
+        rank = edge_pagerank(edge_src[active_edges], edge_dst[active_edges],
+                             edge_letters[active_edges].astype(np.float64), n, active, start=rank)
+
+        n_nodes = counts['nodes']
+        rows.append({
+            'FENSTER_START': start,
+            'FENSTER_ENDE': start + window_years - 1,
+            'BRIEFE': hi - lo,
+            'KORRESPONDENTEN': n_nodes,
+            'VERBINDUNGEN': counts['edges'],
+            'DICHTE': counts['edges'] / (n_nodes * (n_nodes - 1)) if n_nodes > 1 else 0.0,
+            'TOP_BRIEFE': _top(ids, node_letters, top_n, lambda v: f"{v}"),
+            'TOP_PAGERANK': _top(ids, rank, top_n, lambda v: f"{v:.3f}"),
+        })
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# Spalten (ID, Name) der Personen je Rolle
+ROLLEN = {
+    'abs': ('ABS-ID', 'ABS-NAME'),
+    'emp': ('EMP-ID', 'EMP-NAME'),
+}
+
+
+def normalize_person(value):
+    """Normalisierte Form eines Personennamens bzw. einer ID für den Abgleich."""
+    return str(value).lower().strip()
+
+
+def _normalized(series):
+    return series.astype(object).fillna('').astype(str).str.lower().str.strip()
+
+
+class PersonIndex:
+    """
+    Index von Personen (ID oder Name) auf die Zeilenpositionen der Briefe, die
+    sie gesendet bzw. empfangen haben.
+
+    Beim Aufbau erhält jede Person einen ganzzahligen Code (gemeinsam für
+    Absender und Empfänger), pro Rolle wird das Code-Array der Briefe und pro
+    Person das sortierte Array ihrer Zeilenpositionen gespeichert. Jede weitere
+    Person kostet damit nur ein Nachschlagen statt eines Durchlaufs über den Korpus.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+
+        # Schlüssel je Rolle: die ID, bei fehlender ID-Spalte bzw. leerer ID der Name
+        keys = {}
+        names = {}
+        for rolle, (id_column, name_column) in ROLLEN.items():
+            name = df[name_column].astype(object).fillna('').astype(str).str.strip() \
+                if name_column in df.columns else pd.Series('', index=df.index)
+            key = df[id_column].astype(object).fillna('').astype(str).str.strip() \
+                if id_column in df.columns else pd.Series('', index=df.index)
+            key = key.where(key != '', name)
+            keys[rolle] = key.to_numpy(dtype=object)
+            names[rolle] = name.to_numpy(dtype=object)
+
+        all_keys = np.concatenate([keys[r] for r in ROLLEN])
+        codes, self.ids = pd.factorize(all_keys)
+        codes[all_keys == ''] = -1
+
+        self.codes = {}
+        self.postings = {}
+        for i, rolle in enumerate(ROLLEN):
+            role_codes = codes[i * self.n_rows:(i + 1) * self.n_rows]
+            self.codes[rolle] = role_codes
+            order = np.argsort(role_codes, kind='stable')
+            bounds = np.searchsorted(role_codes[order], np.arange(-1, len(self.ids) + 1))
+            # order ist stabil sortiert, die Zeilenpositionen pro Person also aufsteigend
+            self.postings[rolle] = [order[bounds[c + 1]:bounds[c + 2]] for c in range(len(self.ids))]
+
+        # Anzeigename und Nachschlagetabelle (normalisierte ID oder Name -> Codes)
+        all_names = np.concatenate([names[r] for r in ROLLEN])
+        valid = codes >= 0
+        first = pd.Series(all_names[valid]).groupby(codes[valid], sort=True).first()
+        self.names = np.array([first.get(c, '') or self.ids[c] for c in range(len(self.ids))], dtype=object)
+
+        self.lookup = {}
+        for values in (all_keys, all_names):
+            pairs = pd.DataFrame({'key': _normalized(pd.Series(values[valid])), 'code': codes[valid]})
+            pairs = pairs[pairs['key'] != ''].drop_duplicates()
+            for key, group in pairs.groupby('key', sort=False)['code']:
+                self.lookup[key] = sorted(set(self.lookup.get(key, [])) | set(group.tolist()))
+
+    def resolve(self, person):
+        """Codes aller Personen, deren ID oder Name (normalisiert) person entspricht."""
+        return self.lookup.get(normalize_person(person), [])
+
+    def id(self, code):
+        return self.ids[code]
+
+    def name(self, code):
+        return self.names[code]
+
+    def rows(self, person, rolle='beide'):
+        """
+        Sortierte Zeilenpositionen der Briefe, in denen die Person in der Rolle
+        'abs' (Absender), 'emp' (Empfänger) oder 'beide' vorkommt. person ist ein
+        Name, eine ID oder ein Code aus resolve/top.
+        """
+        codes = [person] if isinstance(person, (int, np.integer)) else self.resolve(person)
+        rollen = list(ROLLEN) if rolle == 'beide' else [rolle]
+        parts = [self.postings[r][c] for r in rollen for c in codes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts))
+
+    def mask(self, person, rolle='beide'):
+        """Boolesche Maske (Länge = Anzahl Briefe) zu rows."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(person, rolle)] = True
+        return mask
+
+    def activity(self, mask=None, rolle='beide'):
+        """Anzahl Briefe pro Person (Index = Code), optional nur für die Briefe einer Maske."""
+        rollen = list(ROLLEN) if rolle == 'beide' else [rolle]
+        counts = np.zeros(len(self.ids), dtype=np.int64)
+        for r in rollen:
+            codes = self.codes[r] if mask is None else self.codes[r][mask]
+            counts += np.bincount(codes[codes >= 0], minlength=len(self.ids))
+        return counts
+
+    def top(self, n, mask=None, rolle='beide'):
+        """Codes der n aktivsten Korrespondenten (gesendete + empfangene Briefe)."""
+        counts = self.activity(mask, rolle)
+        order = np.argsort(-counts, kind='stable')
+        return [int(c) for c in order[:n] if counts[c] > 0]
@@ -0,0 +1,277 @@
+import hashlib
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from entity_resolution import split_person
+from fulltext import tokenize
+
+# Standardname der Datenbank (liegt im Datenordner)
+RESOLVER_DATEI = 'resolver.sqlite'
+
+# Bei Änderungen an Normalisierung oder Schema erhöhen, damit die Datenbank neu aufgebaut wird
+RESOLVER_VERSION = 2
+
+# Aufzulösende Spalten der Briefe und die Tabelle, in der ihre Werte nachgeschlagen werden
+SPALTEN = {
+    'ABS-ID': 'personen',
+    'EMP-ID': 'personen',
+    'ABS-GEONAMES': 'orte',
+    'EMP-GEONAMES': 'orte',
+}
+
+# Anzahl Schlüssel pro SQL-Abfrage (Grenze für Platzhalter in SQLite)
+ABFRAGE_BLOCK = 500
+
+
+def name_variant(name, tabelle='personen'):
+    """
+    Normalisierte Namensvariante: Wörter gefaltet (Umlaute, ß, Akzente). Personen
+    in der Form 'nachname, vornamen', sodass 'Schötensack, Otto' und 'Otto
+    Schoetensack' übereinstimmen, 'Hermann, Otto' und 'Otto, Hermann' aber nicht;
+    Orte in der Reihenfolge der Wörter ('Halle (Saale)' = 'Halle/Saale').
+    """
+    if tabelle == 'personen':
+        last, first = split_person(name)
+        return ', '.join(part for part in (' '.join(last), ' '.join(first)) if part)
+    return ' '.join(tokenize(name))
+
+
+def _frame_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+class Resolver:
+    """
+    Persistente Zuordnung Name -> Personen-ID und Ortsname -> GeoNames-ID in
+    einer SQLite-Datenbank.
+
+    Die Schlüssel (exakter Name bzw. normalisierte Variante) sind indexiert und
+    werden nur neu aufgebaut, wenn sich die Mapping-Dateien ändern. Für jeden
+    Brief werden die Rohwerte (als Hash) und das Ergebnis gespeichert; bei
+    einem erneuten Lauf werden nur Briefe aufgelöst, deren Rohwerte sich
+    geändert haben. Nicht auflösbare Werte werden für den Bericht gesammelt.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != RESOLVER_VERSION:
+            self.conn.executescript("""
+                DROP TABLE IF EXISTS meta;
+                DROP TABLE IF EXISTS schluessel;
+                DROP TABLE IF EXISTS briefe;
+            """)
+            self.conn.execute(f'PRAGMA user_version = {RESOLVER_VERSION}')
+
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                wert TEXT
+            );
+            CREATE TABLE IF NOT EXISTS schluessel (
+                tabelle TEXT NOT NULL,
+                art TEXT NOT NULL,
+                schluessel TEXT NOT NULL,
+                wert TEXT NOT NULL,
+                PRIMARY KEY (tabelle, art, schluessel)
+            );
+            CREATE TABLE IF NOT EXISTS briefe (
+                brief_id TEXT PRIMARY KEY,
+                roh_hash INTEGER NOT NULL,
+                abs_id TEXT,
+                emp_id TEXT,
+                abs_geonames TEXT,
+                emp_geonames TEXT,
+                offen INTEGER NOT NULL,
+                variante INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+        self._stored = None
+        self._seen = set()
+        self.unresolved = Counter()
+        self.variants = Counter()
+        self.n_resolved = 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- MAPPINGS ---
+
+    def load_mappings(self, df_persons, df_places):
+        """
+        Übernimmt die Mapping-Tabellen (KORR-NAME -> PERSON-ID, ORT-NAME -> ORT-GEONAMES),
+        falls sie sich seit dem letzten Lauf geändert haben. Dann werden auch alle
+        gespeicherten Briefergebnisse verworfen. Gibt True zurück, wenn neu aufgebaut wurde.
+        """
+        persons = df_persons[['KORR-NAME', 'PERSON-ID']].dropna()
+        places = df_places[['ORT-NAME', 'ORT-GEONAMES']].dropna()
+        mapping_hash = _frame_hash(persons) + _frame_hash(places)
+
+        row = self.conn.execute("SELECT wert FROM meta WHERE name = 'mappings'").fetchone()
+        if row and row[0] == mapping_hash:
+            return False
+
+        cur = self.conn.cursor()
+        cur.execute('DELETE FROM schluessel')
+        cur.execute('DELETE FROM briefe')
+        for tabelle, names, ids in (('personen', persons['KORR-NAME'], persons['PERSON-ID']),
+                                    ('orte', places['ORT-NAME'], places['ORT-GEONAMES'])):
+            names, ids = names.astype(str).str.strip(), ids.astype(str).str.strip()
+
+            # Exakte Namen (bei Dubletten gilt wie bisher im dict der letzte Eintrag)
+            # und die IDs selbst, damit bereits ersetzte Werte als aufgelöst gelten
+            exact = dict(zip(ids, ids))
+            exact.update(zip(names, ids))
+            cur.executemany("INSERT INTO schluessel VALUES (?, 'exakt', ?, ?)",
+                            ((tabelle, k, v) for k, v in exact.items()))
+
+            # Normalisierte Varianten; mehrdeutige Varianten (verschiedene IDs) entfallen
+            variants = pd.DataFrame({'variante': names.map(lambda name: name_variant(name, tabelle)), 'id': ids})
+            variants = variants[variants['variante'] != ''].drop_duplicates()
+            variants = variants[~variants['variante'].duplicated(keep=False)]
+            cur.executemany("INSERT INTO schluessel VALUES (?, 'variante', ?, ?)",
+                            ((tabelle, k, v) for k, v in zip(variants['variante'], variants['id'])))
+
+        cur.execute("INSERT OR REPLACE INTO meta VALUES ('mappings', ?)", (mapping_hash,))
+        self.conn.commit()
+        self._stored = None
+        return True
+
+    def _lookup(self, tabelle, art, keys):
+        result = {}
+        keys = list(keys)
+        for start in range(0, len(keys), ABFRAGE_BLOCK):
+            chunk = keys[start:start + ABFRAGE_BLOCK]
+            marks = ','.join('?' * len(chunk))
+            result.update(self.conn.execute(
+                f'SELECT schluessel, wert FROM schluessel WHERE tabelle = ? AND art = ? AND schluessel IN ({marks})',
+                [tabelle, art] + chunk))
+        return result
+
+    def resolve_values(self, tabelle, values):
+        """
+        ({Wert: ID} exakt aufgelöst, {Wert: ID} nur über die normalisierte Variante
+        aufgelöst). Die zweite Gruppe sollte geprüft werden (siehe variant_report).
+        """
+        values = [v for v in values if isinstance(v, str)]
+        exact = self._lookup(tabelle, 'exakt', {v.strip() for v in values})
+        result = {v: exact[v.strip()] for v in values if v.strip() in exact}
+
+        rest = {v: name_variant(v, tabelle) for v in values if v not in result}
+        variants = self._lookup(tabelle, 'variante', {k for k in rest.values() if k})
+        return result, {v: variants[k] for v, k in rest.items() if k in variants}
+
+    # --- BRIEFE ---
+
+    def _load_stored(self):
+        self._stored = pd.read_sql_query(
+            'SELECT brief_id, roh_hash, abs_id, emp_id, abs_geonames, emp_geonames, offen, variante FROM briefe',
+            self.conn, index_col='brief_id')
+
+    def resolve_chunk(self, chunk, id_column='BRIEF-ID'):
+        """
+        Ersetzt Namen durch IDs in einem Block von Briefen. Briefe mit
+        unveränderten Rohwerten übernehmen das gespeicherte Ergebnis, nur die
+        übrigen werden aufgelöst und gespeichert. Unbekannte Werte bleiben erhalten;
+        sie und die nur über eine Namensvariante aufgelösten Werte werden gezählt.
+        """
+        if self._stored is None:
+            self._load_stored()
+
+        columns = list(SPALTEN)
+        raw = chunk[columns]
+        raw_hash = pd.util.hash_pandas_object(raw.astype(object), index=False).to_numpy().view(np.int64)
+        ids = chunk[id_column].astype(str)
+        self._seen.update(ids.to_numpy(dtype=object))
+
+        stored = self._stored.reindex(ids)
+        changed = (stored['roh_hash'].to_numpy() != raw_hash) | stored['roh_hash'].isna().to_numpy()
+
+        result = raw.copy()
+        offen = np.zeros(len(chunk), dtype=np.int64)
+        variante = np.zeros(len(chunk), dtype=np.int64)
+
+        # Unveränderte Briefe: gespeichertes Ergebnis übernehmen
+        keep = ~changed
+        if keep.any():
+            for column, stored_column in zip(columns, ['abs_id', 'emp_id', 'abs_geonames', 'emp_geonames']):
+                result.loc[keep, column] = stored[stored_column].to_numpy()[keep]
+            offen[keep] = stored['offen'].to_numpy()[keep].astype(np.int64)
+            variante[keep] = stored['variante'].to_numpy()[keep].astype(np.int64)
+
+        # Geänderte Briefe: eindeutige Werte pro Tabelle einmal auflösen
+        if changed.any():
+            for bit, (column, tabelle) in enumerate(SPALTEN.items()):
+                values = raw.loc[changed, column]
+                exact, variants = self.resolve_values(tabelle, values.dropna().unique())
+                resolved = values.map({**exact, **variants})
+                result.loc[changed, column] = resolved.fillna(values)
+                offen[changed] |= (values.notna() & resolved.isna()).to_numpy().astype(np.int64) << bit
+                variante[changed] |= values.isin(list(variants)).to_numpy().astype(np.int64) << bit
+
+            rows = pd.DataFrame({
+                'brief_id': ids[changed].to_numpy(),
+                'roh_hash': raw_hash[changed],
+                'abs_id': result.loc[changed, 'ABS-ID'].to_numpy(),
+                'emp_id': result.loc[changed, 'EMP-ID'].to_numpy(),
+                'abs_geonames': result.loc[changed, 'ABS-GEONAMES'].to_numpy(),
+                'emp_geonames': result.loc[changed, 'EMP-GEONAMES'].to_numpy(),
+                'offen': offen[changed],
+                'variante': variante[changed],
+            })
+            rows = rows.astype(object).where(rows.notna(), None)
+            self.conn.executemany('INSERT OR REPLACE INTO briefe VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                  rows.itertuples(index=False, name=None))
+            self.conn.commit()
+            self.n_resolved += int(changed.sum())
+
+        # Nicht und nur über eine Variante aufgelöste Werte für die Berichte zählen
+        for bit, column in enumerate(columns):
+            open_values = result[column].to_numpy(dtype=object)[(offen >> bit) & 1 == 1]
+            self.unresolved.update(zip([column] * len(open_values), open_values))
+            via_variant = (variante >> bit) & 1 == 1
+            self.variants.update(zip([column] * int(via_variant.sum()),
+                                     raw[column].to_numpy(dtype=object)[via_variant],
+                                     result[column].to_numpy(dtype=object)[via_variant]))
+
+        chunk[columns] = result
+        return chunk
+
+    def finish(self):
+        """Entfernt gespeicherte Briefe, die im aktuellen Export nicht mehr vorkommen."""
+        if self._stored is None:
+            return 0
+        removed = self._stored.index.difference(list(self._seen)).tolist()
+        for start in range(0, len(removed), ABFRAGE_BLOCK):
+            chunk = removed[start:start + ABFRAGE_BLOCK]
+            self.conn.execute(f"DELETE FROM briefe WHERE brief_id IN ({','.join('?' * len(chunk))})", chunk)
+        self.conn.commit()
+        return len(removed)
+
+    def unresolved_report(self):
+        """Tabelle der nicht aufgelösten Werte (SPALTE, WERT, BRIEFE), häufigste zuerst."""
+        report = pd.DataFrame([(column, value, count) for (column, value), count in self.unresolved.items()],
+                              columns=['SPALTE', 'WERT', 'BRIEFE'])
+        return report.sort_values(['BRIEFE', 'SPALTE', 'WERT'], ascending=[False, True, True], ignore_index=True)
+
+    def variant_report(self):
+        """
+        Tabelle der nur über eine Namensvariante aufgelösten Werte (SPALTE, WERT, ID,
+        BRIEFE), häufigste zuerst. Diese Zuordnungen sind nicht exakt und sollten geprüft werden.
+        """
+        report = pd.DataFrame([(column, value, id_, count) for (column, value, id_), count in self.variants.items()],
+                              columns=['SPALTE', 'WERT', 'ID', 'BRIEFE'])
+        return report.sort_values(['BRIEFE', 'SPALTE', 'WERT'], ascending=[False, True, True], ignore_index=True)
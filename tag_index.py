@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from tag_vocab import TagVocabulary, read_aliases, tag_id
+
+# Tag-Spalten der Briefe, die standardmäßig indexiert werden
+TAG_COLUMNS = ['TAG-FACH', 'TAG-FUNK', 'TAG-INH']
+
+
+def split_tags(series):
+    """
+    Zerlegt eine kommagetrennte Tag-Spalte in (Zeilenposition, Tag)-Paare.
+    Tags werden von Leerzeichen befreit und kleingeschrieben, leere Tags entfernt.
+    """
+    tags = series.reset_index(drop=True).astype(object).fillna('').astype(str).str.lower().str.split(',').explode().str.strip()
+    tags = tags[tags != '']
+    return tags.index.to_numpy(dtype=np.int64), tags.to_numpy(dtype=object)
+
+
+class TagIndex:
+    """
+    Invertierter Index über die Tag-Spalten eines Brief-Korpus.
+
+    Für jede Spalte wird einmal das Vokabular der normalisierten Tags und pro
+    Tag das sortierte Array der Zeilenpositionen gespeichert. Schlagwortfilter
+    (Teilstring eines Tags) werden über das kleine Vokabular aufgelöst statt
+    über alle Briefe; die resultierenden Masken werden zwischengespeichert.
+
+    Kategorien (kanonische Tags samt Oberbegriffen, siehe tag_vocab) werden
+    über die unterschiedlichen Feldinhalte einer Spalte aufgelöst: jedes Feld
+    wird einmal kanonisiert, statt pro Brief Teilstrings zu prüfen. Ohne
+    vocabulary gilt nur die mitgelieferte Alias-Tabelle.
+    """
+
+    def __init__(self, df, columns=None, vocabulary=None):
+        self.n_rows = len(df)
+        self.columns = list(columns or TAG_COLUMNS)
+        self.tag_vocabulary = vocabulary if vocabulary is not None else TagVocabulary(aliases=read_aliases())
+        self.postings = {}
+        self.cells = {}
+        self._mask_cache = {}
+
+        for column in self.columns:
+            rows, tags = split_tags(df[column])
+            codes, vocabulary = pd.factorize(tags)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+            self.postings[column] = {
+                tag: np.unique(rows[order[bounds[i]:bounds[i + 1]]])
+                for i, tag in enumerate(vocabulary)
+            }
+            # Feldinhalte als Codes (-1 = leer) für die Kategorie-Masken
+            self.cells[column] = pd.factorize(df[column].reset_index(drop=True).astype(object))
+
+    def vocabulary(self, column):
+        """Alle normalisierten Tags einer Spalte."""
+        return list(self.postings[column])
+
+    def tags_containing(self, keyword, column):
+        """Alle Tags einer Spalte, die das Schlagwort als Teilstring enthalten."""
+        keyword = keyword.lower().strip()
+        return [tag for tag in self.postings[column] if keyword in tag]
+
+    def rows(self, keyword, columns=None):
+        """Sortierte Zeilenpositionen aller Briefe mit passendem Tag in einer der Spalten."""
+        return np.flatnonzero(self.mask(keyword, columns))
+
+    def mask(self, keyword, columns=None):
+        """
+        Boolesche Maske (Länge = Anzahl Briefe): True, wenn mindestens ein Tag in
+        einer der Spalten das Schlagwort enthält. Masken werden pro Spalte und
+        Schlagwort nur einmal berechnet.
+        """
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for column in columns or self.columns:
+            mask |= self._column_mask(keyword.lower().strip(), column)
+        return mask
+
+    def _column_mask(self, keyword, column):
+        key = (column, keyword)
+        if key not in self._mask_cache:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            for tag in self.tags_containing(keyword, column):
+                mask[self.postings[column][tag]] = True
+            self._mask_cache[key] = mask
+        return self._mask_cache[key]
+
+    def tag_mask(self, tag, columns=None):
+        """
+        Boolesche Maske: True, wenn ein Tag in einer der Spalten kanonisch tag
+        ist oder tag als Oberbegriff hat (z.B. 'Objekt' für Objektversand).
+        """
+        key = tag_id(tag)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for column in columns or self.columns:
+            cache_key = (column, '=' + key)
+            if cache_key not in self._mask_cache:
+                codes, cells = self.cells[column]
+                matching = [i for i, cell in enumerate(cells) if key in self.tag_vocabulary.categories(cell)]
+                self._mask_cache[cache_key] = np.isin(codes, matching)
+            mask |= self._mask_cache[cache_key]
+        return mask
+
+    def select(self, rules, default):
+        """
+        Ordnet jedem Brief den Wert der ersten zutreffenden Regel zu.
+        rules: [(wert, [(spalte, kategorie), ...]), ...] in absteigender Priorität,
+        Kategorien wie in tag_mask.
+        """
+        conditions = []
+        for _, checks in rules:
+            condition = np.zeros(self.n_rows, dtype=bool)
+            for column, category in checks:
+                condition |= self.tag_mask(category, [column])
+            conditions.append(condition)
+        return np.select(conditions, [value for value, _ in rules], default=default)
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Präfixe der Tag-Spalten, die im Batch-Modus ausgewertet werden
+TAG_PRAEFIXE = ('TAG-', 'NONOS-')
+
+# Paare, die in weniger Briefen gemeinsam vorkommen, entfallen in der Kookkurrenz
+# (die PMI seltener Paare ist kaum aussagekräftig)
+KOOKKURRENZ_MIN = 2
+
+
+def tag_columns(df):
+    """Alle TAG-* und NONOS-* Spalten in der Reihenfolge der Datei."""
+    return [column for column in df.columns if column.startswith(TAG_PRAEFIXE)]
+
+
+class CodedTags:
+    """
+    Alle Tags der angegebenen Spalten als ganzzahlige Codes.
+
+    Ein Tag ist das Paar (Spalte, Tag), da z.B. 'Archäologie' in TAG-FACH und
+    NONOS-FACH unterschiedliche Bedeutung hat. rows und codes enthalten jedes
+    Paar (Brief, Tag) genau einmal, sortiert nach Brief.
+    """
+
+    def __init__(self, df, columns=None):
+        self.n_rows = len(df)
+        self.columns = list(columns or tag_columns(df))
+
+        rows, codes, spalten, tags = [], [], [], []
+        for column in self.columns:
+            # Jeder unterschiedliche Feldinhalt wird nur einmal zerlegt (wie bei der Extraktion
+            # einzelner Spalten: Trenner ", ", Leerzeichen entfernt) und dann auf die Briefe verteilt
+            cell_codes, cells = pd.factorize(df[column].reset_index(drop=True).astype(object))
+            exploded = pd.Series(cells, dtype=object).astype(str).str.split(', ').explode().str.strip()
+            exploded = exploded[exploded != '']
+            column_codes, vocabulary = pd.factorize(exploded)
+
+            # Leere Felder (Code -1) zeigen auf einen angehängten Inhalt ohne Tags
+            cell_codes = np.where(cell_codes >= 0, cell_codes, len(cells))
+            counts = np.bincount(exploded.index.to_numpy(dtype=np.int64), minlength=len(cells) + 1)
+            starts = np.cumsum(counts) - counts
+            row_counts = counts[cell_codes]
+            positions = np.repeat(starts[cell_codes] - np.cumsum(row_counts) + row_counts,
+                                  row_counts) + np.arange(row_counts.sum())
+
+            rows.append(np.repeat(np.arange(len(df), dtype=np.int64), row_counts))
+            codes.append(column_codes[positions].astype(np.int64) + len(tags))
+            spalten.extend([column] * len(vocabulary))
+            tags.extend(vocabulary)
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+        self.n_tags = len(tags)
+        self.vocabulary = pd.DataFrame({'SPALTE': spalten, 'TAG': tags})
+
+        # Doppelte Tags im selben Brief nur einmal zählen
+        pairs = np.unique(rows * max(self.n_tags, 1) + codes)
+        self.rows = pairs // max(self.n_tags, 1)
+        self.codes = pairs % max(self.n_tags, 1)
+
+    def frequencies(self):
+        """Anzahl Briefe pro Tag (SPALTE, TAG, BRIEFE, ANTEIL), pro Spalte häufigste zuerst."""
+        counts = np.bincount(self.codes, minlength=self.n_tags)
+        result = self.vocabulary.assign(BRIEFE=counts, ANTEIL=np.round(counts / max(self.n_rows, 1), 4))
+        return result.sort_values(['SPALTE', 'BRIEFE', 'TAG'], ascending=[True, False, True], ignore_index=True)
+
+    def year_frequencies(self, years):
+        """Anzahl Briefe pro Tag und Jahr (SPALTE, TAG, JAHR, BRIEFE); undatierte Briefe entfallen."""
+        years = pd.Series(years).reset_index(drop=True).to_numpy(dtype=np.float64)[self.rows]
+        dated = ~np.isnan(years)
+        if not dated.any():
+            return pd.DataFrame(columns=['SPALTE', 'TAG', 'JAHR', 'BRIEFE'])
+        year_codes, year_values = pd.factorize(years[dated].astype(np.int64), sort=True)
+
+        cells = self.codes[dated] * len(year_values) + year_codes
+        cells, counts = np.unique(cells, return_counts=True)
+        result = self.vocabulary.iloc[cells // len(year_values)].reset_index(drop=True)
+        result['JAHR'] = year_values[cells % len(year_values)]
+        result['BRIEFE'] = counts
+        return result.sort_values(['SPALTE', 'TAG', 'JAHR'], ignore_index=True)
+
+    def cooccurrence(self, min_count=KOOKKURRENZ_MIN):
+        """
+        Dünnbesetzte Tag×Tag-Matrix als Liste der Paare (a < b), die in
+        mindestens min_count Briefen gemeinsam vorkommen. Die Paare werden pro
+        Anzahl Tags eines Briefs vektorisiert erzeugt. PMI = log(p(a,b) / (p(a) p(b)))
+        über alle Briefe, NPMI ist die auf [-1, 1] normierte PMI.
+        """
+        columns = ['SPALTE_A', 'TAG_A', 'SPALTE_B', 'TAG_B', 'BRIEFE', 'PMI', 'NPMI']
+        if not len(self.rows):
+            return pd.DataFrame(columns=columns)
+        starts = np.flatnonzero(np.r_[True, self.rows[1:] != self.rows[:-1]])
+        sizes = np.diff(np.r_[starts, len(self.rows)])
+
+        cells = []
+        for size in np.unique(sizes[sizes >= 2]):
+            block = self.codes[starts[sizes == size][:, None] + np.arange(size)]
+            i, j = np.triu_indices(size, k=1)
+            # Codes eines Briefs sind aufsteigend sortiert, also a < b
+            cells.append(block[:, i].ravel() * self.n_tags + block[:, j].ravel())
+
+        if not cells:
+            return pd.DataFrame(columns=columns)
+        cells, counts = np.unique(np.concatenate(cells), return_counts=True)
+        keep = counts >= min_count
+        cells, counts = cells[keep], counts[keep]
+        a, b = cells // self.n_tags, cells % self.n_tags
+
+        frequency = np.bincount(self.codes, minlength=self.n_tags)
+        p_ab = counts / self.n_rows
+        pmi = np.log(p_ab / (frequency[a] / self.n_rows) / (frequency[b] / self.n_rows))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            npmi = np.where(p_ab < 1, pmi / -np.log(p_ab), 1.0)
+
+        result = pd.DataFrame({
+            'SPALTE_A': self.vocabulary['SPALTE'].to_numpy()[a], 'TAG_A': self.vocabulary['TAG'].to_numpy()[a],
+            'SPALTE_B': self.vocabulary['SPALTE'].to_numpy()[b], 'TAG_B': self.vocabulary['TAG'].to_numpy()[b],
+            'BRIEFE': counts, 'PMI': np.round(pmi, 4), 'NPMI': np.round(npmi, 4),
+        }, columns=columns)
+        return result.sort_values(['BRIEFE', 'PMI'], ascending=False, ignore_index=True)
@@ -0,0 +1,204 @@
+import glob
+import os
+import re
+from collections import deque
+
+import pandas as pd
+
+from fulltext import fold
+from tag_stats import TAG_PRAEFIXE
+
+# Präfix der Vokabulardateien, die 013_extract_tags.py pro Tag-Spalte schreibt
+VOKABULAR_PRAEFIX = '251204_NODEGOAT_'
+
+# Mitgelieferte Alias- und Hierarchietabelle (Spalten TAG, ZIEL, ART)
+ALIAS_DATEI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_aliases.csv')
+
+# ART 'alias': TAG ist eine andere Schreibweise von ZIEL (gleiche kanonische ID)
+# ART 'oberbegriff': ZIEL ist die übergeordnete Kategorie von TAG (z.B. Objektversand -> Objekt)
+ALIAS = 'alias'
+OBERBEGRIFF = 'oberbegriff'
+
+# Tags innerhalb eines Feldes (getrennt durch Kommas, ohne umgebende Leerzeichen)
+_SEGMENT = re.compile(r'[^,\s](?:[^,]*[^,\s])?')
+
+
+def tag_id(tag):
+    """Kanonische ID eines Tags: gefaltet (klein, Umlaute ausgeschrieben), Leerzeichen vereinheitlicht."""
+    return ' '.join(fold(tag).split())
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick-Automat über eine Menge von Mustern. Ein Text wird in einem
+    Durchlauf nach allen Mustern gleichzeitig durchsucht.
+    """
+
+    def __init__(self, patterns):
+        # Trie: Übergänge, Fehlerverweise und pro Zustand die endenden Muster (Länge, Wert)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(pattern), value))
+
+        # Fehlerverweise in Breitensuche: längstes echtes Suffix, das ebenfalls ein Trie-Präfix ist
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.output[target] = self.output[target] + self.output[self.fail[target]]
+
+    def search(self, text):
+        """Alle Treffer als (Start, Ende, Wert)."""
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                yield end - length, end, value
+
+
+class TagVocabulary:
+    """
+    Kanonisches Tag-Vokabular mit Alias- und Hierarchietabelle.
+
+    Alle bekannten Schreibweisen (Tags aus den Vokabulardateien und Aliase)
+    sind in einen Aho-Corasick-Automaten kompiliert, ein Tag-Feld wird damit
+    in einem Durchlauf kanonisiert. Treffer zählen nur, wenn sie einen ganzen
+    Tag umfassen, 'objekt' passt also nicht in 'Objektversand'. Unbekannte Tags
+    sind ihre eigene kanonische ID. Die Kategorien eines Tags sind er selbst
+    und alle Oberbegriffe.
+    """
+
+    def __init__(self, tags=(), aliases=None):
+        self.names = {}
+        self.parents = {}
+        self._ancestors = {}
+        self._cache = {}
+        spellings = {}
+
+        for tag in tags:
+            self._register(tag)
+            spellings[tag_id(tag)] = tag_id(tag)
+
+        if aliases is not None:
+            # Aliase zuerst auflösen, damit Oberbegriffe auch für andere Schreibweisen gelten
+            rows = list(aliases[['TAG', 'ZIEL', 'ART']].itertuples(index=False))
+            for tag, target, art in rows:
+                if str(art).strip().lower() == ALIAS:
+                    spellings[tag_id(tag)] = self._register(target)
+            for tag, target, art in rows:
+                if str(art).strip().lower() == OBERBEGRIFF:
+                    child = spellings.get(tag_id(tag)) or self._register(tag)
+                    spellings.setdefault(child, child)
+                    parent = spellings.get(tag_id(target)) or self._register(target)
+                    spellings.setdefault(parent, parent)
+                    self.parents.setdefault(child, set()).add(parent)
+
+        self.spellings = spellings
+        self.automaton = AhoCorasick(spellings)
+
+    def _register(self, tag):
+        key = tag_id(tag)
+        self.names.setdefault(key, str(tag).strip())
+        return key
+
+    def name(self, key):
+        """Anzeigename einer kanonischen ID (erste bekannte Schreibweise)."""
+        return self.names.get(key, key)
+
+    def ancestors(self, key):
+        """Die ID selbst und alle (auch mittelbaren) Oberbegriffe."""
+        if key not in self._ancestors:
+            result, stack = {key}, [key]
+            while stack:
+                for parent in self.parents.get(stack.pop(), ()):
+                    if parent not in result:
+                        result.add(parent)
+                        stack.append(parent)
+            self._ancestors[key] = frozenset(result)
+        return self._ancestors[key]
+
+    def canonicalize(self, field):
+        """Kanonische IDs aller Tags eines Feldes (in Reihenfolge, ohne Dubletten)."""
+        text = ' '.join(fold(field).replace(',', ' , ').split()).replace(' ,', ',')
+        segments = {(m.start(), m.end()): m.group() for m in _SEGMENT.finditer(text)}
+
+        found = {}
+        for start, end, value in self.automaton.search(text):
+            if (start, end) in segments:
+                found[start] = value
+        for (start, end), segment in segments.items():
+            if start not in found:
+                found[start] = segment
+        return list(dict.fromkeys(found[start] for start in sorted(found)))
+
+    def categories(self, field):
+        """Menge der Kategorien (kanonische IDs und Oberbegriffe) eines Tag-Feldes."""
+        if pd.isna(field):
+            return frozenset()
+        if field not in self._cache:
+            self._cache[field] = frozenset().union(*(self.ancestors(key) for key in self.canonicalize(field)))
+        return self._cache[field]
+
+    def unassigned(self, category):
+        """
+        Bekannte Tags, die den Namen der Kategorie oder eine Schreibweise eines
+        ihr zugeordneten Tags enthalten (z.B. 'Archäologe (Amateur)' über
+        Archäologe -> Archäologie), ihr aber nicht zugeordnet sind (Kandidaten
+        für die Alias-Tabelle).
+        """
+        key = tag_id(category)
+        spellings = [spelling for spelling, target in self.spellings.items() if key in self.ancestors(target)]
+        spellings.append(key)
+        return sorted(self.name(k) for k in self.names
+                      if key not in self.ancestors(k) and any(spelling in k for spelling in spellings))
+
+    def warn_unassigned(self, categories):
+        """Gibt für jede Kategorie einen Hinweis auf nicht zugeordnete, ähnlich benannte Tags aus."""
+        for category in categories:
+            tags = self.unassigned(category)
+            if tags:
+                print(f"Hinweis: {len(tags)} Tags enthalten '{category}' oder einen zugehörigen Tag, gehören laut "
+                      f"{os.path.basename(ALIAS_DATEI)} aber nicht dazu: {', '.join(tags[:10])}"
+                      + (" ..." if len(tags) > 10 else ""))
+
+
+def read_aliases(alias_file=ALIAS_DATEI):
+    """Liest die Alias- und Hierarchietabelle (leer, falls die Datei fehlt)."""
+    if not os.path.exists(alias_file):
+        return pd.DataFrame(columns=['TAG', 'ZIEL', 'ART'])
+    return pd.read_csv(alias_file, dtype=str, encoding='utf-8').dropna(subset=['TAG', 'ZIEL'])
+
+
+def load_vocabulary(folder, alias_file=ALIAS_DATEI):
+    """
+    Lädt das Vokabular aus den Dateien 251204_NODEGOAT_TAG-*.csv bzw. NONOS-*.csv
+    im Ordner (von 013_extract_tags.py geschrieben) und die Alias-Tabelle.
+    """
+    tags = []
+    files = sorted(path for prefix in TAG_PRAEFIXE
+                   for path in glob.glob(os.path.join(folder, f"{VOKABULAR_PRAEFIX}{prefix}*.csv")))
+    for path in files:
+        vocabulary = pd.read_csv(path, dtype=str, encoding='utf-8')
+        tags.extend(vocabulary.iloc[:, 0].dropna().tolist())
+    if not files:
+        print(f"Hinweis: Keine Tag-Vokabulardateien ({VOKABULAR_PRAEFIX}TAG-*.csv) in '{folder}' gefunden, "
+              "es gelten nur die Einträge der Alias-Tabelle (013_extract_tags.py im Batch-Modus erzeugt sie).")
+    return TagVocabulary(tags, read_aliases(alias_file))